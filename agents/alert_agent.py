@@ -1,10 +1,12 @@
 import pandas as pd
 import os
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 # LangChain and OpenAI imports
 from langchain.tools import tool
-from langchain_openai import ChatOpenAI
+from agents.llm import get_llm
+from agents.output_format import format_table
+from agents.tool_runtime import memoized, merge_outputs, run_parallel
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain.prompts import PromptTemplate
 from dotenv import load_dotenv
@@ -77,6 +79,7 @@ def create_sample_data():
 # --- 3. SPECIALIZED ANALYSIS TOOLS ---
 
 @tool
+@memoized(data=[DATA_PATH])
 def detect_high_value_transactions(z_threshold: float = 3.0) -> str:
     """
     Detects unusually high-value transactions based on Z-score.
@@ -95,11 +98,13 @@ def detect_high_value_transactions(z_threshold: float = 3.0) -> str:
         
         if anomalies.empty:
             return "No unusually high-value transactions found."
-        return f"Detected high-value transactions:\n{anomalies[['transaction_id', 'amount', 'zscore']].to_string(index=False)}"
+        return format_table(anomalies[['transaction_id', 'amount', 'zscore']], "Detected high-value transactions:",
+                            sort_by='zscore')
     except Exception as e:
         return f"Error during processing: {e}"
 
 @tool
+@memoized(data=[DATA_PATH])
 def detect_unusual_hours_transactions(start_hour: int = 7, end_hour: int = 22) -> str:
     """
     Detects transactions occurring outside of normal business hours (before 7 AM or after 10 PM).
@@ -111,11 +116,13 @@ def detect_unusual_hours_transactions(start_hour: int = 7, end_hour: int = 22) -
         
         if anomalies.empty:
             return "No transactions found outside of business hours."
-        return f"Detected transactions outside business hours:\n{anomalies[['transaction_id', 'timestamp', 'amount']].to_string(index=False)}"
+        return format_table(anomalies[['transaction_id', 'timestamp', 'amount']],
+                            "Detected transactions outside business hours:", sort_by='amount')
     except Exception as e:
         return f"Error during processing: {e}"
 
 @tool
+@memoized(data=[DATA_PATH])
 def detect_over_budget_spending() -> str:
     """
     Checks for and reports on spending categories that have exceeded their defined budget.
@@ -139,6 +146,7 @@ def detect_over_budget_spending() -> str:
         return f"Error during processing: {e}"
 
 @tool
+@memoized(data=[DATA_PATH], version=date.today)  # overdue status changes with the date
 def detect_late_supplier_payments() -> str:
     """
     Checks for supplier invoices that are past their due date for payment.
@@ -155,11 +163,42 @@ def detect_late_supplier_payments() -> str:
             return "No supplier payments are overdue."
         
         anomalies['days_overdue'] = (today - anomalies['due_date']).dt.days
-        return f"Detected late supplier payments:\n{anomalies[['vendor', 'amount', 'due_date', 'days_overdue']].to_string(index=False)}"
+        return format_table(anomalies[['vendor', 'amount', 'due_date', 'days_overdue']],
+                            "Detected late supplier payments:", sort_by='days_overdue')
     except Exception as e:
         return f"Error during processing: {e}"
 
 
+DETECTORS = [
+    detect_high_value_transactions,
+    detect_unusual_hours_transactions,
+    detect_over_budget_spending,
+    detect_late_supplier_payments
+]
+
+
+def _run_detectors() -> str:
+    return merge_outputs(run_parallel([(d.name, d.func, (), {}) for d in DETECTORS]))
+
+
+@tool
+def run_all_detectors(query: str = "") -> str:
+    """
+    Runs all four anomaly checks (high-value, outside business hours, over budget, late supplier payments)
+    concurrently with default thresholds and returns every report in one observation.
+    Use this first for any general anomaly or alert report instead of calling the checks one by one.
+    """
+    return _run_detectors()
+
+
+def detect_anomalies(query: str = "") -> str:
+    """
+    Runs every detector with its default thresholds and joins the reports.
+    Used by the router, which has no need for a ReAct loop over fixed checks.
+    """
+    return _run_detectors()
+
+
 # --- 4. AGENT SETUP AND EXECUTION ---
 
 def main():
@@ -170,15 +209,10 @@ def main():
     load_dotenv()
 
     # 1. Initialize the LLM
-    llm = ChatOpenAI(temperature=0, model="gpt-4", openai_api_key=os.getenv("OPENAI_API_KEY"))
+    llm = get_llm(model="gpt-4", temperature=0)
 
-    # 2. Assemble the tools
-    tools = [
-        detect_high_value_transactions,
-        detect_unusual_hours_transactions,
-        detect_over_budget_spending,
-        detect_late_supplier_payments
-    ]
+    # 2. Assemble the tools; the combined check comes first so a full report takes one tool step
+    tools = [run_all_detectors] + DETECTORS
 
     # 3. Create the Prompt Template
     prompt_template = """
@@ -194,12 +228,10 @@ def main():
     Use the following format:
 
     Question: The user's request.
-    Thought: You should always think about what to do. I need to check for all types of anomalies. I will start by checking for high-value transactions.
+    Thought: You should always think about what to do. To check for all types of anomalies I run run_all_detectors once; a single check is only needed for a narrow question or a custom threshold.
     Action: The action to take, should be one of [{tool_names}].
     Action Input: The input to the action.
     Observation: The result of the action.
-    Thought: Now I will check for the next type of anomaly.
-    Action: ...
     ... (this Thought/Action/Action Input/Observation can repeat N times)
     Thought: I have gathered all necessary information. I will now compile the final report in Vietnamese.
     Final Answer: [Your final, comprehensive report in Vietnamese]
@@ -1,11 +1,16 @@
+import os
 from typing import Any, Dict
 
 import pandas as pd
 
+from agents.budget_cube import BudgetCube, answer_budget_query, get_budget_cube
+from agents.output_format import fit_text
 from rag.vectorstore import get_retriever
 
+BUDGET_PATH = "data/budgets_extended.csv"
 
-def load_budgets(path: str = "data/budgets_extended.csv") -> pd.DataFrame:
+
+def load_budgets(path: str = BUDGET_PATH) -> pd.DataFrame:
     try:
         return pd.read_csv(path)
     except Exception:
@@ -19,18 +24,21 @@ def load_budgets(path: str = "data/budgets_extended.csv") -> pd.DataFrame:
         )
 
 
-def simple_budget_tool(_: str) -> str:
-    df = load_budgets()
-    summary = (
-        df.assign(variance=df["approved_amount"] - df["actual_spent"])
-        .to_string(index=False)
-    )
-    return f"Budget summary (variance = approved - actual):\n{summary}"
+def get_cube(path: str = BUDGET_PATH) -> BudgetCube:
+    """Cached budget cube (fallback rows when the CSV is missing)."""
+    if not os.path.exists(path):
+        return BudgetCube(load_budgets(path))
+    return get_budget_cube(path)
+
+
+def simple_budget_tool(query: str) -> str:
+    """Totals for the dept/project/quarter/year/category the query names, drilled down one level."""
+    return answer_budget_query(get_cube(), query)
 
 
 def rag_tool(query: str) -> str:
     docs = get_retriever().get_relevant_documents(query)
-    return "\n".join(d.page_content for d in docs)
+    return fit_text("\n".join(d.page_content for d in docs), title="Policy documents")
 
 
 class BudgetAgentExecutor:
@@ -0,0 +1,270 @@
+import os
+import re
+import threading
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+DIMENSIONS = ("dept", "project_id", "quarter", "year", "category")
+# Budget policy (rag_documents: "Variance trên 10% cần giải thích và điều chỉnh")
+VARIANCE_POLICY_PCT = 10.0
+# Default drill-down: the first dimension in this order that the question does not fix
+DRILL_ORDER = ("dept", "category", "project_id", "year", "quarter")
+
+GROUP_KEYWORDS = [
+    ("dept", ["theo phòng ban", "by dept", "by department", "per dept", "từng phòng ban"]),
+    ("category", ["theo hạng mục", "by category", "theo loại", "per category"]),
+    ("project_id", ["theo dự án", "by project", "per project", "từng dự án"]),
+    ("quarter", ["theo quý", "by quarter", "quarterly", "hàng quý"]),
+    ("year", ["theo năm", "by year", "yearly", "hàng năm"]),
+]
+CATEGORY_HINTS = ["category", "hạng mục", "loại chi phí", "khoản mục"]
+OVER_KEYWORDS = ["over budget", "vượt ngân sách", "vượt", "overspen", "exceed"]
+
+
+class BudgetCube:
+    """Materialized sums of approved/actual amounts for every subset of the dimensions.
+
+    Each cuboid maps a key (the values of its dimensions, in DIMENSIONS order)
+    to [approved, actual, rows], so a fully specified question is one dict
+    lookup and a roll-up or drill-down scans one small cuboid instead of the
+    budget table. The finest cuboid is kept exact; `refresh` diffs it against
+    a new table and `apply` takes added/removed rows, and only the changed
+    cells are propagated to the coarser cuboids.
+    """
+
+    def __init__(self, df: pd.DataFrame, dimensions: Sequence[str] = DIMENSIONS):
+        self.dimensions = tuple(d for d in dimensions if d in df)
+        self.cuboids: Dict[Tuple[str, ...], Dict[tuple, List[float]]] = {
+            dims: {} for r in range(len(self.dimensions) + 1) for dims in combinations(self.dimensions, r)
+        }
+        self._positions = {dims: tuple(self.dimensions.index(d) for d in dims) for dims in self.cuboids}
+        base = self._base_cells(df)
+        # Coarser cuboids come from the (already aggregated) base cells, not the raw rows
+        for key, cell in base.items():
+            self._add(key, cell)
+
+    def _base_cells(self, df: pd.DataFrame) -> Dict[tuple, List[float]]:
+        if df.empty:
+            return {}
+        measures = df.assign(_rows=1)[list(self.dimensions) + ["approved_amount", "actual_spent", "_rows"]]
+        if not self.dimensions:
+            return {(): [float(measures["approved_amount"].sum()), float(measures["actual_spent"].sum()), len(df)]}
+        grouped = measures.groupby(list(self.dimensions), observed=True, sort=False).sum()
+        keys = grouped.index.tolist()
+        if len(self.dimensions) == 1:
+            keys = [(k,) for k in keys]
+        values = zip(grouped["approved_amount"].tolist(), grouped["actual_spent"].tolist(), grouped["_rows"].tolist())
+        return {key: [a, s, int(n)] for key, (a, s, n) in zip(keys, values)}
+
+    def _add(self, base_key: tuple, delta: Sequence[float]) -> None:
+        for dims, cells in self.cuboids.items():
+            key = tuple(base_key[i] for i in self._positions[dims])
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = [0.0, 0.0, 0]
+            cell[0] += delta[0]
+            cell[1] += delta[1]
+            cell[2] += delta[2]
+            if cell[2] <= 0:
+                del cells[key]
+
+    def apply(self, added: Optional[pd.DataFrame] = None, removed: Optional[pd.DataFrame] = None) -> int:
+        """Fold inserted and deleted budget rows into the cube; returns the number of base cells touched"""
+        deltas: Dict[tuple, List[float]] = {}
+        for frame, sign in ((added, 1), (removed, -1)):
+            if frame is None:
+                continue
+            for key, (a, s, n) in self._base_cells(frame).items():
+                d = deltas.setdefault(key, [0.0, 0.0, 0])
+                d[0] += sign * a
+                d[1] += sign * s
+                d[2] += sign * n
+        for key, delta in deltas.items():
+            self._add(key, delta)
+        return len(deltas)
+
+    def refresh(self, df: pd.DataFrame) -> int:
+        """Bring the cube in line with `df`, propagating only base cells whose sums changed"""
+        base = self.cuboids[self.dimensions]
+        new = self._base_cells(df)
+        changed = 0
+        for key in set(base) | set(new):
+            old = base.get(key, [0.0, 0.0, 0])
+            cur = new.get(key, [0.0, 0.0, 0])
+            if old != cur:
+                self._add(key, [cur[0] - old[0], cur[1] - old[1], cur[2] - old[2]])
+                if key in base:
+                    base[key][:2] = cur[:2]  # keep the finest level exact; drift stays in the coarse sums
+                changed += 1
+        return changed
+
+    def values(self, dim: str) -> List[Any]:
+        return sorted(k[0] for k in self.cuboids[(dim,)]) if dim in self.dimensions else []
+
+    def rollup(self, by: Sequence[str] = (), **filters: Any) -> List[Dict[str, Any]]:
+        """One row per combination of `by` within `filters` (dimension=value), largest approved first"""
+        filters = {d: v for d, v in filters.items() if v is not None}
+        unknown = [d for d in list(by) + list(filters) if d not in self.dimensions]
+        if unknown:
+            raise ValueError(f"Unknown budget dimension(s): {', '.join(unknown)}")
+        dims = tuple(d for d in self.dimensions if d in filters or d in by)
+        cells = self.cuboids[dims]
+        if all(d in filters for d in dims):
+            key = tuple(filters[d] for d in dims)
+            matches = [(key, cells[key])] if key in cells else []
+        else:
+            wanted = [(i, filters[d]) for i, d in enumerate(dims) if d in filters]
+            matches = [(k, c) for k, c in cells.items() if all(k[i] == v for i, v in wanted)]
+        rows = [_measures(dict(zip(dims, key)), cell) for key, cell in matches]
+        rows.sort(key=lambda r: -r["approved"])
+        for row in rows:
+            for d in filters:
+                row.pop(d, None)
+        return rows
+
+    def cell(self, **filters: Any) -> Optional[Dict[str, Any]]:
+        """Totals for exactly `filters`, or None when no budget row matches"""
+        rows = self.rollup((), **filters)
+        return rows[0] if rows else None
+
+    def drill_down(self, dim: str, **filters: Any) -> List[Dict[str, Any]]:
+        """Split the cell given by `filters` along one more dimension"""
+        return self.rollup((dim,), **filters)
+
+
+def _measures(labels: Dict[str, Any], cell: Sequence[float]) -> Dict[str, Any]:
+    approved, actual, count = cell
+    variance = approved - actual
+    pct = variance / approved * 100 if approved else 0.0
+    return {**labels, "approved": approved, "actual": actual, "rows": int(count), "variance": variance,
+            "variance_pct": pct, "over_policy": abs(pct) > VARIANCE_POLICY_PCT}
+
+
+_CUBES: Dict[str, Tuple[float, BudgetCube]] = {}
+_CUBES_LOCK = threading.Lock()
+
+
+def get_budget_cube(path: str = "data/budgets_extended.csv") -> BudgetCube:
+    """Cube for the CSV; when the file changes it is refreshed incrementally rather than rebuilt"""
+    key = os.path.abspath(path)
+    mtime = os.path.getmtime(path)
+    with _CUBES_LOCK:
+        cached = _CUBES.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        frame = pd.read_csv(path)
+        if cached:
+            cached[1].refresh(frame)
+            cube = cached[1]
+        else:
+            cube = BudgetCube(frame)
+        _CUBES[key] = (mtime, cube)
+        return cube
+
+
+def _quarter_of(period: pd.Period) -> Tuple[str, int]:
+    return f"Q{period.quarter}", period.year
+
+
+def parse_budget_query(text: str, cube: BudgetCube, as_of: Any = None) -> Dict[str, Any]:
+    """Dimension filters and grouping from a question.
+
+    Known department/category/project values are matched by name ("Marketing"
+    is a department unless the question talks about categories), quarters as
+    Q1-Q4 / "quý 2", "this/last quarter" and "quý này/trước" relative to
+    `as_of` (default today), years as 20xx. "theo phòng ban", "by category"
+    etc. set the grouping and "vượt"/"over budget" keeps only the groups
+    that spent more than approved.
+    """
+    lowered = text.lower()
+    today = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp.today()
+    filters: Dict[str, Any] = {}
+
+    def match(dim: str) -> Optional[Any]:
+        for value in sorted(cube.values(dim), key=lambda v: -len(str(v))):
+            if re.search(rf"(?<!\w){re.escape(str(value).lower())}(?!\w)", lowered):
+                return value
+        return None
+
+    dept, category = match("dept"), match("category")
+    if dept is not None and category is not None and str(dept) == str(category):
+        if any(h in lowered for h in CATEGORY_HINTS):
+            dept = None
+        else:
+            category = None
+    filters["dept"], filters["category"] = dept, category
+    project = re.search(r"project[_\s]*(\d+)|dự án\s*(\d+)", lowered)
+    if project and "project_id" in cube.dimensions:
+        number = int(project.group(1) or project.group(2))
+        ids = {str(v).lower(): v for v in cube.values("project_id")}
+        filters["project_id"] = ids.get(f"project_{number:03d}", ids.get(str(number)))
+
+    if any(p in lowered for p in ("this quarter", "quý này", "current quarter")):
+        filters["quarter"], filters["year"] = _quarter_of(today.to_period("Q"))
+    elif any(p in lowered for p in ("last quarter", "quý trước", "previous quarter")):
+        filters["quarter"], filters["year"] = _quarter_of(today.to_period("Q") - 1)
+    else:
+        quarter = re.search(r"\bq([1-4])\b|quý\s*([1-4])", lowered)
+        if quarter:
+            filters["quarter"] = f"Q{quarter.group(1) or quarter.group(2)}"
+        year = re.search(r"\b(20\d{2})\b", lowered)
+        if year:
+            filters["year"] = int(year.group(1))
+        elif any(p in lowered for p in ("this year", "năm nay")):
+            filters["year"] = today.year
+
+    group_by = next((dim for dim, words in GROUP_KEYWORDS if any(w in lowered for w in words)), None)
+    filters = {d: v for d, v in filters.items() if d in cube.dimensions and v is not None}
+    if group_by not in cube.dimensions:
+        group_by = next((d for d in DRILL_ORDER if d in cube.dimensions and d not in filters), None)
+    return {"filters": filters, "group_by": group_by,
+            "only_over": any(w in lowered for w in OVER_KEYWORDS)}
+
+
+def _latest_period(cube: BudgetCube, filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Most recent (year, quarter) that has rows for the non-time filters"""
+    rest = {d: v for d, v in filters.items() if d not in ("quarter", "year")}
+    if not {"quarter", "year"} <= set(cube.dimensions):
+        return None
+    periods = [(r["year"], r["quarter"]) for r in cube.rollup(("year", "quarter"), **rest)]
+    if not periods:
+        return None
+    year, quarter = max(periods)
+    return {**rest, "year": year, "quarter": quarter}
+
+
+def _line(label: str, row: Dict[str, Any]) -> str:
+    flag = f" ⚠️ outside ±{VARIANCE_POLICY_PCT:.0f}% policy" if row["over_policy"] else ""
+    return (f"- {label}: approved {row['approved']:,.2f}, actual {row['actual']:,.2f}, "
+            f"variance {row['variance']:,.2f} ({row['variance_pct']:+.1f}%){flag}")
+
+
+def answer_budget_query(cube: BudgetCube, text: str, as_of: Any = None, limit: int = 10) -> str:
+    """Budget totals for the cell a question names, drilled down one level"""
+    spec = parse_budget_query(text, cube, as_of=as_of)
+    filters, group_by = spec["filters"], spec["group_by"]
+    note = ""
+    total = cube.cell(**filters)
+    if total is None and ("quarter" in filters or "year" in filters):
+        latest = _latest_period(cube, filters)
+        if latest:
+            period = " ".join(str(filters[d]) for d in ("quarter", "year") if d in filters)
+            note = (f"No budget rows for {period}; showing the latest period with data "
+                    f"({latest['quarter']} {latest['year']}).\n")
+            filters = latest
+            total = cube.cell(**filters)
+    scope = ", ".join(f"{d}={v}" for d, v in filters.items()) or "all budgets"
+    if total is None:
+        return f"No budget rows match {scope}."
+
+    lines = [note + f"Budget summary for {scope} (variance = approved - actual, {total['rows']} rows):",
+             _line("Total", total)]
+    if group_by and group_by not in filters:
+        rows = cube.drill_down(group_by, **filters)
+        if spec["only_over"]:
+            rows = sorted((r for r in rows if r["variance"] < 0), key=lambda r: r["variance_pct"])
+        lines.append(f"By {group_by}" + (f" (top {limit} of {len(rows)})" if len(rows) > limit else "") + ":")
+        lines += [_line(str(r[group_by]), r) for r in rows[:limit]] or ["- (none)"]
+    return "\n".join(lines)
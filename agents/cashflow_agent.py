@@ -1,3 +1,4 @@
+import os
 import pandas as pd
 import numpy as np
 from typing import Dict, Any, List, Optional
@@ -8,141 +9,13 @@ from langchain.agents import Tool
 from langchain.agents import AgentExecutor, create_openai_functions_agent
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.pydantic_v1 import BaseModel, Field
-from langchain_core.messages import AIMessage, HumanMessage
-from langchain_openai import ChatOpenAI  # For OpenAI models
-from langchain_community.llms import Ollama  # For local Ollama models
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from agents.llm import get_llm
+from agents.cashflow_model import CASHFLOW_PATH, CashFlowPredictor, load_cashflow_data
+from agents.cashflow_scenarios import compare_scenarios
+from agents.cashflow_simulation import format_runway_report, simulate_cash_runway
+from agents.tool_runtime import data_version, make_parallel_tool, memoized, merge_outputs, run_parallel
 _ = load_dotenv()
-def load_cashflow_data(path: str = "data/cashflow_data.csv") -> pd.DataFrame:
-    """Load cash flow data"""
-    try:
-        df = pd.read_csv(path)
-        # Ensure numeric columns are float
-        numeric_cols = ['revenue', 'operating_expenses', 'capital_expenditures', 'net_cashflow', 'cash_balance']
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        return df
-    except Exception:
-        # Fallback data if file doesn't exist
-        return pd.DataFrame({
-            "date": pd.date_range(start="2024-01-01", periods=3),
-            "quarter": ["Q1", "Q1", "Q1"],
-            "revenue": [100000.0, 120000.0, 95000.0],
-            "operating_expenses": [80000.0, 85000.0, 75000.0],
-            "capital_expenditures": [10000.0, 5000.0, 15000.0],
-            "net_cashflow": [10000.0, 30000.0, 5000.0],
-            "cash_balance": [500000.0, 530000.0, 535000.0]
-        })
-
-class CashFlowPredictor:
-    """ML model for predicting future cash flows"""
-    
-    def __init__(self):
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.scaler = StandardScaler()
-        self._is_trained = False
-
-    def _prepare_features(self, df: pd.DataFrame) -> np.ndarray:
-        """Extract and prepare features for prediction"""
-        df = df.copy()
-        if 'date' not in df.columns:
-            df['date'] = pd.date_range(end=datetime.now(), periods=len(df))
-            
-        # Convert date column to datetime if it's not already
-        df['date'] = pd.to_datetime(df['date'])
-            
-        # Create temporal features
-        df['month'] = df['date'].dt.month
-        df['day_of_week'] = df['date'].dt.dayofweek
-        df['quarter'] = df['date'].dt.quarter
-        df['day_of_month'] = df['date'].dt.day
-        
-        # Ensure numeric columns are float
-        numeric_cols = ['revenue', 'operating_expenses', 'capital_expenditures', 'net_cashflow']
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        # Calculate rolling means for numeric columns only
-        for col in numeric_cols:
-            if col in df.columns:
-                df[f'{col}_7d_mean'] = df[col].rolling(window=7, min_periods=1).mean()
-                df[f'{col}_30d_mean'] = df[col].rolling(window=30, min_periods=1).mean()
-        
-        # Start with numeric features
-        numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns
-        base_features = [col for col in numeric_cols if col not in ['cash_balance']]
-        
-        if not base_features:
-            raise ValueError("No numeric features found in the data")
-            
-        # Create initial feature DataFrame
-        X = df[base_features].fillna(method='ffill').fillna(0)
-        
-        # Add temporal features
-        if 'month' in df.columns:
-            X['month'] = df['month'].astype(float)
-        if 'day_of_week' in df.columns:
-            X['day_of_week'] = df['day_of_week'].astype(float)
-        if 'day_of_month' in df.columns:
-            X['day_of_month'] = df['day_of_month'].astype(float)
-            
-        # Handle quarter with one-hot encoding
-        if 'quarter' in df.columns:
-            quarter_dummies = pd.get_dummies(df['quarter'], prefix='quarter')
-            X = pd.concat([X, quarter_dummies], axis=1)
-            
-        return self.scaler.fit_transform(X.astype(float))
-
-    def train(self, df: pd.DataFrame, prediction_days: int = 30) -> None:
-        """Train the model on historical data"""
-        if df.empty:
-            raise ValueError("No data provided for training")
-            
-        X = self._prepare_features(df)
-        y = df['net_cashflow'].shift(-prediction_days).fillna(method='ffill')
-        
-        X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42)
-        self.model.fit(X_train, y_train)
-        self._is_trained = True
-
-    def predict(self, df: pd.DataFrame, days_ahead: int = 30) -> pd.DataFrame:
-        """Generate predictions for future cash flows"""
-        if not self._is_trained:
-            self.train(df)
-            
-        # Generate future dates
-        last_date = pd.to_datetime(df['date'].max())
-        future_dates = pd.date_range(start=last_date + timedelta(days=1), periods=days_ahead)
-        
-        # Create feature dataframe for prediction
-        # Use last 30 days as base for rolling features
-        future_df = df.tail(30).copy()
-        
-        # Create future data with all necessary columns
-        future_data = pd.DataFrame({
-            'date': future_dates,
-            'quarter': [f'Q{(d.month-1)//3 + 1}' for d in future_dates],
-            'revenue': [0] * days_ahead,  # Placeholder values
-            'operating_expenses': [0] * days_ahead,
-            'capital_expenditures': [0] * days_ahead,
-            'net_cashflow': [0] * days_ahead
-        })
-        
-        # Combine historical and future data
-        future_df = pd.concat([future_df, future_data]).reset_index(drop=True)
-        
-        # Prepare features and make predictions
-        X_future = self._prepare_features(future_df)
-        predictions = self.model.predict(X_future[-days_ahead:])
-        
-        return pd.DataFrame({
-            'date': future_dates,
-            'predicted_cashflow': predictions
-        })
 
 
 def analyze_cashflow_trends(df: pd.DataFrame) -> str:
@@ -217,38 +90,98 @@ def cashflow_tool(query: str) -> str:
     df = load_cashflow_data()
     return analyze_cashflow_trends(df)
 
+def _days_from_input(value: Any, default: int) -> int:
+    """Read a number of days from a tool input (dict, number or free text)"""
+    if isinstance(value, dict):
+        value = value.get('days', default)
+    digits = ''.join(ch if ch.isdigit() else ' ' for ch in str(value)).split()
+    return int(digits[0]) if digits else default
+
+
 # LangChain Tools and Agent Setup
 class PredictionRequest(BaseModel):
     days: int = Field(default=30, description="Number of days to predict ahead")
 
+def _tools_version(tools: "CashFlowTools", *args, **kwargs):
+    """Memo key part for CashFlowTools methods: the data file version it loaded and the model state"""
+    return tools.data_version, tools.predictor.version
+
+
 class CashFlowTools:
+    # Results are memoized by arguments, the version of the data file that was
+    # loaded and the predictor's version, so repeated calls within and across
+    # runs are reused and a reload or retrain gets fresh results
     def __init__(self):
         self.predictor = CashFlowPredictor()
+        self.data_version = data_version([CASHFLOW_PATH])
         self.df = load_cashflow_data()
+        # A history too short to train on disables the ML forecast instead of breaking the agent
+        self.model_error: Optional[str] = "Không có dữ liệu cash flow." if self.df.empty else None
         if not self.df.empty:
-            self.predictor.train(self.df)
+            try:
+                self.predictor.train(self.df)
+            except ValueError as e:
+                self.model_error = str(e)
 
+    @memoized(version=_tools_version)
     def analyze_current_cashflow(self) -> str:
         """Analyze current cash flow situation and trends"""
         return analyze_cashflow_trends(self.df)
 
+    @memoized(version=_tools_version)
     def predict_cashflow(self, days: int = 30) -> str:
         """Predict future cash flows using ML model"""
-        predictions = self.predictor.predict(self.df, days_ahead=days)
+        if self.model_error:
+            return f"Không đủ lịch sử để dự báo bằng mô hình ML: {self.model_error}"
+        predictions = self.predictor.predict(self.df, days_ahead=days)['predicted_cashflow'].dropna()
+        covered = len(predictions)
         
-        total_predicted = predictions['predicted_cashflow'].sum()
-        avg_daily = predictions['predicted_cashflow'].mean()
-        trend = "tăng" if predictions['predicted_cashflow'].iloc[-1] > predictions['predicted_cashflow'].iloc[0] else "giảm"
+        total_predicted = predictions.sum()
+        avg_daily = predictions.mean()
+        trend = "tăng" if predictions.iloc[-1] > predictions.iloc[0] else "giảm"
+        note = "" if covered == days else f"\n*Lịch sử chỉ đủ để dự báo {covered} ngày đầu; các ngày sau bị bỏ qua*\n"
         
         return f"""
-**Dự báo dòng tiền {days} ngày tới:**
+**Dự báo dòng tiền {covered} ngày tới:**
 
 - Tổng dòng tiền dự kiến: ${total_predicted:,.2f}
 - Trung bình mỗi ngày: ${avg_daily:,.2f}
 - Xu hướng: {trend}
 
 *Dự báo dựa trên mô hình ML được huấn luyện từ dữ liệu lịch sử*
-"""
+{note}"""
+
+    @memoized(version=_tools_version)
+    def simulate_runway(self, horizon_days: int = 30, days: int = 365) -> str:
+        """Monte Carlo simulation of liquidity-floor breach probability and cash runway"""
+        result = simulate_cash_runway(self.df, days=max(days, horizon_days), horizon_days=horizon_days)
+        return format_runway_report(result)
+
+    @memoized(version=_tools_version)
+    def compare_scenarios(self, text: str, horizon_days: int = 90) -> str:
+        """Evaluate what-if scenarios against the ML forecast in one vectorized pass"""
+        forecast = None
+        if not self.model_error:
+            forecast = self.predictor.predict_many(range(1, horizon_days + 1))['predicted_cashflow']
+        return compare_scenarios(self.df, text, horizon=horizon_days, forecast=forecast)
+
+    def overview(self, days: int = 30) -> str:
+        """Current analysis and the ML forecast computed concurrently, merged into one report"""
+        return merge_outputs(run_parallel([
+            ("analyze_cashflow", self.analyze_current_cashflow, (), {}),
+            ("predict_cashflow", self.predict_cashflow, (), {"days": days}),
+        ]))
+
+    def forecast_company_ocf(self, ticker: str) -> str:
+        """Next-quarter operating cash flow of an S&P 500 company from the LSTM service"""
+        from deep_learning.inference import get_service  # torch is only needed when enabled
+
+        ticker = str(ticker).strip().strip("'\"").upper()
+        try:
+            value = get_service().forecast_ticker(ticker)
+        except KeyError as e:
+            return str(e)
+        return f"Dự báo dòng tiền hoạt động quý tới của {ticker} (LSTM): ${value:,.0f}"
 
 
 class CashFlowAgentExecutor:
@@ -258,31 +191,57 @@ class CashFlowAgentExecutor:
         self.tools = CashFlowTools()
         
         # Set up the language model
-        if use_local:
-            # Use local Ollama model
-            self.llm = Ollama(model="llama2")  # or another model you have in Ollama
-        else:
-            # Use OpenAI model
-            self.llm = ChatOpenAI(
-                model_name=model_name,
-                temperature=0.7,
-                streaming=True,
-                verbose = True
-            )
+        # use_local forces Ollama; otherwise MAS_LLM_PROVIDER decides (OpenAI by default)
+        self.llm = get_llm(model=model_name, temperature=0.7, streaming=True,
+                           provider="ollama" if use_local else None)
         
         # Define LangChain tools
         self.langchain_tools = [
             Tool(
                 name="analyze_cashflow",
-                func=self.tools.analyze_current_cashflow,
+                func=lambda _: self.tools.analyze_current_cashflow(),
                 description="Analyze current cash flow patterns and trends"
             ),
             Tool(
                 name="predict_cashflow",
-                func=lambda x: self.tools.predict_cashflow(days=x.get('days', 30)),
+                func=lambda x: self.tools.predict_cashflow(days=_days_from_input(x, 30)),
                 description="Predict future cash flows using ML model"
-            )
+            ),
+            Tool(
+                name="simulate_cash_runway",
+                func=lambda x: self.tools.simulate_runway(horizon_days=_days_from_input(x, 30)),
+                description="Monte Carlo simulation of the cash balance: probability of dropping below "
+                            "the 2:1 liquidity floor within N days (input: N), balance quantiles and cash runway"
+            ),
+            Tool(
+                name="compare_scenarios",
+                func=lambda x: self.tools.compare_scenarios(str(x)),
+                description="Compare what-if scenarios against the 90-day forecast in one call. Input: scenarios "
+                            "separated by ';', e.g. 'revenue -10%, capex delayed a quarter, opex +5%; revenue -20%'"
+            ),
+            Tool(
+                name="cashflow_overview",
+                func=lambda x: self.tools.overview(days=_days_from_input(x, 30)),
+                description="Current cash flow analysis plus the ML forecast for N days (input: N, default 30), "
+                            "computed in parallel. Use for general updates instead of calling both tools"
+            ),
         ]
+        if os.getenv("LSTM_CHECKPOINT"):
+            self.langchain_tools.append(Tool(
+                name="forecast_company_ocf",
+                func=self.tools.forecast_company_ocf,
+                description="Forecast next-quarter operating cash flow of an S&P 500 company with the LSTM model. "
+                            "Input: ticker symbol, e.g. 'AAPL'"
+            ))
+        # Independent tools in one step: one function call, one merged observation
+        parallel = make_parallel_tool({t.name: t.func for t in self.langchain_tools})
+        self.langchain_tools.append(Tool(
+            name="run_tools_in_parallel",
+            func=parallel,
+            description="Run several of the other tools concurrently in one step. Input: calls separated by '|', "
+                        "e.g. 'simulate_cash_runway: 60 | predict_cashflow: 90', or a JSON list of "
+                        "{\"tool\": ..., \"input\": ...}. Returns every output, one section per tool"
+        ))
         system_prompt = """
         You are a highly advanced AI Financial Analyst... 
         ... (paste the full detailed prompt from above here) ...
@@ -311,7 +270,10 @@ class CashFlowAgentExecutor:
         2.  **Select and Use Tools Methodically:**
             - For questions about the **current situation, recent trends, or historical data**, your primary tool is `analyze_cashflow`.
             - For questions about **forecasts, projections, or future planning** (e.g., "next 30 days," "next quarter"), your primary tool is `predict_cashflow`. You can adjust the `days` parameter if the user specifies a different timeframe.
-            - If the user's request is general (e.g., "Give me a cash flow update" or "How are we doing?"), you should use **both** tools to provide a complete picture of the present and the future.
+            - For questions about **risk, uncertainty, liquidity or runway** (e.g., "probability we drop below the liquidity floor in 30 days"), use `simulate_cash_runway` with the number of days as input.
+            - For **what-if / scenario** questions (e.g., "what if revenue drops 10% and capex is delayed a quarter?"), use `compare_scenarios` once with all scenarios separated by ';' instead of asking per scenario.
+            - If the user's request is general (e.g., "Give me a cash flow update" or "How are we doing?"), use `cashflow_overview`, which returns both the current analysis and the forecast in one call.
+            - When you need several other tools whose inputs do not depend on each other, call `run_tools_in_parallel` once instead of calling them one after another.
         3.  **Synthesize and Structure the Response:** Do not simply output the raw text from the tools. You must process the information and present it in the following structured format. Your final output should be in the same language as the user's query.
 
         **Required Output Structure:**
@@ -355,12 +317,16 @@ class CashFlowAgentExecutor:
 
     def invoke(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         query = inputs.get("input", "")
+        # Session history arrives already bounded (recent turns + rolling summary)
+        message_types = {"user": HumanMessage, "assistant": AIMessage, "system": SystemMessage}
+        chat_history = [message_types[m["role"]](content=m["content"])
+                        for m in inputs.get("chat_history") or [] if m.get("role") in message_types]
         
         try:
             # Run query through AI agent
             result = self.agent_executor.invoke({
                 "input": query,
-                "chat_history": []
+                "chat_history": chat_history
             })
             return {"output": result["output"]}
             
@@ -0,0 +1,196 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from agents.cashflow_model import CashFlowPredictor, load_cashflow_data
+
+
+DEFAULT_HORIZONS = (1, 7, 30)
+
+# Per-process copy of the history, shipped once through the pool initializer
+_WORKER_DF: Optional[pd.DataFrame] = None
+
+
+def synthetic_cashflow_history(n_days: int, seed: int = 42, start: str = "2020-01-01") -> pd.DataFrame:
+    """Daily cash-flow history with the same distributions as cashflow_data.csv"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start=start, periods=n_days, freq="D")
+    revenue = rng.lognormal(12, 0.5, n_days)
+    opex = rng.lognormal(11.5, 0.4, n_days)
+    capex = np.where(rng.random(n_days) < 0.3, rng.lognormal(10, 1, n_days), 0.0)
+    net = revenue - opex - capex
+    balance = rng.lognormal(13, 0.5) + np.cumsum(net)
+    return pd.DataFrame({
+        "date": dates.strftime("%Y-%m-%d"),
+        "quarter": "Q" + dates.quarter.astype(str),
+        "revenue": revenue.round(2),
+        "operating_expenses": opex.round(2),
+        "capital_expenditures": capex.round(2),
+        "net_cashflow": net.round(2),
+        "cash_balance": balance.round(2),
+    })
+
+
+def walk_forward_origins(n_rows: int, n_folds: int, min_train: int, max_horizon: int) -> List[int]:
+    """Evenly spaced forecast origins (= training set sizes) for walk-forward folds.
+
+    The last origin leaves `max_horizon` rows after it so every horizon of
+    every fold can be scored.
+    """
+    last = n_rows - max_horizon
+    if last < min_train:
+        raise ValueError(
+            f"Need at least {min_train + max_horizon} rows for min_train={min_train} "
+            f"and horizon {max_horizon}, got {n_rows}"
+        )
+    origins = np.linspace(min_train, last, num=max(1, n_folds)).round().astype(int)
+    return sorted(set(origins.tolist()))
+
+
+def _init_worker(df: pd.DataFrame) -> None:
+    global _WORKER_DF
+    _WORKER_DF = df
+
+
+def _run_fold(task: Dict[str, Any]) -> Dict[str, Any]:
+    df = _WORKER_DF
+    origin = task["origin"]
+    horizons = np.asarray(task["horizons"], dtype=int)
+    start = 0 if task["train_window"] is None else max(0, origin - task["train_window"])
+    train_df = df.iloc[start:origin]
+
+    predictor = CashFlowPredictor(**task["params"])
+    t0 = time.perf_counter()
+    predictor.train(train_df, prediction_days=int(horizons.max()))
+    fit_seconds = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    forecast = predictor.predict_many(horizons)
+    predict_seconds = time.perf_counter() - t0
+
+    actual = df["net_cashflow"].to_numpy(dtype=float)[origin - 1 + horizons]
+    return {
+        "config": task["config"],
+        "origin": origin,
+        "train_rows": len(train_df),
+        "horizons": horizons.tolist(),
+        "predicted": forecast["predicted_cashflow"].to_numpy().tolist(),
+        "actual": actual.tolist(),
+        "fit_seconds": fit_seconds,
+        "predict_seconds": predict_seconds,
+    }
+
+
+def backtest(
+    df: pd.DataFrame,
+    configs: Optional[Dict[str, Dict[str, Any]]] = None,
+    horizons: Sequence[int] = DEFAULT_HORIZONS,
+    n_folds: int = 5,
+    min_train: Optional[int] = None,
+    train_window: Optional[int] = None,
+    max_workers: Optional[int] = None,
+) -> Dict[str, pd.DataFrame]:
+    """Walk-forward evaluation of CashFlowPredictor configurations.
+
+    `configs` maps a name to CashFlowPredictor keyword arguments. Folds use
+    an expanding window, or a sliding one of `train_window` rows. Every
+    (config, fold) pair is fitted in its own process.
+
+    Returns {"folds": per fold/horizon errors, "summary": MAE/MAPE and
+    latency per config and horizon}.
+    """
+    configs = configs or {"default": {}}
+    horizons = sorted({int(h) for h in horizons})
+    max_horizon = horizons[-1]
+    if min_train is None:
+        min_train = max(60, len(df) // 3)
+    origins = walk_forward_origins(len(df), n_folds, min_train, max_horizon)
+
+    tasks = [
+        {"config": name, "params": params, "origin": origin,
+         "horizons": horizons, "train_window": train_window}
+        for name, params in configs.items()
+        for origin in origins
+    ]
+    max_workers = max_workers or min(len(tasks), os.cpu_count() or 1)
+    if max_workers <= 1:
+        _init_worker(df)
+        results = [_run_fold(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(df,)) as pool:
+            results = list(pool.map(_run_fold, tasks))
+
+    folds = pd.DataFrame([
+        {
+            "config": r["config"],
+            "origin": r["origin"],
+            "train_rows": r["train_rows"],
+            "horizon": h,
+            "predicted": p,
+            "actual": a,
+            "fit_seconds": r["fit_seconds"],
+            "predict_seconds": r["predict_seconds"],
+        }
+        for r in results
+        for h, p, a in zip(r["horizons"], r["predicted"], r["actual"])
+    ])
+    folds["abs_error"] = (folds["predicted"] - folds["actual"]).abs()
+    nonzero = folds["actual"].abs() > 1e-9
+    folds["ape"] = np.where(nonzero, folds["abs_error"] / folds["actual"].abs().where(nonzero, 1.0), np.nan)
+
+    summary = folds.groupby(["config", "horizon"]).agg(
+        mae=("abs_error", "mean"),
+        mape=("ape", "mean"),
+        folds=("origin", "nunique"),
+        fit_seconds=("fit_seconds", "mean"),
+        predict_ms=("predict_seconds", lambda s: s.mean() * 1000),
+    ).reset_index()
+    return {"folds": folds, "summary": summary}
+
+
+def parse_config(spec: str) -> Dict[str, Dict[str, Any]]:
+    """Parse 'name:key=value,key=value' into {name: {key: value}}"""
+    name, _, params = spec.partition(":")
+    parsed: Dict[str, Any] = {}
+    for item in filter(None, params.split(",")):
+        key, _, raw = item.partition("=")
+        value: Any = raw
+        for cast in (int, float):
+            try:
+                value = cast(raw)
+                break
+            except ValueError:
+                continue
+        if raw in ("None", "none"):
+            value = None
+        parsed[key.strip()] = value
+    return {name.strip(): parsed}
+
+
+def compare_configs(summary: pd.DataFrame, metric: str = "mae") -> pd.DataFrame:
+    """One row per config: `metric` per horizon plus mean fit/predict latency"""
+    table = summary.pivot(index="config", columns="horizon", values=metric)
+    table.columns = [f"{metric}_h{h}" for h in table.columns]
+    timing = summary.groupby("config")[["fit_seconds", "predict_ms"]].mean()
+    return table.join(timing)
+
+
+def run_backtest(
+    path: Optional[str] = "data/cashflow_data.csv",
+    synthetic_days: Optional[int] = None,
+    config_specs: Iterable[str] = (),
+    **kwargs: Any,
+) -> Dict[str, pd.DataFrame]:
+    """Backtest on a CSV history or, with `synthetic_days`, a generated one"""
+    if synthetic_days:
+        df = synthetic_cashflow_history(synthetic_days)
+    else:
+        df = load_cashflow_data(path)
+    configs: Dict[str, Dict[str, Any]] = {}
+    for spec in config_specs:
+        configs.update(parse_config(spec))
+    return backtest(df, configs=configs or None, **kwargs)
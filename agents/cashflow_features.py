@@ -0,0 +1,210 @@
+import math
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+
+NUMERIC_COLUMNS = ['revenue', 'operating_expenses', 'capital_expenditures', 'net_cashflow']
+ROLLING_WINDOWS = (7, 30)
+CALENDAR_COLUMNS = ['month', 'day_of_week', 'day_of_month']
+QUARTER_COLUMNS = [f'quarter_{q}' for q in range(1, 5)]
+
+# Fixed feature layout so fit and transform always agree on columns,
+# whatever quarters happen to be present in the frame.
+FEATURE_COLUMNS: List[str] = (
+    NUMERIC_COLUMNS
+    + [f'{col}_{w}d_mean' for col in NUMERIC_COLUMNS for w in ROLLING_WINDOWS]
+    + CALENDAR_COLUMNS
+    + QUARTER_COLUMNS
+)
+
+# Number of trailing rows that fully determine the last feature row
+FEATURE_LOOKBACK = max(ROLLING_WINDOWS)
+
+
+def build_feature_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Build the unscaled feature frame (one row per day, FEATURE_COLUMNS order)"""
+    if 'date' in df.columns:
+        dates = pd.to_datetime(df['date']).reset_index(drop=True)
+    else:
+        dates = pd.Series(pd.date_range(end=datetime.now(), periods=len(df)))
+
+    X = pd.DataFrame(index=range(len(df)))
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors='coerce').reset_index(drop=True)
+        else:
+            values = pd.Series(np.nan, index=X.index)
+        X[col] = values.astype(float)
+
+    # Rolling means for numeric columns only
+    for col in NUMERIC_COLUMNS:
+        for w in ROLLING_WINDOWS:
+            X[f'{col}_{w}d_mean'] = X[col].rolling(window=w, min_periods=1).mean()
+
+    X = X.ffill().fillna(0.0)
+
+    X['month'] = dates.dt.month.astype(float)
+    X['day_of_week'] = dates.dt.dayofweek.astype(float)
+    X['day_of_month'] = dates.dt.day.astype(float)
+
+    quarter = dates.dt.quarter.to_numpy()
+    for q, name in enumerate(QUARTER_COLUMNS, start=1):
+        X[name] = (quarter == q).astype(float)
+
+    return X[FEATURE_COLUMNS]
+
+
+class CashFlowFeaturePipeline:
+    """Feature pipeline for daily cash-flow frames: fit once, transform many.
+
+    The scaler is fitted on the training history only; later calls to
+    `transform` reuse those statistics instead of refitting.
+    """
+
+    def __init__(self):
+        self.scaler = StandardScaler()
+        self._is_fitted = False
+
+    @property
+    def is_fitted(self) -> bool:
+        return self._is_fitted
+
+    def fit(self, df: pd.DataFrame) -> "CashFlowFeaturePipeline":
+        self.scaler.fit(build_feature_frame(df).to_numpy(dtype=float))
+        self._is_fitted = True
+        return self
+
+    def fit_transform(self, df: pd.DataFrame) -> np.ndarray:
+        return self.fit_transform_rows(build_feature_frame(df).to_numpy(dtype=float))
+
+    def fit_transform_rows(self, rows: np.ndarray) -> np.ndarray:
+        self._is_fitted = True
+        return self.scaler.fit_transform(np.atleast_2d(np.asarray(rows, dtype=float)))
+
+    def transform(self, df: pd.DataFrame) -> np.ndarray:
+        return self.transform_rows(build_feature_frame(df).to_numpy(dtype=float))
+
+    def transform_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Scale feature rows that are already in FEATURE_COLUMNS order"""
+        if not self._is_fitted:
+            raise ValueError("Feature pipeline must be fitted before transform")
+        return self.scaler.transform(np.atleast_2d(np.asarray(rows, dtype=float)))
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class _RollingMean:
+    """Rolling mean over the last `window` values, skipping NaN like pandas.
+
+    The running sum is rebuilt from the window every `window` pushes so that
+    floating-point drift stays bounded on arbitrarily long histories.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: deque = deque(maxlen=window)
+        self.total = 0.0
+        self.count = 0
+        self._pushes = 0
+
+    def push(self, value: float) -> None:
+        if len(self.values) == self.window:
+            old = self.values[0]
+            if not math.isnan(old):
+                self.total -= old
+                self.count -= 1
+        self.values.append(value)
+        if not math.isnan(value):
+            self.total += value
+            self.count += 1
+        self._pushes += 1
+        if self._pushes % self.window == 0:
+            self.total = math.fsum(v for v in self.values if not math.isnan(v))
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else math.nan
+
+
+class CashFlowFeatureState:
+    """Incremental feature state for one daily cash-flow series.
+
+    Holds the rolling-window accumulators and the last feature row, so
+    appending a day costs O(1) regardless of history length. `update`
+    produces exactly the row `build_feature_frame` would produce for the
+    extended history. Keep one state per entity when tracking many series.
+    """
+
+    def __init__(self):
+        self.windows: Dict[str, List[_RollingMean]] = {
+            col: [_RollingMean(w) for w in ROLLING_WINDOWS] for col in NUMERIC_COLUMNS
+        }
+        self.last_row = np.zeros(len(FEATURE_COLUMNS))
+        self.last_date: Optional[pd.Timestamp] = None
+        self.n_rows = 0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, features: Optional[pd.DataFrame] = None) -> "CashFlowFeatureState":
+        """Initialise from a history; `features` may pass an already built feature frame"""
+        state = cls()
+        if df.empty:
+            return state
+        if features is None:
+            features = build_feature_frame(df)
+        tail = df.tail(FEATURE_LOOKBACK)
+        for col in NUMERIC_COLUMNS:
+            values = (
+                pd.to_numeric(tail[col], errors='coerce').to_numpy(dtype=float)
+                if col in tail.columns else np.full(len(tail), np.nan)
+            )
+            for acc in state.windows[col]:
+                for v in values[-acc.window:]:
+                    acc.push(float(v))
+        state.last_row = features.iloc[-1].to_numpy(dtype=float)
+        if 'date' in df.columns:
+            state.last_date = pd.Timestamp(pd.to_datetime(df['date']).iloc[-1])
+        state.n_rows = len(df)
+        return state
+
+    def update(self, row: Mapping[str, Any]) -> np.ndarray:
+        """Append one day of observations and return its feature row"""
+        if row.get('date') is not None:
+            date = pd.Timestamp(row['date'])
+        elif self.last_date is not None:
+            date = self.last_date + timedelta(days=1)
+        else:
+            date = pd.Timestamp(datetime.now())
+
+        prev = self.last_row
+        new = np.empty(len(FEATURE_COLUMNS))
+        idx = 0
+        # Raw values: forward-filled from the previous row (0 before any value)
+        for col in NUMERIC_COLUMNS:
+            value = _to_float(row.get(col))
+            new[idx] = prev[idx] if math.isnan(value) else value
+            for acc in self.windows[col]:
+                acc.push(value)
+            idx += 1
+        for col in NUMERIC_COLUMNS:
+            for acc in self.windows[col]:
+                mean = acc.mean()
+                new[idx] = prev[idx] if math.isnan(mean) else mean
+                idx += 1
+        new[idx:idx + 3] = (date.month, date.dayofweek, date.day)
+        idx += 3
+        new[idx:] = 0.0
+        new[idx + date.quarter - 1] = 1.0
+
+        self.last_row = new
+        self.last_date = date
+        self.n_rows += 1
+        return new
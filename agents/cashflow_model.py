@@ -0,0 +1,217 @@
+import threading
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from agents.cashflow_features import (
+    CashFlowFeaturePipeline,
+    CashFlowFeatureState,
+    FEATURE_LOOKBACK,
+    build_feature_frame,
+)
+
+
+CASHFLOW_PATH = "data/cashflow_data.csv"
+
+
+def load_cashflow_data(path: str = CASHFLOW_PATH) -> pd.DataFrame:
+    """Load cash flow data"""
+    try:
+        df = pd.read_csv(path)
+        # Ensure numeric columns are float
+        numeric_cols = ['revenue', 'operating_expenses', 'capital_expenditures', 'net_cashflow', 'cash_balance']
+        for col in numeric_cols:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+        return df
+    except Exception:
+        # Fallback data if file doesn't exist
+        return pd.DataFrame({
+            "date": pd.date_range(start="2024-01-01", periods=3),
+            "quarter": ["Q1", "Q1", "Q1"],
+            "revenue": [100000.0, 120000.0, 95000.0],
+            "operating_expenses": [80000.0, 85000.0, 75000.0],
+            "capital_expenditures": [10000.0, 5000.0, 15000.0],
+            "net_cashflow": [10000.0, 30000.0, 5000.0],
+            "cash_balance": [500000.0, 530000.0, 535000.0]
+        })
+
+
+def _direct_targets(values: np.ndarray, max_horizon: int) -> np.ndarray:
+    """Y[i, h-1] = values[i + h]; NaN where the horizon runs past the data"""
+    padded = np.concatenate([values[1:], np.full(max_horizon, np.nan)])
+    return np.lib.stride_tricks.sliding_window_view(padded, max_horizon)[:len(values)]
+
+
+class CashFlowPredictor:
+    """ML model for predicting future cash flows.
+
+    Uses direct multi-horizon forecasting: a single multi-output regressor
+    maps the feature row of day t to net cash flow at t+1 ... t+max_horizon,
+    so every horizon comes out of one `predict` call on one feature row.
+
+    Longer horizons use a separate model fitted once per range (rounded up to
+    LONG_RANGE_STEP days) and cached, so they never change the trained model
+    or the forecasts of shorter horizons: days up to `max_horizon` always come
+    from the trained model. Horizons past what the history can support are
+    NaN.
+    """
+
+    LONG_RANGE_STEP = 30
+
+    def __init__(self, n_estimators: int = 100, random_state: int = 42, **model_params):
+        self.model_params = dict(n_estimators=n_estimators, random_state=random_state, **model_params)
+        self.model = RandomForestRegressor(**self.model_params)
+        self.pipeline = CashFlowFeaturePipeline()
+        self.max_horizon = 0
+        self.state: Optional[CashFlowFeatureState] = None
+        self._history: Optional[pd.DataFrame] = None
+        self._appended: List[Mapping[str, Any]] = []
+        self._last_row: Optional[np.ndarray] = None
+        self._last_date: Optional[pd.Timestamp] = None
+        self._is_trained = False
+        self._long_models: Dict[int, RandomForestRegressor] = {}
+        # Bumped by train() and update(): forecasts from the same version are identical
+        self.version = 0
+        # Serializes everything that changes the model or its state
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _supported_horizon(n_rows: int, prediction_days: int) -> int:
+        """Direct targets need `prediction_days` rows after each training row; keep at least two rows"""
+        return max(1, min(prediction_days, n_rows - 2))
+
+    def _fit_model(self, X: np.ndarray, target: np.ndarray, prediction_days: int) -> RandomForestRegressor:
+        Y = _direct_targets(target, prediction_days)
+        valid = ~np.isnan(Y).any(axis=1)
+        if valid.sum() < 2:
+            raise ValueError(
+                f"Not enough history to train a {prediction_days}-day forecast ({len(target)} rows)"
+            )
+        model = RandomForestRegressor(**self.model_params)
+        model.fit(X[valid], Y[valid] if prediction_days > 1 else Y[valid, 0])
+        return model
+
+    def train(self, df: pd.DataFrame, prediction_days: int = 30) -> None:
+        """Train the model on historical data"""
+        with self._lock:
+            self._train(df, prediction_days)
+
+    def _train(self, df: pd.DataFrame, prediction_days: int) -> None:
+        if df.empty:
+            raise ValueError("No data provided for training")
+        if prediction_days < 1:
+            raise ValueError("prediction_days must be at least 1")
+
+        features = build_feature_frame(df)
+        X = self.pipeline.fit_transform_rows(features.to_numpy(dtype=float))
+        target = pd.to_numeric(df['net_cashflow'], errors='coerce').to_numpy(dtype=float)
+        prediction_days = self._supported_horizon(len(df), prediction_days)
+
+        self.model = self._fit_model(X, target, prediction_days)
+        self._long_models = {}
+        self.max_horizon = prediction_days
+        self.state = CashFlowFeatureState.from_frame(df, features=features)
+        self._history = df
+        self._appended = []
+        self._last_row = X[-1:]
+        self._last_date = self.state.last_date
+        self._is_trained = True
+        self.version += 1
+
+    def update(self, row: Mapping[str, Any]) -> None:
+        """Append one new day of observations without refitting.
+
+        Rolling features are maintained incrementally, so the cost does not
+        depend on the length of the history. Forecasts made with `df=None`
+        start from the appended day.
+        """
+        with self._lock:
+            if not self._is_trained:
+                raise ValueError("Model must be trained before appending observations")
+            self._last_row = self.pipeline.transform_rows(self.state.update(row))
+            self._last_date = self.state.last_date
+            self._appended.append(dict(row, date=self.state.last_date))
+            self.version += 1
+
+    def _training_frame(self) -> pd.DataFrame:
+        if not self._appended:
+            return self._history
+        return pd.concat([self._history, pd.DataFrame(self._appended)], ignore_index=True)
+
+    def _long_model(self, needed: int) -> Tuple[Optional[RandomForestRegressor], int]:
+        """Model for the days past `max_horizon` up to `needed`, and the range it covers.
+
+        Call with `self._lock` held.
+        """
+        if needed <= self.max_horizon:
+            return None, self.max_horizon
+        frame = self._training_frame()
+        step = self.LONG_RANGE_STEP
+        horizon = self._supported_horizon(len(frame), -(-needed // step) * step)
+        if horizon <= self.max_horizon:
+            return None, self.max_horizon
+        if horizon not in self._long_models:
+            target = pd.to_numeric(frame['net_cashflow'], errors='coerce').to_numpy(dtype=float)
+            self._long_models[horizon] = self._fit_model(self.pipeline.transform(frame), target, horizon)
+        return self._long_models[horizon], horizon
+
+    def _feature_row(self, df: Optional[pd.DataFrame]) -> np.ndarray:
+        if df is None or (df is self._history and not self._appended):
+            return self._last_row
+        # Only the trailing window influences the last feature row
+        return self.pipeline.transform(df.tail(FEATURE_LOOKBACK))[-1:]
+
+    def predict_many(self, horizons: Iterable[int], df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Forecast net cash flow for each requested horizon (in days) in one pass.
+
+        `df` is the history to forecast from; it defaults to the training data.
+        Horizons past what the history can support come back as NaN.
+        """
+        horizons = np.atleast_1d(np.asarray(list(horizons), dtype=int))
+        if horizons.size == 0:
+            raise ValueError("At least one horizon is required")
+        if (horizons < 1).any():
+            raise ValueError("Horizons must be positive numbers of days")
+
+        with self._lock:
+            if not self._is_trained:
+                if df is None:
+                    raise ValueError("Model is not trained and no data was provided")
+                self._train(df, prediction_days=30)
+            model, trained = self.model, self.max_horizon
+            long_model, covered = self._long_model(int(horizons.max()))
+            row = self._feature_row(df)
+            last_date = self._last_date
+
+        predictions = np.full(horizons.size, np.nan)
+        short = horizons <= trained
+        if short.any():
+            predictions[short] = np.asarray(model.predict(row)).reshape(-1)[horizons[short] - 1]
+        long = ~short & (horizons <= covered)
+        if long.any():
+            predictions[long] = np.asarray(long_model.predict(row)).reshape(-1)[horizons[long] - 1]
+        if df is not None and 'date' in df.columns:
+            last_date = pd.to_datetime(df['date']).max()
+        dates = (
+            pd.to_datetime(last_date) + pd.to_timedelta(horizons, unit='D')
+            if last_date is not None else pd.NaT
+        )
+
+        return pd.DataFrame({
+            'horizon': horizons,
+            'date': dates,
+            'predicted_cashflow': predictions
+        })
+
+    def predict(self, df: pd.DataFrame, days_ahead: int = 30) -> pd.DataFrame:
+        """Generate predictions for future cash flows"""
+        forecast = self.predict_many(range(1, days_ahead + 1), df=df)
+        last_date = pd.to_datetime(df['date'].max())
+        return pd.DataFrame({
+            'date': pd.date_range(start=last_date + timedelta(days=1), periods=days_ahead),
+            'predicted_cashflow': forecast['predicted_cashflow'].to_numpy()
+        })
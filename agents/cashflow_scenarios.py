@@ -0,0 +1,251 @@
+import itertools
+import re
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from agents.cashflow_simulation import LIQUIDITY_RATIO, OBLIGATION_DAYS
+
+
+# Scenario adjustments: fractional changes (-0.1 = -10%) and a capex delay in days
+ADJUSTMENTS = ("revenue_pct", "opex_pct", "capex_pct", "capex_delay_days")
+
+_UNIT_DAYS = {
+    "day": 1, "days": 1, "ngày": 1,
+    "week": 7, "weeks": 7, "tuần": 7,
+    "month": 30, "months": 30, "tháng": 30,
+    "quarter": 90, "quarters": 90, "quý": 90,
+}
+_PCT_PATTERNS = {
+    "revenue_pct": r"(?:revenue|doanh thu)",
+    "opex_pct": r"(?:opex|operating expenses?|chi phí vận hành|chi phí)",
+    "capex_pct": r"(?:capex|capital expenditures?|chi đầu tư)",
+}
+# Words around an unsigned number that give the change its direction: the verb before the
+# subject ("cut opex 10%"), between subject and number ("revenue drops 10%") or after it ("10% lower")
+_FALLING = re.compile(r"\b(?:down|drops?|dropped|decreases?|decreased|declines?|declined|falls?|fell|cuts?|"
+                      r"reduces?|reduced|slash(?:es|ed)?|lower|less|giảm|sụt|hạ|thấp)\b")
+_RISING = re.compile(r"\b(?:up|increases?|increased|rises?|rose|grows?|grew|raises?|raised|boosts?|boosted|"
+                     r"higher|more|tăng|cao)\b")
+_SUBJECT = re.compile("|".join(_PCT_PATTERNS.values()))
+_PERCENT = re.compile(r"([+-]?\d+(?:\.\d+)?)\s*%")
+# A conjunction (or, after a number, the next subject) starts the next change's words
+_CONJUNCTION = re.compile(r"\b(?:and|but|while|và|nhưng)\b")
+_NEXT_CHANGE = re.compile(_SUBJECT.pattern + "|" + _CONJUNCTION.pattern)
+
+
+def _direction(text: str) -> int:
+    if _FALLING.search(text):
+        return -1
+    if _RISING.search(text):
+        return 1
+    return 0
+
+
+def scenario_grid(grid: Mapping[str, Sequence[float]]) -> pd.DataFrame:
+    """Cartesian product of adjustment values, e.g. {"revenue_pct": [-0.1, 0]}"""
+    unknown = set(grid) - set(ADJUSTMENTS)
+    if unknown:
+        raise ValueError(f"Unknown scenario adjustments: {sorted(unknown)}")
+    axes = [list(grid.get(name, [0])) for name in ADJUSTMENTS]
+    return pd.DataFrame(list(itertools.product(*axes)), columns=list(ADJUSTMENTS))
+
+
+def _scenario_frame(scenarios: Union[pd.DataFrame, Mapping[str, Sequence[float]], Sequence[Mapping[str, float]]]) -> pd.DataFrame:
+    if isinstance(scenarios, pd.DataFrame):
+        frame = scenarios.copy()
+    elif isinstance(scenarios, Mapping):
+        frame = scenario_grid(scenarios)
+    else:
+        frame = pd.DataFrame(list(scenarios))
+    for name in ADJUSTMENTS:
+        if name in frame:
+            frame[name] = pd.to_numeric(frame[name], errors="coerce").fillna(0.0)
+        else:
+            frame[name] = 0.0
+    if (frame["capex_delay_days"] < 0).any():
+        raise ValueError("capex_delay_days must be zero or positive")
+    return frame.reset_index(drop=True)
+
+
+def _label(row: Mapping[str, float]) -> str:
+    parts = []
+    if row["revenue_pct"]:
+        parts.append(f"revenue {row['revenue_pct']:+.0%}")
+    if row["opex_pct"]:
+        parts.append(f"opex {row['opex_pct']:+.0%}")
+    if row["capex_pct"]:
+        parts.append(f"capex {row['capex_pct']:+.0%}")
+    if row["capex_delay_days"]:
+        parts.append(f"capex +{row['capex_delay_days']:.0f}d")
+    return ", ".join(parts) or "baseline"
+
+
+def baseline_components(
+    df: pd.DataFrame,
+    horizon: int,
+    lookback: int = 30,
+    forecast: Optional[Sequence[float]] = None,
+) -> Dict[str, np.ndarray]:
+    """Daily baseline revenue/opex/capex for the next `horizon` days.
+
+    Each component repeats its last `lookback` days (seasonal naive), which
+    keeps capex lumpy. When a net cash-flow forecast is given, the gap
+    between it and the component baseline is carried as an unadjusted
+    residual, so the baseline scenario reproduces the forecast exactly.
+    Days the forecast does not cover (NaN) carry no residual.
+    """
+    columns = {"revenue": "revenue", "opex": "operating_expenses", "capex": "capital_expenditures"}
+    base = {}
+    for name, col in columns.items():
+        history = pd.to_numeric(df[col], errors="coerce").fillna(0.0).to_numpy(dtype=float)[-lookback:]
+        if history.size == 0:
+            history = np.zeros(1)
+        base[name] = np.resize(history, horizon)
+    component_net = base["revenue"] - base["opex"] - base["capex"]
+    if forecast is not None:
+        forecast = np.asarray(forecast, dtype=float)[:horizon]
+        if forecast.size != horizon:
+            raise ValueError(f"Forecast covers {forecast.size} days, need {horizon}")
+        base["residual"] = np.nan_to_num(forecast - component_net, nan=0.0)
+    else:
+        base["residual"] = np.zeros(horizon)
+    return base
+
+
+def evaluate_scenarios(
+    df: pd.DataFrame,
+    scenarios: Union[pd.DataFrame, Mapping[str, Sequence[float]], Sequence[Mapping[str, float]]],
+    horizon: int = 90,
+    forecast: Optional[Sequence[float]] = None,
+    liquidity_floor: Optional[float] = None,
+) -> pd.DataFrame:
+    """Evaluate every scenario in one (scenarios x days) broadcast.
+
+    Returns one row per scenario with total net cash flow, end and minimum
+    balance, the change against the baseline and the first day the balance
+    falls below the liquidity floor.
+    """
+    frame = _scenario_frame(scenarios)
+    base = baseline_components(df, horizon, forecast=forecast)
+    start_balance = float(pd.to_numeric(df["cash_balance"], errors="coerce").dropna().iloc[-1])
+    if liquidity_floor is None:
+        outflows = (
+            pd.to_numeric(df["operating_expenses"], errors="coerce").fillna(0)
+            + pd.to_numeric(df["capital_expenditures"], errors="coerce").fillna(0)
+        )
+        liquidity_floor = LIQUIDITY_RATIO * float(outflows.mean()) * OBLIGATION_DAYS
+
+    revenue_pct = frame["revenue_pct"].to_numpy(dtype=float)[:, None]
+    opex_pct = frame["opex_pct"].to_numpy(dtype=float)[:, None]
+    capex_pct = frame["capex_pct"].to_numpy(dtype=float)[:, None]
+    delay = frame["capex_delay_days"].to_numpy(dtype=int)[:, None]
+
+    # Delayed capex: day t pays what was planned for day t - delay
+    source = np.arange(horizon)[None, :] - delay
+    capex = np.where(source >= 0, base["capex"][source.clip(0)], 0.0) * (1.0 + capex_pct)
+
+    net = (
+        base["revenue"][None, :] * (1.0 + revenue_pct)
+        - base["opex"][None, :] * (1.0 + opex_pct)
+        - capex
+        + base["residual"][None, :]
+    )
+    balance = start_balance + np.cumsum(net, axis=1)
+    baseline_end = start_balance + (base["revenue"] - base["opex"] - base["capex"] + base["residual"]).sum()
+
+    below = balance < liquidity_floor
+    breach_day = np.where(below.any(axis=1), below.argmax(axis=1) + 1, np.nan)
+
+    result = frame[list(ADJUSTMENTS)].copy()
+    result.insert(0, "scenario", [_label(row) for row in frame[list(ADJUSTMENTS)].to_dict("records")])
+    result["total_net_cashflow"] = net.sum(axis=1)
+    result["end_balance"] = balance[:, -1]
+    result["min_balance"] = balance.min(axis=1)
+    result["delta_vs_baseline"] = result["end_balance"] - baseline_end
+    result["breach_day"] = breach_day
+    return result
+
+
+def parse_scenarios(text: str, skipped: Optional[List[str]] = None) -> List[Dict[str, float]]:
+    """Parse free-text scenarios, one per ';' or line.
+
+    e.g. "revenue -10%, capex delayed a quarter, opex +5%; doanh thu giảm 20%"
+    Unsigned numbers take their direction from the words around them ("cut
+    opex by 10%", "revenue drops 10%", "revenue 10% lower"). Changes whose
+    direction is still unclear are left out and, when `skipped` is given,
+    appended to it as written.
+    """
+    scenarios = []
+    for chunk in re.split(r"[;\n]+", text.lower()):
+        scenario: Dict[str, float] = {}
+        for clause in chunk.split(","):
+            start = 0
+            for number in _PERCENT.finditer(clause):
+                for conjunction in _CONJUNCTION.finditer(clause, start, number.start()):
+                    start = conjunction.end()
+                before = clause[start:number.start()]
+                start = number.end()
+                subjects = list(_SUBJECT.finditer(before))
+                if not subjects:
+                    continue
+                subject = subjects[-1]
+                name = next(n for n, pattern in _PCT_PATTERNS.items() if re.fullmatch(pattern, subject.group()))
+                after = clause[number.end():]
+                stop = _NEXT_CHANGE.search(after)
+                after = after[:stop.start()] if stop else after
+                value = float(number.group(1)) / 100.0
+                if number.group(1)[0] not in "+-":
+                    direction = _direction(before) or _direction(after)
+                    if not direction:
+                        if skipped is not None:
+                            skipped.append((before[subject.start():] + number.group()).strip())
+                        continue
+                    value = direction * abs(value)
+                scenario.setdefault(name, value)
+        delay = re.search(
+            r"(?:delay(?:ed)?|hoãn|trễ|lùi)[^,;]*?(\d+|an?|một)?\s*(" + "|".join(_UNIT_DAYS) + r")\b",
+            chunk,
+        )
+        if delay and re.search(_PCT_PATTERNS["capex_pct"], chunk):
+            count = delay.group(1)
+            count = int(count) if count and count.isdigit() else 1
+            scenario["capex_delay_days"] = count * _UNIT_DAYS[delay.group(2)]
+        if scenario:
+            scenarios.append(scenario)
+    return scenarios
+
+
+def format_scenario_table(result: pd.DataFrame) -> str:
+    """Compact comparison table for the agent"""
+    table = result[["scenario", "total_net_cashflow", "end_balance", "min_balance", "delta_vs_baseline", "breach_day"]]
+    return table.to_string(
+        index=False,
+        na_rep="-",
+        formatters={
+            "total_net_cashflow": lambda v: f"${v:,.0f}",
+            "end_balance": lambda v: f"${v:,.0f}",
+            "min_balance": lambda v: f"${v:,.0f}",
+            "delta_vs_baseline": lambda v: f"{v:+,.0f}" if abs(v) >= 0.5 else "0",
+            "breach_day": lambda v: f"{v:.0f}",
+        },
+    )
+
+
+def compare_scenarios(df: pd.DataFrame, text: str, horizon: int = 90,
+                      forecast: Optional[Sequence[float]] = None) -> str:
+    """Agent-facing entry point: baseline plus every scenario parsed from `text`"""
+    skipped: List[str] = []
+    scenarios: List[Dict[str, Any]] = [{}] + parse_scenarios(text, skipped)
+    result = evaluate_scenarios(df, scenarios, horizon=horizon, forecast=forecast)
+    note = ""
+    if skipped:
+        note = f"*Bỏ qua vì không rõ tăng hay giảm (hãy ghi dấu +/-): {'; '.join(skipped)}*\n"
+    return f"""
+**So sánh kịch bản dòng tiền ({horizon} ngày, {len(result)} kịch bản):**
+
+{format_scenario_table(result)}
+
+*breach_day: ngày đầu tiên số dư xuống dưới ngưỡng thanh khoản {LIQUIDITY_RATIO:.0f}:1*
+{note}"""
@@ -0,0 +1,208 @@
+import time
+from functools import lru_cache
+from statistics import NormalDist
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+# Cash Flow Management policy (rag_documents.json): minimum 2:1 liquidity ratio.
+# Short-term liabilities are proxied by the next `OBLIGATION_DAYS` of outflows.
+LIQUIDITY_RATIO = 2.0
+OBLIGATION_DAYS = 30
+
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+DEFAULT_CHECKPOINTS = (7, 30, 90, 180, 365)
+
+# Daily draws use inverse-transform sampling from a quantile table indexed by
+# random uint16 codes, which is several times cheaper than normal draws + exp.
+TABLE_SIZE = 1 << 16
+
+
+def _lognormal_params(values: np.ndarray) -> Dict[str, float]:
+    positive = values[np.isfinite(values) & (values > 0)]
+    if positive.size == 0:
+        return {"mu": 0.0, "sigma": 0.0, "p": 0.0}
+    logs = np.log(positive)
+    return {
+        "mu": float(logs.mean()),
+        "sigma": float(logs.std(ddof=1)) if logs.size > 1 else 0.0,
+        "p": float(positive.size / max(1, np.isfinite(values).sum())),
+    }
+
+
+def fit_cashflow_distribution(df: pd.DataFrame) -> Dict[str, Any]:
+    """Fit daily revenue/opex/capex distributions to a cash-flow history.
+
+    Each component is a lognormal, with `p` the share of days on which it is
+    non-zero (capex is lumpy). The raw daily net flows are kept for block
+    bootstrap sampling.
+    """
+    columns = {"revenue": "revenue", "opex": "operating_expenses", "capex": "capital_expenditures"}
+    params = {
+        name: _lognormal_params(pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float))
+        for name, col in columns.items()
+    }
+    outflows = (
+        pd.to_numeric(df["operating_expenses"], errors="coerce").fillna(0)
+        + pd.to_numeric(df["capital_expenditures"], errors="coerce").fillna(0)
+    )
+    net = pd.to_numeric(df["net_cashflow"], errors="coerce").dropna().to_numpy(dtype=float)
+    params["tables"] = {name: _quantile_table(params[name]) for name in columns}
+    params["net_history"] = net
+    params["mean_daily_outflow"] = float(outflows.mean())
+    balances = pd.to_numeric(df["cash_balance"], errors="coerce").dropna()
+    if balances.empty:
+        raise ValueError("Not enough history to simulate: no cash_balance values")
+    params["start_balance"] = float(balances.iloc[-1])
+    return params
+
+
+@lru_cache(maxsize=1)
+def _standard_normal_grid() -> tuple:
+    u = (np.arange(TABLE_SIZE) + 0.5) / TABLE_SIZE
+    z = np.array([NormalDist().inv_cdf(x) for x in u])
+    return u, z
+
+
+def _quantile_table(params: Dict[str, float]) -> np.ndarray:
+    """TABLE_SIZE equally likely values of a zero-inflated lognormal"""
+    u, z = _standard_normal_grid()
+    table = np.zeros(TABLE_SIZE, dtype=np.float32)
+    p = params["p"]
+    active = u >= 1.0 - p
+    if p > 0:
+        table[active] = np.exp(params["mu"] + params["sigma"] * np.interp((u[active] - (1.0 - p)) / p, u, z))
+    return table
+
+
+def _net_paths(rng: np.random.Generator, dist: Dict[str, Any], n_paths: int, days: int,
+               method: str, block_size: int) -> np.ndarray:
+    if method == "lognormal":
+        shape = (n_paths, days)
+        net = np.take(dist["tables"]["revenue"], rng.integers(0, TABLE_SIZE, size=shape, dtype=np.uint16))
+        draws = np.empty_like(net)
+        for name in ("opex", "capex"):
+            np.take(dist["tables"][name], rng.integers(0, TABLE_SIZE, size=shape, dtype=np.uint16), out=draws)
+            net -= draws
+        return net
+    if method == "bootstrap":
+        history = dist["net_history"].astype(np.float32)
+        block_size = max(1, min(block_size, history.size))
+        n_blocks = -(-days // block_size)
+        starts = rng.integers(0, history.size - block_size + 1, size=(n_paths, n_blocks))
+        idx = (starts[:, :, None] + np.arange(block_size)).reshape(n_paths, -1)[:, :days]
+        return history[idx]
+    raise ValueError(f"Unknown simulation method: {method}")
+
+
+def simulate_cash_runway(
+    df: pd.DataFrame,
+    days: int = 365,
+    n_paths: int = 100_000,
+    method: str = "lognormal",
+    horizon_days: int = 30,
+    liquidity_floor: Optional[float] = None,
+    block_size: int = 7,
+    quantiles: Sequence[float] = DEFAULT_QUANTILES,
+    checkpoints: Sequence[int] = DEFAULT_CHECKPOINTS,
+    chunk_size: int = 16_384,
+    seed: Optional[int] = 42,
+) -> Dict[str, Any]:
+    """Monte Carlo simulation of the cash balance over the next `days` days.
+
+    Paths are drawn in chunks of `chunk_size` as (paths x days) float32
+    arrays, so memory stays bounded. `method` is "lognormal" (independent
+    daily draws from the fitted distributions) or "bootstrap" (blocks of
+    historical net flows).
+
+    Returns balance quantiles at the checkpoint days, the probability of
+    dropping below the liquidity floor within `horizon_days`, and the
+    runway (first day the balance goes negative) distribution.
+    """
+    if days < 1 or n_paths < 1:
+        raise ValueError("days and n_paths must be positive")
+    started = time.perf_counter()
+    dist = fit_cashflow_distribution(df)
+    if method == "bootstrap" and dist["net_history"].size == 0:
+        raise ValueError("Not enough history to bootstrap: no net_cashflow values")
+    start_balance = dist["start_balance"]
+    if liquidity_floor is None:
+        liquidity_floor = LIQUIDITY_RATIO * dist["mean_daily_outflow"] * OBLIGATION_DAYS
+    horizon_days = min(horizon_days, days)
+    checkpoints = sorted({min(int(c), days) for c in checkpoints})
+    cp_idx = np.asarray(checkpoints) - 1
+
+    rng = np.random.default_rng(seed)
+    checkpoint_balances = np.empty((n_paths, len(checkpoints)), dtype=np.float64)
+    breach_horizon = np.empty(n_paths, dtype=bool)
+    breach_any = np.empty(n_paths, dtype=bool)
+    runway = np.empty(n_paths, dtype=np.float64)
+
+    for lo in range(0, n_paths, chunk_size):
+        hi = min(n_paths, lo + chunk_size)
+        net = _net_paths(rng, dist, hi - lo, days, method, block_size)
+        balance = np.cumsum(net, axis=1, dtype=np.float64)
+        balance += start_balance
+        checkpoint_balances[lo:hi] = balance[:, cp_idx]
+
+        lowest = balance.min(axis=1)
+        breach_horizon[lo:hi] = balance[:, :horizon_days].min(axis=1) < liquidity_floor
+        breach_any[lo:hi] = lowest < liquidity_floor
+
+        # First negative day, searched only on paths that actually go negative
+        chunk_runway = np.full(hi - lo, np.inf)
+        depleted = lowest < 0
+        if depleted.any():
+            chunk_runway[depleted] = (balance[depleted] < 0).argmax(axis=1) + 1
+        runway[lo:hi] = chunk_runway
+
+    quantile_table = pd.DataFrame(
+        np.quantile(checkpoint_balances, quantiles, axis=0).T,
+        index=pd.Index(checkpoints, name="day"),
+        columns=[f"p{int(round(q * 100))}" for q in quantiles],
+    )
+    depleted = np.isfinite(runway)
+    # Paths that never run out sort after every finite runway
+    runway_values = np.quantile(np.where(depleted, runway, days + 1), quantiles)
+    runway_quantiles = {
+        f"p{int(round(q * 100))}": float(v) if v <= days else float("inf")
+        for q, v in zip(quantiles, runway_values)
+    }
+    return {
+        "method": method,
+        "n_paths": n_paths,
+        "days": days,
+        "start_balance": start_balance,
+        "liquidity_floor": float(liquidity_floor),
+        "horizon_days": horizon_days,
+        "breach_probability": float(breach_horizon.mean()),
+        "breach_probability_full": float(breach_any.mean()),
+        "depletion_probability": float(depleted.mean()),
+        "runway_quantiles": runway_quantiles,
+        "balance_quantiles": quantile_table,
+        "elapsed_seconds": time.perf_counter() - started,
+    }
+
+
+def format_runway_report(result: Dict[str, Any]) -> str:
+    """Render a simulation result for the agent"""
+    def days_text(value: float) -> str:
+        return f"> {result['days']} ngày" if np.isinf(value) else f"{value:.0f} ngày"
+
+    table = result["balance_quantiles"].to_string(float_format=lambda v: f"${v:,.0f}")
+    runway = result["runway_quantiles"]
+    return f"""
+**Mô phỏng Monte Carlo số dư tiền mặt ({result['n_paths']:,} kịch bản, {result['days']} ngày, {result['method']}):**
+
+- Số dư hiện tại: ${result['start_balance']:,.2f}
+- Ngưỡng thanh khoản (tỷ lệ {LIQUIDITY_RATIO:.0f}:1): ${result['liquidity_floor']:,.2f}
+- Xác suất xuống dưới ngưỡng trong {result['horizon_days']} ngày: {result['breach_probability']:.2%}
+- Xác suất xuống dưới ngưỡng trong {result['days']} ngày: {result['breach_probability_full']:.2%}
+- Xác suất cạn tiền trong {result['days']} ngày: {result['depletion_probability']:.2%}
+- Runway (trung vị / P5): {days_text(runway.get('p50', np.inf))} / {days_text(runway.get('p5', np.inf))}
+
+**Phân vị số dư theo ngày:**
+{table}
+"""
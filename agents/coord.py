@@ -1,31 +1,39 @@
-from typing import Dict, Any, Callable
+from functools import lru_cache
+from typing import Dict, Any, Callable, List, Optional
 from agents.budget_agent import budget_agent_executor
 from agents.spending_agent import summarize_subscriptions
 from agents.alert_agent import detect_anomalies
 from agents.cashflow_agent import cashflow_agent_executor
 from agents.invoice_agent import invoice_agent_executor
-from langchain.chat_models import ChatOpenAI
+from agents.screener_agent import screener_agent_executor
+from agents.llm import get_llm
+from agents.output_format import format_table
 from langchain.prompts import PromptTemplate
-from langchain.agents import create_react_agent
-from langchain.agents import AgentExecutor
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def wrap_agent_executor(agent_executor):
-    """Wrap LangChain AgentExecutor to return dict with 'response' key."""
-    def wrapped(query: str) -> Dict[str, Any]:
+def wrap_agent_executor(agent_executor, uses_history: bool = False):
+    """Wrap LangChain AgentExecutor to return dict with 'response' key.
+
+    With `uses_history`, the session history is passed as `chat_history`.
+    """
+    def wrapped(query: str, history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
         try:
-            result = agent_executor.run(query)
-            return {"response": result}
+            inputs = {"input": query}
+            if uses_history:
+                inputs["chat_history"] = history or []
+            result = agent_executor.invoke(inputs)
+            return {"response": result["output"]}
         except Exception as e:
             return {"response": f"Error in agent: {str(e)}"}
+    wrapped.uses_history = uses_history
     return wrapped
 
 def wrap_function_agent(func: Callable) -> Callable:
     """Wrap simple functions to match expected signature."""
-    def wrapped(query: str) -> Dict[str, Any]:
+    def wrapped(query: str, history: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
         try:
             result = func(query)
             # Ensure result is a dict with 'response'
@@ -42,10 +50,12 @@ class AgentRouter:
         # Ensure all agents are wrapped to return Dict[str, Any]
         self.agents: Dict[str, Callable[[str], Dict[str, Any]]] = {
             "budget": wrap_agent_executor(budget_agent_executor),
-            "spending": wrap_function_agent(summarize_subscriptions),
+            "spending": wrap_function_agent(
+                lambda _: format_table(summarize_subscriptions(), "Subscription spending by merchant:")),
             "anomalies": wrap_function_agent(detect_anomalies),
-            "cashflow": wrap_agent_executor(cashflow_agent_executor),
-            "invoice": wrap_agent_executor(invoice_agent_executor)
+            "cashflow": wrap_agent_executor(cashflow_agent_executor, uses_history=True),
+            "invoice": wrap_agent_executor(invoice_agent_executor),
+            "screener": wrap_agent_executor(screener_agent_executor)
         }
 
         self.prompt_template = """
@@ -57,6 +67,7 @@ class AgentRouter:
 - `anomalies`: Queries about detecting unusual transactions, outliers, fraud indicators, or unexpected financial activity.
 - `cashflow`: Inquiries about cash inflows/outflows, liquidity forecasts, cash position, runway, or short-term financial health.
 - `invoice`: Tasks involving invoice creation, status checks, payment tracking, due dates, or invoice data extraction.
+- `screener`: Screening or ranking S&P 500 / listed companies by fundamentals (margins, cash flow quality, accruals, growth, market-cap size).
 
 **Instructions:**
 1. Read the user query carefully.
@@ -69,17 +80,41 @@ User Query: {query}
     """
 
         self.prompt = PromptTemplate(input_variables=["query"], template=self.prompt_template)
-        self.llm = ChatOpenAI(temperature=0, model="gpt-4", openai_api_key=os.getenv("OPENAI_API_KEY"))
-        agent = create_react_agent(self.llm, tool_names=list(self.agents.keys()), verbose=False)
-        agent_executor = AgentExecutor(agent=agent, tools=[], verbose=True)
-        
+        self.llm = get_llm(model="gpt-4", temperature=0)
+
+    def classify(self, query: str) -> str:
+        """Ask the LLM for an agent name; tolerate stray punctuation or extra words."""
+        label = self.llm.invoke(self.prompt.format(query=query)).content.strip().lower()
+        for token in label.replace("`", " ").replace(".", " ").split():
+            if token in self.agents:
+                return token
+        return "none"
+
+    def route(self, query: str, history: Optional[List[Dict[str, str]]] = None,
+              last_agent: Optional[str] = None) -> Dict[str, Any]:
+        """A follow-up the classifier cannot place ("còn quý trước?") stays with the previous turn's agent.
+
+        `uses_context` tells whether the answer depended on the conversation
+        (a follow-up, or an agent that reads the history).
+        """
+        label = self.classify(query)
+        follow_up = label == "none" and last_agent in self.agents
+        if follow_up:
+            label = last_agent
+        if label == "none":
+            return {"type": "none", "output": "Xin lỗi, câu hỏi này nằm ngoài phạm vi của các agent tài chính.",
+                    "uses_context": False}
+        agent = self.agents[label]
+        return {"type": label, "output": agent(query, history)["response"],
+                "uses_context": follow_up or getattr(agent, "uses_history", False)}
+
+@lru_cache(maxsize=1)
+def get_router() -> AgentRouter:
+    """Shared router; building one per query re-created the LLM client every call."""
+    return AgentRouter()
 
-    def route(self, query: str) -> Dict[str, Any]:
-        prompt_text = self.prompt.format(query=query)
-        response = self.agent_executor.invoke({"input":prompt_text}).strip().lower()
-        return response
 
 # Convenience function
-def route_query(query: str) -> Dict[str, Any]:
-    router = AgentRouter()
-    return router.route(query)
\ No newline at end of file
+def route_query(query: str, history: Optional[List[Dict[str, str]]] = None,
+                last_agent: Optional[str] = None) -> Dict[str, Any]:
+    return get_router().route(query, history, last_agent)
\ No newline at end of file
@@ -0,0 +1,171 @@
+import json
+import random
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+# Keyword routing used to answer the AgentRouter prompt, checked in order.
+# Policy questions go to `budget`, whose RAG fallback answers them.
+ROUTES = [
+    ("budget", ["chính sách", "quy định", "policy"]),
+    ("screener", ["large-cap", "mid-cap", "small-cap", "s&p", "margin", "screen", "companies", "công ty"]),
+    ("anomalies", ["bất thường", "anomal", "fraud", "gian lận", "outlier"]),
+    ("invoice", ["hóa đơn", "invoice"]),
+    ("cashflow", ["dòng tiền", "cash flow", "cashflow", "runway", "thanh khoản"]),
+    ("spending", ["subscription", "vendor", "chi tiêu", "spending"]),
+    ("budget", ["budget", "ngân sách"]),
+]
+ROUTER_MARKER = "query router"
+
+# Tool picked for a question when several are offered, checked in order; the
+# first offered tool is the fallback.
+TOOL_KEYWORDS = [
+    ("forecast_company_ocf", ["ticker", "lstm", "quý tới", "next quarter"]),
+    ("compare_scenarios", ["nếu", "what if", "what-if", "kịch bản", "scenario"]),
+    ("simulate_cash_runway", ["runway", "xác suất", "probability", "thanh khoản", "liquidity", "rủi ro"]),
+    ("cashflow_overview", ["tổng quan", "overview", "tình hình", "cập nhật", "update", "how are we"]),
+    ("predict_cashflow", ["dự báo", "forecast", "predict", "tới", "next"]),
+    ("analyze_cashflow", ["phân tích", "hiện tại", "analy", "current"]),
+    ("invoice_aging", ["quá hạn", "overdue", "aging", "tuổi nợ", "đến hạn", "phạt", "penalty"]),
+    ("query_invoices", ["theo ", "by ", "tháng", "month", "quý", "trạng thái", "tình trạng", "status",
+                        "vendor", "nhà cung cấp", "trên", "dưới", "usd"]),
+]
+FILLER = ("Dựa trên dữ liệu hiện có , các chỉ số chính vẫn nằm trong ngưỡng theo dõi "
+          "và không cần hành động khẩn cấp .").split()
+
+
+def classify(query: str) -> str:
+    text = query.lower()
+    for agent, keywords in ROUTES:
+        if any(k in text for k in keywords):
+            return agent
+    return "none"
+
+
+def select_tool(question: str, names: Sequence[str]) -> str:
+    text = question.lower()
+    for name, keywords in TOOL_KEYWORDS:
+        if name in names and any(k in text for k in keywords):
+            return name
+    return names[0]
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def _question(prompt: str, messages: List[Dict[str, Any]]) -> str:
+    """The user's question: the ReAct `Question:` line after `Begin!`, else the last user message."""
+    if "Begin!" in prompt:
+        for line in prompt.rsplit("Begin!", 1)[1].splitlines():
+            if line.strip().startswith("Question:"):
+                return line.split("Question:", 1)[1].strip()
+    users = [m["content"] for m in messages if m["role"] == "user"]
+    return (users[-1] if users else prompt).strip()
+
+
+class LatencyModel:
+    """Simulated LLM timing: time to first token plus prompt and decode cost per token."""
+
+    def __init__(self, latency_ms: float = 0.0, ms_per_token: float = 0.0, ms_per_prompt_token: float = 0.0,
+                 jitter: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.ms_per_token = ms_per_token
+        self.ms_per_prompt_token = ms_per_prompt_token
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+
+    def _scale(self) -> float:
+        return 1 + self.rng.uniform(-self.jitter, self.jitter) if self.jitter else 1.0
+
+    def first_token(self, prompt_tokens: int) -> float:
+        ms = self.latency_ms + self.ms_per_prompt_token * prompt_tokens
+        return max(0.0, ms * self._scale()) / 1000.0
+
+    def decode(self, completion_tokens: int) -> float:
+        return max(0.0, self.ms_per_token * completion_tokens * self._scale()) / 1000.0
+
+    def total(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return self.first_token(prompt_tokens) + self.decode(completion_tokens)
+
+
+class FakeLLMScript:
+    """Deterministic replies for every calling convention the agents use.
+
+    - the AgentRouter prompt gets a bare agent name (keyword routing)
+    - function/tool-calling requests get one call to a real tool, then a final
+      answer built from the tool output
+    - ReAct prompts get `Action`/`Action Input` first, then `Final Answer` once
+      an `Observation` is in the scratchpad
+    - anything else gets plain text
+
+    `script` maps question substrings to canned final answers and takes
+    precedence over everything but routing. Messages are OpenAI-style dicts
+    with `role` in system/user/assistant/function/tool.
+    """
+
+    def __init__(self, script: Optional[Dict[str, str]] = None, completion_tokens: int = 60):
+        self.script = script or {}
+        self.completion_tokens = completion_tokens
+
+    @classmethod
+    def from_file(cls, path: Optional[str], **kwargs) -> "FakeLLMScript":
+        script = None
+        if path:
+            with open(path, encoding="utf-8") as f:
+                script = json.load(f)
+        return cls(script, **kwargs)
+
+    def _answer(self, question: str, observation: Optional[str] = None) -> str:
+        for pattern, reply in self.script.items():
+            if pattern.lower() in question.lower():
+                return reply
+        if observation:
+            return observation.strip()
+        words = [f"[fake] {question} →"]
+        while len(words) < self.completion_tokens:
+            words.extend(FILLER)
+        return " ".join(words[:max(self.completion_tokens, 1)])
+
+    def respond(self, messages: List[Dict[str, Any]], functions: Optional[List[Dict[str, Any]]] = None,
+                tools: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Returns {"content": str, "function_call": dict|None, "tool_calls": list|None}"""
+        reply = {"content": "", "function_call": None, "tool_calls": None}
+        prompt = "\n".join(m["content"] for m in messages)
+        if ROUTER_MARKER in prompt.lower():
+            reply["content"] = classify(prompt.rsplit("User Query:", 1)[-1])
+            return reply
+
+        question = _question(prompt, messages)
+        specs = functions or [t.get("function", t) for t in tools or []]
+        if specs:
+            last_user = max((i for i, m in enumerate(messages) if m["role"] == "user"), default=-1)
+            observations = [m["content"] for m in messages[last_user + 1:] if m["role"] in ("function", "tool")]
+            if observations or any(p.lower() in question.lower() for p in self.script):
+                reply["content"] = self._answer(question, observations[-1] if observations else None)
+                return reply
+            name = select_tool(question, [s["name"] for s in specs])
+            params = next(s for s in specs if s["name"] == name).get("parameters", {}).get("properties", {})
+            arguments = json.dumps({next(iter(params)): question} if params else {}, ensure_ascii=False)
+            if tools:
+                reply["tool_calls"] = [{"id": f"call_{len(messages)}", "type": "function",
+                                        "function": {"name": name, "arguments": arguments}}]
+            else:
+                reply["function_call"] = {"name": name, "arguments": arguments}
+            return reply
+
+        match = re.search(r"one of \[([^\]]*)\]", prompt)
+        if "Final Answer:" in prompt and match:
+            names = [n.strip() for n in match.group(1).split(",") if n.strip()]
+            scratchpad = prompt.rsplit("Begin!", 1)[-1]
+            observations = re.findall(r"Observation:(.*?)(?=\nThought:|$)", scratchpad, re.S)
+            if names and not observations and not any(p.lower() in question.lower() for p in self.script):
+                name = select_tool(question, names)
+                reply["content"] = f"Thought: Tôi cần dùng công cụ {name}.\nAction: {name}\nAction Input: {question}"
+            else:
+                answer = self._answer(question, observations[-1] if observations else None)
+                reply["content"] = f"Thought: I now know the final answer\nFinal Answer: {answer}"
+            return reply
+
+        reply["content"] = self._answer(question)
+        return reply
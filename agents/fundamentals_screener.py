@@ -0,0 +1,293 @@
+import operator
+import re
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_PATH = "financial_data_sp500.csv"
+OCF_COLUMN = "Total Cash From Operating Activities"
+
+# Quarter-over-quarter / year-over-year lags and the date gaps they must span,
+# so a missing quarter never pairs two non-adjacent periods
+LAGS = {"qoq": (1, 60, 120), "yoy": (4, 330, 400)}
+GROWTH_COLUMNS = ("revenue", "ocf", "net_income")
+MARGIN_COLUMNS = ("ocf_margin", "gross_margin", "operating_margin")
+
+RATIO_COLUMNS = (
+    "ocf", "ocf_to_net_income", "accruals", "wc_intensity",
+    "gross_margin", "operating_margin", "ocf_margin",
+) + tuple(f"{c}_{lag}" for c in GROWTH_COLUMNS + MARGIN_COLUMNS for lag in LAGS)
+
+OPS = {
+    "<": operator.lt, "<=": operator.le, ">": operator.gt,
+    ">=": operator.ge, "==": operator.eq, "!=": operator.ne,
+}
+
+Filter = Tuple[str, str, float]
+
+
+def load_fundamentals(path: str = DEFAULT_PATH) -> pd.DataFrame:
+    """Load the quarterly S&P 500 fundamentals"""
+    df = pd.read_csv(path)
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def _num(df: pd.DataFrame, column: str) -> np.ndarray:
+    if column not in df:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = num / den
+    out[~np.isfinite(out)] = np.nan
+    return out
+
+
+def compute_ratios(df: pd.DataFrame) -> pd.DataFrame:
+    """Derived ratios and growth rates per (ticker, quarter).
+
+    Operating cash flow falls back to Net Income + D&A + Change In Working
+    Capital where the reported figure is missing. Growth is computed with a
+    single grouped shift per lag over the (ticker, date)-sorted frame.
+    Margin "growth" is the change in percentage points.
+    """
+    df = df.sort_values(["ticker", "date"]).reset_index(drop=True)
+    net_income = _num(df, "Net Income")
+    revenue = _num(df, "Total Revenue")
+    estimate = net_income + _num(df, "Depreciation And Amortization") + _num(df, "Change In Working Capital")
+    reported = _num(df, OCF_COLUMN)
+    ocf = np.where(np.isnan(reported), estimate, reported)
+    working_capital = (
+        np.nan_to_num(_num(df, "Accounts Receivable"))
+        + np.nan_to_num(_num(df, "Inventory"))
+        - np.nan_to_num(_num(df, "Accounts Payable"))
+    )
+
+    out = df[["ticker", "date", "marketCap", "size_category"]].copy()
+    out["revenue"] = revenue
+    out["net_income"] = net_income
+    out["ocf"] = ocf
+    out["ocf_to_net_income"] = _ratio(ocf, np.where(net_income > 0, net_income, np.nan))
+    out["accruals"] = _ratio(net_income - ocf, _num(df, "Total Assets"))
+    out["wc_intensity"] = _ratio(np.where(np.isnan(revenue), np.nan, working_capital), revenue)
+    out["gross_margin"] = _ratio(_num(df, "Gross Profit"), revenue)
+    out["operating_margin"] = _ratio(_num(df, "Operating Income"), revenue)
+    out["ocf_margin"] = _ratio(ocf, revenue)
+
+    base = out[["date", *GROWTH_COLUMNS, *MARGIN_COLUMNS]]
+    grouped = base.groupby(out["ticker"], sort=False)
+    for lag_name, (lag, min_days, max_days) in LAGS.items():
+        prev = grouped.shift(lag)
+        gap = (out["date"] - prev["date"]).dt.days.to_numpy()
+        aligned = (gap >= min_days) & (gap <= max_days)
+        for col in GROWTH_COLUMNS:
+            prior = prev[col].to_numpy(dtype=float)
+            growth = _ratio(out[col].to_numpy() - prior, np.abs(prior))
+            out[f"{col}_{lag_name}"] = np.where(aligned, growth, np.nan)
+        for col in MARGIN_COLUMNS:
+            change = out[col].to_numpy() - prev[col].to_numpy(dtype=float)
+            out[f"{col}_{lag_name}"] = np.where(aligned, change, np.nan)
+    return out
+
+
+class FundamentalsScreener:
+    """Filter/rank queries over precomputed ratios.
+
+    Ratios are computed once; the latest reported quarter of every ticker
+    is kept as a column -> ndarray mapping, so a query is a handful of
+    vectorized comparisons plus one argsort.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.frame = compute_ratios(df)
+        reported = self.frame[["revenue", "net_income"]].notna().any(axis=1)
+        self.latest = self.frame[reported].groupby("ticker", sort=False).tail(1).reset_index(drop=True)
+        self._columns = {col: self.latest[col].to_numpy() for col in self.latest.columns}
+
+    @classmethod
+    def from_csv(cls, path: str = DEFAULT_PATH) -> "FundamentalsScreener":
+        return cls(load_fundamentals(path))
+
+    def screen(
+        self,
+        filters: Sequence[Filter] = (),
+        size_category: Optional[str] = None,
+        sort_by: Optional[str] = None,
+        ascending: bool = False,
+        limit: Optional[int] = 20,
+    ) -> pd.DataFrame:
+        """Tickers whose latest quarter passes every (column, op, value) filter.
+
+        Rows with NaN in a filtered or sorted column are excluded.
+        """
+        mask = np.ones(len(self.latest), dtype=bool)
+        if size_category:
+            mask &= self._columns["size_category"] == size_category
+        for column, op, value in filters:
+            if column not in self._columns:
+                raise ValueError(f"Unknown screening column: {column}")
+            if op not in OPS:
+                raise ValueError(f"Unknown operator: {op}")
+            values = self._columns[column].astype(float)
+            mask &= ~np.isnan(values) & OPS[op](values, value)
+
+        idx = np.flatnonzero(mask)
+        if sort_by:
+            if sort_by not in self._columns:
+                raise ValueError(f"Unknown sort column: {sort_by}")
+            keys = self._columns[sort_by][idx].astype(float)
+            idx = idx[~np.isnan(keys)]
+            keys = keys[~np.isnan(keys)]
+            order = np.argsort(keys if ascending else -keys, kind="stable")
+            idx = idx[order]
+        if limit:
+            idx = idx[:limit]
+        return self.latest.iloc[idx].reset_index(drop=True)
+
+
+# --- Text queries -----------------------------------------------------------------------
+
+_SIZES = {
+    "large": "Large-Cap", "lớn": "Large-Cap",
+    "mid": "Mid-Cap", "vừa": "Mid-Cap", "trung bình": "Mid-Cap",
+    "small": "Small-Cap", "nhỏ": "Small-Cap",
+}
+# Longest aliases first so "ocf margin" wins over "ocf"
+_METRICS = sorted({
+    "ocf margin": "ocf_margin", "operating cash flow margin": "ocf_margin", "biên dòng tiền": "ocf_margin",
+    "gross margin": "gross_margin", "biên lợi nhuận gộp": "gross_margin",
+    "operating margin": "operating_margin", "biên lợi nhuận hoạt động": "operating_margin",
+    "ocf/ni": "ocf_to_net_income", "ocf/net income": "ocf_to_net_income",
+    "cash conversion": "ocf_to_net_income", "earnings quality": "ocf_to_net_income",
+    "accruals": "accruals", "accrual": "accruals",
+    "working capital": "wc_intensity", "vốn lưu động": "wc_intensity",
+    "revenue": "revenue", "doanh thu": "revenue", "sales": "revenue",
+    "net income": "net_income", "lợi nhuận": "net_income", "earnings": "net_income",
+    "operating cash flow": "ocf", "ocf": "ocf", "dòng tiền": "ocf",
+}.items(), key=lambda kv: -len(kv[0]))
+_FALLING = r"(?:falling|declining|decreasing|dropping|shrinking|negative|giảm)"
+_RISING = r"(?:rising|growing|increasing|improving|positive|tăng)"
+
+
+def _metric_at(text: str, start: int) -> Optional[Tuple[str, int]]:
+    """Metric alias starting at `start` (after optional whitespace)"""
+    rest = text[start:].lstrip()
+    offset = len(text) - len(rest)
+    for alias, column in _METRICS:
+        if rest.startswith(alias):
+            return column, offset + len(alias)
+    return None
+
+
+def _find_metric(text: str) -> Optional[str]:
+    for alias, column in _METRICS:
+        if re.search(r"(?<![\w/])" + re.escape(alias) + r"(?![\w/])", text):
+            return column
+    return None
+
+
+def _trend_column(metric: str, lag: str) -> str:
+    if metric in GROWTH_COLUMNS or metric in MARGIN_COLUMNS:
+        return f"{metric}_{lag}"
+    return metric
+
+
+def parse_screen_query(text: str) -> Dict[str, Any]:
+    """Turn e.g. "Large-Cap with falling OCF margin, gross margin > 40%, top 10"
+    into screen() keyword arguments."""
+    query = text.lower()
+    spec: Dict[str, Any] = {"filters": [], "size_category": None, "sort_by": None, "ascending": False, "limit": 20}
+
+    size = re.search(r"\b(large|mid|small)[\s-]*caps?\b|vốn hóa (lớn|vừa|trung bình|nhỏ)", query)
+    if size:
+        spec["size_category"] = _SIZES[size.group(1) or size.group(2)]
+    lag = "yoy" if re.search(r"\byoy\b|year|năm", query) else "qoq"
+
+    for match in re.finditer(r"(" + _FALLING + r"|" + _RISING + r")\s+", query):
+        found = _metric_at(query, match.end())
+        if found:
+            column = _trend_column(found[0], lag)
+            falling = re.fullmatch(_FALLING, match.group(1)) is not None
+            spec["filters"].append((column, "<" if falling else ">", 0.0))
+            spec["sort_by"] = spec["sort_by"] or column
+            spec["ascending"] = falling if spec["sort_by"] == column else spec["ascending"]
+    # Postfix trend: "OCF margin falling" / "doanh thu giảm"
+    for alias, column in _METRICS:
+        for match in re.finditer(re.escape(alias) + r"\s+(" + _FALLING + r"|" + _RISING + r")\b", query):
+            column_lag = _trend_column(column, lag)
+            if any(f[0] == column_lag for f in spec["filters"]):
+                continue
+            falling = re.fullmatch(_FALLING, match.group(1)) is not None
+            spec["filters"].append((column_lag, "<" if falling else ">", 0.0))
+            spec["sort_by"] = spec["sort_by"] or column_lag
+            spec["ascending"] = falling if spec["sort_by"] == column_lag else spec["ascending"]
+
+    for match in re.finditer(r"(<=|>=|<|>|=)\s*(-?\d+(?:\.\d+)?)\s*(%|x)?", query):
+        metric = _find_metric(query[max(0, match.start() - 40):match.start()].split(",")[-1])
+        if not metric:
+            continue
+        value = float(match.group(2))
+        if match.group(3) == "%":
+            value /= 100.0
+        op = "==" if match.group(1) == "=" else match.group(1)
+        spec["filters"].append((metric, op, value))
+
+    top = re.search(r"\b(?:top|bottom|first)\s+(\d+)|(\d+)\s+(?:công ty|mã|tickers?|companies)", query)
+    if top:
+        spec["limit"] = int(top.group(1) or top.group(2))
+    ranked = re.search(r"(?:by|sort(?:ed)? by|rank(?:ed)? by|theo)\s+", query)
+    if ranked:
+        found = _metric_at(query, ranked.end())
+        if found:
+            column, end = found
+            suffix = re.match(r"\s*(yoy|qoq|growth|change|tăng trưởng)\b", query[end:])
+            if suffix:
+                column = _trend_column(column, suffix.group(1) if suffix.group(1) in LAGS else lag)
+            spec["sort_by"] = column
+            spec["ascending"] = bool(re.search(r"\b(?:bottom|lowest|ascending|thấp nhất)\b", query))
+    if spec["sort_by"] is None and spec["filters"]:
+        spec["sort_by"] = spec["filters"][0][0]
+        spec["ascending"] = spec["filters"][0][1] in ("<", "<=")
+    return spec
+
+
+_DISPLAY = ["ticker", "date", "size_category", "revenue", "ocf_margin", "ocf_margin_qoq",
+            "gross_margin", "ocf_to_net_income", "accruals", "revenue_yoy"]
+
+
+def format_screen_result(result: pd.DataFrame, spec: Dict[str, Any], elapsed_ms: float) -> str:
+    """Compact table for the agent; filtered/sorted columns are always shown"""
+    if result.empty:
+        return "Không có công ty nào thỏa mãn điều kiện lọc."
+    columns = list(dict.fromkeys(
+        _DISPLAY[:3] + [f[0] for f in spec["filters"]] + ([spec["sort_by"]] if spec["sort_by"] else []) + _DISPLAY[3:]
+    ))
+    table = result[columns].copy()
+    table["date"] = table["date"].dt.strftime("%Y-%m-%d")
+    percent = set(RATIO_COLUMNS) - {"ocf", "ocf_to_net_income"}
+    formatters = {c: (lambda v: f"{v:.1%}") for c in columns if c in percent}
+    formatters.update({c: (lambda v: f"${v / 1e6:,.0f}M") for c in ("revenue", "ocf", "net_income") if c in columns})
+    if "ocf_to_net_income" in columns:
+        formatters["ocf_to_net_income"] = lambda v: f"{v:.2f}x"
+    conditions = ", ".join(f"{c} {op} {v:g}" for c, op, v in spec["filters"]) or "không có"
+    return f"""
+**Kết quả lọc cổ phiếu ({len(result)} mã, {elapsed_ms:.1f} ms):**
+- Nhóm vốn hóa: {spec['size_category'] or 'tất cả'}
+- Điều kiện: {conditions}
+- Sắp xếp: {spec['sort_by'] or '-'} ({'tăng dần' if spec['ascending'] else 'giảm dần'})
+
+{table.to_string(index=False, na_rep='-', formatters=formatters)}
+"""
+
+
+def run_screen_query(screener: FundamentalsScreener, text: str) -> str:
+    spec = parse_screen_query(text)
+    started = time.perf_counter()
+    result = screener.screen(**spec)
+    return format_screen_result(result, spec, (time.perf_counter() - started) * 1000)
@@ -2,8 +2,17 @@ import pandas as pd
 from typing import Dict, Any
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
+from agents.llm import get_llm
 from langchain.tools import tool
+from agents.invoice_aging import (
+    InvoiceAgingIndex,
+    format_aging_report,
+    get_aging_index,
+    load_invoices,
+    parse_aging_query,
+)
+from agents.invoice_query import InvoiceQueryIndex, get_query_index, run_invoice_query
+from agents.output_format import fit_text, format_table
 import os
 from dotenv import load_dotenv
 
@@ -12,13 +21,13 @@ load_dotenv()
 
 # --- Data Loading and Analysis Functions (largely unchanged) ---
 
-def load_invoice_data(path: str = "data/invoices_data.csv") -> pd.DataFrame:
+INVOICE_PATH = "data/invoices_data.csv"
+
+
+def load_invoice_data(path: str = INVOICE_PATH) -> pd.DataFrame:
     """Load invoice data from a CSV file."""
     try:
-        df = pd.read_csv(path)
-        df['invoice_date'] = pd.to_datetime(df['invoice_date'])
-        df['due_date'] = pd.to_datetime(df['due_date'])
-        return df
+        return load_invoices(path)
     except FileNotFoundError:
         # Fallback data if the file doesn't exist
         print("CSV file not found. Using fallback data.")
@@ -33,6 +42,20 @@ def load_invoice_data(path: str = "data/invoices_data.csv") -> pd.DataFrame:
             "due_date": [pd.to_datetime("2025-10-15"), pd.to_datetime("2025-11-19"), pd.to_datetime("2025-09-09")]
         })
 
+
+def get_invoice_index(path: str = INVOICE_PATH) -> InvoiceAgingIndex:
+    """Cached aging index over the invoice CSV (fallback rows when it is missing)."""
+    if not os.path.exists(path):
+        return InvoiceAgingIndex(load_invoice_data(path))
+    return get_aging_index(path)
+
+
+def get_invoice_query_index(path: str = INVOICE_PATH) -> InvoiceQueryIndex:
+    """Cached filter/aggregate index over the invoice CSV (fallback rows when it is missing)."""
+    if not os.path.exists(path):
+        return InvoiceQueryIndex(load_invoice_data(path))
+    return get_query_index(path)
+
 @tool
 def analyze_all_invoices(query: str) -> str:
     """
@@ -40,33 +63,36 @@ def analyze_all_invoices(query: str) -> str:
     Use this tool when the user asks for a general overview, a report, or a full analysis of invoices.
     The 'query' argument is not used to filter data but is required by the agent.
     """
-    df = load_invoice_data()
+    index = get_invoice_index()
+    df = index.frame
     if df.empty:
         return "Không có dữ liệu hóa đơn để phân tích."
     
-    # --- Analysis logic (same as your original code) ---
-    total_invoices = len(df)
-    pending_invoices = df[df['status'].isin(['pending', 'overdue'])].shape[0]
-    paid_invoices = df[df['status'] == 'paid'].shape[0]
-    overdue_invoices = df[df['is_overdue'] == True].shape[0]
-    
-    total_amount = df['amount'].sum()
-    pending_amount = df[df['status'].isin(['pending', 'overdue'])]['amount'].sum()
-    paid_amount = df[df['status'] == 'paid']['amount'].sum()
-    overdue_amount = df[df['is_overdue'] == True]['amount'].sum()
+    # Totals come from the aging index's prefix sums; overdue is evaluated as of
+    # today instead of trusting the is_overdue flag stored at generation time
+    total_invoices = len(index)
+    pending = index.summary(['pending', 'overdue'])
+    paid = index.summary(['paid'])
+    overdue = index.overdue()
+    pending_invoices, pending_amount = pending['count'], pending['amount']
+    paid_invoices, paid_amount = paid['count'], paid['amount']
+    overdue_invoices, overdue_amount = overdue['count'], overdue['amount']
+    total_amount = float(index.cum_amount[-1])
     
-    vendor_summary = df.groupby('vendor').agg(
+    vendor_summary = df.groupby('vendor', observed=True).agg(
         total_amount=('amount', 'sum'),
         invoice_count=('invoice_id', 'count')
     ).sort_values('total_amount', ascending=False).round(2)
     
-    payment_terms_analysis = df['payment_terms'].value_counts()
+    payment_terms_analysis = df['payment_terms'].value_counts().rename_axis('payment_terms').reset_index()
     
     insights = []
     if overdue_invoices > 0:
-        insights.append(f"🚨 Có {overdue_invoices} hóa đơn đã quá hạn với tổng giá trị là {overdue_amount:,.2f} USD. Cần hành động ngay.")
+        insights.append(f"🚨 Có {overdue_invoices} hóa đơn đã quá hạn với tổng giá trị là {overdue_amount:,.2f} USD "
+                        f"(tiền phạt tích lũy {overdue['penalty']:,.2f} USD). Cần hành động ngay.")
     if pending_amount > total_amount * 0.5:
         insights.append(f"⚠️ Hơn 50% tổng giá trị hóa đơn ({pending_amount/total_amount:.1%}) đang chờ thanh toán.")
+    insights_text = "".join(f"- {i}\n" for i in insights) if insights else "✅ Mọi thứ đều ổn."
 
     return f"""
 **Báo cáo tổng quan về hóa đơn:**
@@ -81,14 +107,40 @@ def analyze_all_invoices(query: str) -> str:
 {vendor_summary.head().to_string()}
 
 **Phân tích điều khoản thanh toán:**
-{payment_terms_analysis.to_string()}
+{format_table(payment_terms_analysis, budget=120)}
 
 **Thông tin chi tiết quan trọng:**
-{''.join(f'- {i}\n' for i in insights) if insights else "✅ Mọi thứ đều ổn."}
+{insights_text}
 """
-llm = ChatOpenAI(temperature=0, model="gpt-4", openai_api_key=os.getenv("OPENAI_API_KEY"))
 
-tools = [analyze_all_invoices]
+@tool
+def invoice_aging(query: str) -> str:
+    """
+    Invoice aging as of a date: overdue invoices with accrued late-payment penalty (1.5%/month),
+    aging buckets (0-30/31-60/61-90/90+ days past due) and invoices due in the next N days.
+    Use this tool for questions about overdue invoices, due dates, aging or penalties.
+    The input may contain an as-of date (YYYY-MM-DD) and a window such as "60 ngày"; defaults: today, 30 days.
+    """
+    spec = parse_aging_query(query)
+    return fit_text(format_aging_report(get_invoice_index(), as_of=spec["as_of"], days=spec["days"]),
+                    title="Invoice aging")
+
+
+@tool
+def query_invoices(query: str) -> str:
+    """
+    Filtered invoice statistics: count, total, average, min and max of the invoices matching the question,
+    optionally grouped by vendor, status, month, payment terms or invoice type.
+    Use this tool for questions about specific vendors, statuses, periods or amount ranges,
+    e.g. "hóa đơn của Prime Services tháng 3/2025 trên 5,000 USD theo trạng thái".
+    Pass the user's question unchanged; filters are parsed from it. Only matching invoices are read.
+    """
+    return fit_text(run_invoice_query(get_invoice_query_index(), query), title="Invoice query")
+
+
+llm = get_llm(model="gpt-4", temperature=0)
+
+tools = [analyze_all_invoices, invoice_aging, query_invoices]
 prompt_template = """
 You are an expert financial assistant specializing in invoice management, responding in Vietnamese.
 
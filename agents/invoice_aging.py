@@ -0,0 +1,191 @@
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Statuses that still owe money; paid and cancelled invoices never age
+OPEN_STATUSES = ("pending", "approved", "overdue", "disputed")
+# Late-payment policy (rag_documents: "Hóa đơn quá hạn sẽ bị phạt 1.5% mỗi tháng"), simple interest
+PENALTY_RATE_MONTHLY = 0.015
+DAYS_PER_MONTH = 30
+# (label, min days overdue, max days overdue); None = open-ended
+AGING_BUCKETS = [("0-30", 1, 30), ("31-60", 31, 60), ("61-90", 61, 90), ("90+", 91, None)]
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def _day(value: Any) -> int:
+    """Calendar day as an integer day number"""
+    return int((np.datetime64(pd.Timestamp(value).date(), "D") - _EPOCH).astype(np.int64))
+
+
+def _penalty(amount_days: float) -> float:
+    return amount_days * PENALTY_RATE_MONTHLY / DAYS_PER_MONTH
+
+
+class InvoiceAgingIndex:
+    """Invoices sorted by due date within status partitions, with prefix sums.
+
+    Every aggregate over a due-date window (overdue as of D, an aging
+    bucket, due in the next N days) is two `searchsorted` calls plus prefix
+    sum differences per status, so it costs O(log n) no matter how many
+    invoices there are, and "as of" is a query argument rather than a flag
+    frozen at generation time.
+
+    Penalty accrued as of D on invoices due before D is
+    rate * sum(amount * (D - due)) = rate * (D * sum(amount) - sum(amount * due)),
+    so a second prefix sum over amount * due gives it in O(1) as well.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        due = pd.to_datetime(df["due_date"]).to_numpy().astype("datetime64[D]")
+        status = pd.Categorical(df["status"].astype(str))
+        codes = status.codes
+        order = np.lexsort((due, codes))
+        bounds = np.searchsorted(codes[order], np.arange(len(status.categories) + 1))
+
+        self.frame = df
+        self.order = order
+        self.due = (due[order] - _EPOCH).astype(np.int64)
+        self.amount = df["amount"].to_numpy(dtype=float)[order]
+        zero = np.zeros(1)
+        self.cum_amount = np.concatenate([zero, np.cumsum(self.amount)])
+        self.cum_amount_due = np.concatenate([zero, np.cumsum(self.amount * self.due)])
+        self.partitions = {str(s): (int(bounds[i]), int(bounds[i + 1])) for i, s in enumerate(status.categories)}
+
+    def __len__(self) -> int:
+        return len(self.due)
+
+    def _statuses(self, statuses: Optional[Iterable[str]]) -> List[Tuple[int, int]]:
+        statuses = OPEN_STATUSES if statuses is None else statuses
+        return [self.partitions[s] for s in statuses if s in self.partitions]
+
+    def _window(self, lo_day: Optional[int], hi_day: Optional[int],
+                statuses: Optional[Iterable[str]]) -> List[Tuple[int, int]]:
+        """Row ranges (in sorted order) with lo_day <= due <= hi_day, per status partition"""
+        ranges = []
+        for start, end in self._statuses(statuses):
+            due = self.due[start:end]
+            i = start + (np.searchsorted(due, lo_day, side="left") if lo_day is not None else 0)
+            j = start + (np.searchsorted(due, hi_day, side="right") if hi_day is not None else end - start)
+            if j > i:
+                ranges.append((int(i), int(j)))
+        return ranges
+
+    def _aggregate(self, ranges: List[Tuple[int, int]], as_of_day: int) -> Dict[str, float]:
+        count = sum(j - i for i, j in ranges)
+        amount = sum(self.cum_amount[j] - self.cum_amount[i] for i, j in ranges)
+        amount_due = sum(self.cum_amount_due[j] - self.cum_amount_due[i] for i, j in ranges)
+        # sum(amount * (as_of - due)); positive for overdue windows
+        amount_days = as_of_day * amount - amount_due
+        return {"count": int(count), "amount": float(amount), "penalty": float(max(_penalty(amount_days), 0.0))}
+
+    def summary(self, statuses: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Count and amount of every invoice in the given statuses (all open ones by default)"""
+        ranges = [(i, j) for i, j in self._statuses(statuses) if j > i]
+        return {"count": int(sum(j - i for i, j in ranges)),
+                "amount": float(sum(self.cum_amount[j] - self.cum_amount[i] for i, j in ranges))}
+
+    def overdue(self, as_of: Any = None, statuses: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Unsettled invoices with due_date before `as_of` (default: today), with penalty accrued so far"""
+        d = _day(as_of if as_of is not None else pd.Timestamp.today())
+        return self._aggregate(self._window(None, d - 1, statuses), d)
+
+    def aging(self, as_of: Any = None, statuses: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Overdue count/amount/penalty per aging bucket (days past due)"""
+        d = _day(as_of if as_of is not None else pd.Timestamp.today())
+        rows = []
+        for label, lo, hi in AGING_BUCKETS:
+            # lo..hi days overdue <=> due in [d - hi, d - lo]
+            window = self._window(d - hi if hi is not None else None, d - lo, statuses)
+            rows.append({"bucket": label, **self._aggregate(window, d)})
+        return pd.DataFrame(rows)
+
+    def due_within(self, days: int, as_of: Any = None, statuses: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Unsettled invoices falling due from `as_of` through `as_of + days`.
+
+        `penalty` here is the monthly penalty they would start accruing if missed.
+        """
+        d = _day(as_of if as_of is not None else pd.Timestamp.today())
+        result = self._aggregate(self._window(d, d + days, statuses), d)
+        result["penalty"] = result["amount"] * PENALTY_RATE_MONTHLY
+        return result
+
+    def overdue_invoices(self, as_of: Any = None, limit: int = 10,
+                         statuses: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """The `limit` longest-overdue invoices; only the oldest `limit` rows of each partition are touched"""
+        d = _day(as_of if as_of is not None else pd.Timestamp.today())
+        positions = np.concatenate([np.arange(i, min(j, i + limit))
+                                    for i, j in self._window(None, d - 1, statuses)] or [np.array([], dtype=int)])
+        positions = positions[np.argsort(self.due[positions], kind="stable")][:limit]
+        rows = self.frame.iloc[self.order[positions]]
+        days_overdue = d - self.due[positions]
+        out = rows[[c for c in ("invoice_id", "vendor", "status", "due_date", "amount") if c in rows]].copy()
+        out["days_overdue"] = days_overdue
+        out["penalty"] = _penalty(self.amount[positions] * days_overdue).round(2)
+        return out.reset_index(drop=True)
+
+
+CATEGORY_COLUMNS = ("vendor", "invoice_type", "payment_terms", "status", "approved_by")
+
+
+def load_invoices(path: str) -> pd.DataFrame:
+    """Read the invoice CSV with parsed dates and categorical text columns
+    (a few bytes per row instead of a Python string each)"""
+    header = pd.read_csv(path, nrows=0).columns
+    dtype = {c: "category" for c in CATEGORY_COLUMNS if c in header}
+    dates = [c for c in ("invoice_date", "due_date") if c in header]
+    return pd.read_csv(path, dtype=dtype, parse_dates=dates)
+
+
+@lru_cache(maxsize=4)
+def _cached_frame(path: str, mtime: float) -> pd.DataFrame:
+    return load_invoices(path)
+
+
+def get_invoice_frame(path: str = "data/invoices_data.csv") -> pd.DataFrame:
+    """Parsed invoice CSV shared by the indexes built on it, reloaded only when the file changes"""
+    return _cached_frame(os.path.abspath(path), os.path.getmtime(path))
+
+
+@lru_cache(maxsize=4)
+def _cached_index(path: str, mtime: float) -> InvoiceAgingIndex:
+    return InvoiceAgingIndex(get_invoice_frame(path))
+
+
+def get_aging_index(path: str = "data/invoices_data.csv") -> InvoiceAgingIndex:
+    """Index for the CSV, rebuilt only when the file changes"""
+    return _cached_index(os.path.abspath(path), os.path.getmtime(path))
+
+
+def parse_aging_query(text: str) -> Dict[str, Any]:
+    """`as_of` from a YYYY-MM-DD date, `days` from "N ngày" / "N days" (default 30)"""
+    as_of = re.search(r"\d{4}-\d{2}-\d{2}", text)
+    days = re.search(r"(\d+)\s*(?:ngày|days?)", text.lower())
+    return {"as_of": as_of.group(0) if as_of else None, "days": int(days.group(1)) if days else 30}
+
+
+def format_aging_report(index: InvoiceAgingIndex, as_of: Any = None, days: int = 30, limit: int = 5) -> str:
+    as_of = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp.today().normalize()
+    overdue = index.overdue(as_of)
+    upcoming = index.due_within(days, as_of)
+    buckets = index.aging(as_of)
+    lines = [
+        f"**Tuổi nợ hóa đơn tính đến {as_of:%Y-%m-%d}** (phạt {PENALTY_RATE_MONTHLY:.1%}/tháng)",
+        f"- Quá hạn: {overdue['count']:,} hóa đơn, {overdue['amount']:,.2f} USD, "
+        f"tiền phạt tích lũy {overdue['penalty']:,.2f} USD",
+        f"- Đến hạn trong {days} ngày tới: {upcoming['count']:,} hóa đơn, {upcoming['amount']:,.2f} USD "
+        f"(phạt {upcoming['penalty']:,.2f} USD/tháng nếu trễ)",
+        "",
+        "**Phân nhóm theo số ngày quá hạn:**",
+    ]
+    for row in buckets.itertuples(index=False):
+        lines.append(f"- {row.bucket} ngày: {row.count:,} hóa đơn, {row.amount:,.2f} USD, phạt {row.penalty:,.2f} USD")
+    oldest = index.overdue_invoices(as_of, limit=limit)
+    if not oldest.empty:
+        oldest["due_date"] = pd.to_datetime(oldest["due_date"]).dt.strftime("%Y-%m-%d")
+        lines += ["", f"**{len(oldest)} hóa đơn quá hạn lâu nhất:**", oldest.to_string(index=False)]
+    return "\n".join(lines)
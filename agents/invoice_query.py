@@ -0,0 +1,328 @@
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from agents.invoice_aging import OPEN_STATUSES, get_invoice_frame
+
+GROUP_COLUMNS = ("vendor", "status", "payment_terms", "invoice_type")
+GROUP_KEYWORDS = [
+    ("vendor", ["theo vendor", "by vendor", "theo nhà cung cấp", "per vendor", "từng vendor"]),
+    ("status", ["theo trạng thái", "by status", "tình trạng", "per status"]),
+    ("month", ["theo tháng", "by month", "hàng tháng", "monthly", "per month"]),
+    ("payment_terms", ["điều khoản", "payment terms", "by terms"]),
+    ("invoice_type", ["theo loại", "by type", "loại hóa đơn", "invoice type"]),
+]
+STATUS_KEYWORDS = [
+    ("paid", ["đã thanh toán", "paid"]),
+    ("pending", ["chờ thanh toán", "đang chờ", "pending", "chưa thanh toán", "unpaid"]),
+    ("approved", ["đã duyệt", "approved"]),
+    ("disputed", ["tranh chấp", "disputed"]),
+    ("cancelled", ["đã hủy", "bị hủy", "cancelled", "canceled"]),
+]
+# "quá hạn" is evaluated from due dates as of today, like the aging index
+OVERDUE_KEYWORDS = ["quá hạn", "overdue"]
+DUE_DATE_KEYWORDS = ["đến hạn", "due date", "hạn thanh toán", "due in", "due on", "due between"]
+LIST_LIMIT = 5
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def _days(values: Any) -> np.ndarray:
+    return (pd.to_datetime(values).to_numpy().astype("datetime64[D]") - _EPOCH).astype(np.int64)
+
+
+def _day(value: Any) -> int:
+    return int((np.datetime64(pd.Timestamp(value).date(), "D") - _EPOCH).astype(np.int64))
+
+
+class InvoiceQueryIndex:
+    """Filter and aggregate invoices without scanning the whole frame.
+
+    Rows are kept in invoice-date order, and vendor/status each get posting
+    lists: row ids grouped by categorical code, date-sorted inside a code.
+    A query starts from the most selective of those access paths (a date
+    slice, or per-code date slices), so only candidate rows are touched by
+    the remaining filters and the aggregation. Due-date ranges and amount
+    ranges are applied to the candidates.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.frame = df
+        self.date = _days(df["invoice_date"])
+        self.due = _days(df["due_date"])
+        self.amount = df["amount"].to_numpy(dtype=float)
+        self.codes: Dict[str, np.ndarray] = {}
+        self.categories: Dict[str, List[str]] = {}
+        for col in GROUP_COLUMNS:
+            if col in df:
+                cat = pd.Categorical(df[col].astype(str) if df[col].dtype != "category" else df[col])
+                self.codes[col] = cat.codes.astype(np.int64)
+                self.categories[col] = [str(c) for c in cat.categories]
+
+        self.by_date = np.argsort(self.date, kind="stable")
+        self.sorted_date = self.date[self.by_date]
+        self.postings = {}
+        for col in ("vendor", "status"):
+            codes = self.codes[col]
+            perm = np.lexsort((self.date, codes))
+            bounds = np.searchsorted(codes[perm], np.arange(len(self.categories[col]) + 1))
+            self.postings[col] = (perm, self.date[perm], bounds)
+        self.open_codes = [self.categories["status"].index(s) for s in OPEN_STATUSES
+                           if s in self.categories["status"]]
+
+    def __len__(self) -> int:
+        return len(self.amount)
+
+    def _code_list(self, col: str, values: Optional[Sequence[str]]) -> Optional[List[int]]:
+        if not values:
+            return None
+        lookup = {c.lower(): i for i, c in enumerate(self.categories[col])}
+        return [lookup[v.lower()] for v in values if v.lower() in lookup]
+
+    def _date_slices(self, col: Optional[str], codes: Optional[List[int]], lo: Optional[int], hi: Optional[int]):
+        """(permutation, start, end) slices covering lo <= invoice_date <= hi"""
+        if col is None:
+            i = np.searchsorted(self.sorted_date, lo, side="left") if lo is not None else 0
+            j = np.searchsorted(self.sorted_date, hi, side="right") if hi is not None else len(self)
+            return [(self.by_date, int(i), int(j))]
+        perm, dates, bounds = self.postings[col]
+        slices = []
+        for code in codes:
+            start, end = int(bounds[code]), int(bounds[code + 1])
+            i = start + (np.searchsorted(dates[start:end], lo, side="left") if lo is not None else 0)
+            j = start + (np.searchsorted(dates[start:end], hi, side="right") if hi is not None else end - start)
+            slices.append((perm, int(i), int(j)))
+        return slices
+
+    def select(self, vendors: Optional[Sequence[str]] = None, statuses: Optional[Sequence[str]] = None,
+               date_from: Any = None, date_to: Any = None, due_from: Any = None, due_to: Any = None,
+               amount_min: Optional[float] = None, amount_max: Optional[float] = None,
+               overdue_as_of: Any = None) -> np.ndarray:
+        """Row ids matching every given filter (unknown vendor/status names match nothing)"""
+        lo = _day(date_from) if date_from is not None else None
+        hi = _day(date_to) if date_to is not None else None
+        wanted = {"vendor": self._code_list("vendor", vendors), "status": self._code_list("status", statuses)}
+
+        # Cheapest access path: whichever yields the fewest candidate rows
+        paths = {None: self._date_slices(None, None, lo, hi)}
+        for col, codes in wanted.items():
+            if codes is not None:
+                paths[col] = self._date_slices(col, codes, lo, hi)
+        best = min(paths, key=lambda c: sum(j - i for _, i, j in paths[c]))
+        parts = [perm[i:j] for perm, i, j in paths[best] if j > i]
+        rows = np.concatenate(parts) if parts else np.array([], dtype=np.int64)
+
+        mask = np.ones(len(rows), dtype=bool)
+        for col, codes in wanted.items():
+            if codes is not None and col != best:
+                mask &= np.isin(self.codes[col][rows], codes)
+        if amount_min is not None:
+            mask &= self.amount[rows] >= amount_min
+        if amount_max is not None:
+            mask &= self.amount[rows] <= amount_max
+        if due_from is not None:
+            mask &= self.due[rows] >= _day(due_from)
+        if due_to is not None:
+            mask &= self.due[rows] <= _day(due_to)
+        if overdue_as_of is not None:
+            mask &= (self.due[rows] < _day(overdue_as_of)) & np.isin(self.codes["status"][rows], self.open_codes)
+        return rows[mask]
+
+    def aggregate(self, rows: np.ndarray, group_by: Optional[str] = None, limit: int = 10) -> Dict[str, Any]:
+        """Totals over `rows`, plus per-group totals (top `limit` by amount) when `group_by` is set"""
+        amounts = self.amount[rows]
+        result = {
+            "count": int(len(rows)),
+            "amount": float(amounts.sum()),
+            "avg": float(amounts.mean()) if len(rows) else 0.0,
+            "min": float(amounts.min()) if len(rows) else 0.0,
+            "max": float(amounts.max()) if len(rows) else 0.0,
+            "groups": None,
+        }
+        if not group_by or not len(rows):
+            return result
+        if group_by == "month":
+            months = (self.date[rows].astype("datetime64[D]")).astype("datetime64[M]")
+            labels, codes = np.unique(months, return_inverse=True)
+            labels = [str(m) for m in labels]
+        else:
+            codes, labels = self.codes[group_by][rows], self.categories[group_by]
+        counts = np.bincount(codes, minlength=len(labels))
+        totals = np.bincount(codes, weights=amounts, minlength=len(labels))
+        present = np.flatnonzero(counts)
+        if group_by == "month":
+            order = present  # chronological
+        else:
+            order = present[np.argsort(-totals[present], kind="stable")]
+        groups = pd.DataFrame({group_by: [labels[k] for k in order], "count": counts[order],
+                               "amount": totals[order].round(2)})
+        result["groups"] = groups.head(limit) if limit else groups
+        result["group_count"] = len(groups)
+        return result
+
+    def rows(self, rows: np.ndarray, limit: int = LIST_LIMIT) -> pd.DataFrame:
+        columns = [c for c in ("invoice_id", "vendor", "invoice_date", "due_date", "amount", "status") if c in self.frame]
+        return self.frame.iloc[rows[:limit]][columns].reset_index(drop=True)
+
+
+@lru_cache(maxsize=4)
+def _cached_index(path: str, mtime: float) -> InvoiceQueryIndex:
+    return InvoiceQueryIndex(get_invoice_frame(path))
+
+
+def get_query_index(path: str = "data/invoices_data.csv") -> InvoiceQueryIndex:
+    """Index for the CSV, rebuilt only when the file changes"""
+    return _cached_index(os.path.abspath(path), os.path.getmtime(path))
+
+
+# -- parsing ------------------------------------------------------------------------------------
+_DATE = r"\d{4}-\d{2}-\d{2}"
+_NUMBER = r"\$?\s*(\d[\d.,]*)\s*(k|m|nghìn|triệu)?\b"
+
+
+def _amount(number: str, suffix: Optional[str]) -> float:
+    if re.fullmatch(r"\d{1,3}(\.\d{3})+", number):  # 10.000 (Vietnamese thousands separator)
+        number = number.replace(".", "")
+    value = float(number.replace(",", ""))
+    return value * {"k": 1e3, "nghìn": 1e3, "m": 1e6, "triệu": 1e6}.get(suffix or "", 1)
+
+
+def _month_range(year: int, month: int):
+    start = pd.Timestamp(year=year, month=month, day=1)
+    return start, start + pd.offsets.MonthEnd(0)
+
+
+def parse_invoice_query(text: str, vendors: Sequence[str] = (), as_of: Any = None) -> Dict[str, Any]:
+    """Structured filters from a free-text question.
+
+    Recognizes known vendor names, status words, "quá hạn"/overdue, ISO date
+    ranges ("từ A đến B", "sau A", "trước B"), months ("tháng 3/2025",
+    "2025-03", "tháng này/trước"), quarters ("Q2 2025", "quý 2/2025"), years,
+    amount bounds ("> 10000", "trên 5k", "từ 1,000 đến 5,000 USD"),
+    "theo vendor/trạng thái/tháng/..." grouping and "top N". Date ranges
+    apply to due_date when the question is about due dates.
+    """
+    lowered = text.lower()
+    today = pd.Timestamp(as_of) if as_of is not None else pd.Timestamp.today().normalize()
+    spec: Dict[str, Any] = {"vendors": None, "statuses": None, "date_from": None, "date_to": None,
+                            "due_from": None, "due_to": None, "amount_min": None, "amount_max": None,
+                            "overdue_as_of": None, "group_by": None, "limit": 10}
+
+    found = [v for v in sorted(vendors, key=len, reverse=True) if v.lower() in lowered]
+    spec["vendors"] = found or None
+    rest = lowered
+    for v in found:
+        rest = rest.replace(v.lower(), " ")
+
+    statuses = [status for status, words in STATUS_KEYWORDS
+                if any(re.search(rf"\b{re.escape(w)}\b", rest) for w in words)]
+    spec["statuses"] = statuses or None
+    if any(w in rest for w in OVERDUE_KEYWORDS):
+        spec["overdue_as_of"] = today.strftime("%Y-%m-%d")
+
+    for group_by, words in GROUP_KEYWORDS:
+        if any(w in rest for w in words):
+            spec["group_by"] = group_by
+            break
+    top = re.search(r"\btop\s*(\d+)", rest)
+    if top:
+        spec["limit"] = int(top.group(1))
+        rest = rest.replace(top.group(0), " ")
+
+    # Dates
+    start = end = None
+    between = re.search(rf"(?:từ|from|between)\s*({_DATE})\s*(?:đến|tới|to|and|-)\s*({_DATE})", rest)
+    if between:
+        start, end = pd.Timestamp(between.group(1)), pd.Timestamp(between.group(2))
+    else:
+        after = re.search(rf"(?:sau|after|since|từ)\s*(?:ngày\s*)?({_DATE})", rest)
+        before = re.search(rf"(?:trước|before|until|đến)\s*(?:ngày\s*)?({_DATE})", rest)
+        if after or before:
+            start = pd.Timestamp(after.group(1)) if after else None
+            end = pd.Timestamp(before.group(1)) if before else None
+        elif re.search(_DATE, rest):
+            start = end = pd.Timestamp(re.search(_DATE, rest).group(0))
+    rest = re.sub(_DATE, " ", rest)
+    if start is None and end is None:
+        month = (re.search(r"tháng\s*(\d{1,2})\s*(?:/|-|năm)\s*(\d{4})", rest)
+                 or re.search(r"\b(\d{4})-(\d{1,2})\b", rest))
+        quarter = re.search(r"(?:quý|\bq)\s*([1-4])\s*(?:/|-|năm)?\s*(\d{4})", rest)
+        year = re.search(r"(?:năm|in|year)\s*(\d{4})\b", rest)
+        if month:
+            a, b = int(month.group(1)), int(month.group(2))
+            start, end = _month_range(b, a) if a <= 12 and b > 12 else _month_range(a, b)
+            rest = rest.replace(month.group(0), " ")
+        elif quarter:
+            q, y = int(quarter.group(1)), int(quarter.group(2))
+            start = pd.Timestamp(year=y, month=3 * q - 2, day=1)
+            end = start + pd.offsets.QuarterEnd(0)
+            rest = rest.replace(quarter.group(0), " ")
+        elif "tháng này" in rest or "this month" in rest:
+            start, end = _month_range(today.year, today.month)
+        elif "tháng trước" in rest or "last month" in rest:
+            prev = today - pd.offsets.MonthBegin(1) - pd.offsets.MonthBegin(1)
+            start, end = _month_range(prev.year, prev.month)
+        elif year:
+            start, end = pd.Timestamp(year=int(year.group(1)), month=1, day=1), pd.Timestamp(year=int(year.group(1)), month=12, day=31)
+            rest = rest.replace(year.group(0), " ")
+    prefix = "due" if any(w in lowered for w in DUE_DATE_KEYWORDS) else "date"
+    spec[f"{prefix}_from"] = start.strftime("%Y-%m-%d") if start is not None else None
+    spec[f"{prefix}_to"] = end.strftime("%Y-%m-%d") if end is not None else None
+
+    # Amounts (dates are gone from `rest` by now)
+    between = re.search(rf"(?:từ|between|from|giữa)\s*{_NUMBER}\s*(?:usd)?\s*(?:đến|tới|to|and|và|-)\s*{_NUMBER}", rest)
+    if between:
+        spec["amount_min"] = _amount(between.group(1), between.group(2))
+        spec["amount_max"] = _amount(between.group(3), between.group(4))
+    else:
+        low = re.search(rf"(?:>=|≥|>|trên|hơn|over|above|at least|ít nhất|tối thiểu)\s*{_NUMBER}", rest)
+        high = re.search(rf"(?:<=|≤|<|dưới|under|below|at most|tối đa)\s*{_NUMBER}", rest)
+        if low:
+            spec["amount_min"] = _amount(low.group(1), low.group(2))
+        if high:
+            spec["amount_max"] = _amount(high.group(1), high.group(2))
+    return spec
+
+
+def _describe(spec: Dict[str, Any]) -> str:
+    parts = []
+    if spec["vendors"]:
+        parts.append("vendor: " + ", ".join(spec["vendors"]))
+    if spec["statuses"]:
+        parts.append("trạng thái: " + ", ".join(spec["statuses"]))
+    if spec["overdue_as_of"]:
+        parts.append(f"quá hạn tính đến {spec['overdue_as_of']}")
+    for prefix, label in (("date", "ngày hóa đơn"), ("due", "hạn thanh toán")):
+        lo, hi = spec[f"{prefix}_from"], spec[f"{prefix}_to"]
+        if lo or hi:
+            parts.append(f"{label} {lo or '…'} → {hi or '…'}")
+    if spec["amount_min"] is not None or spec["amount_max"] is not None:
+        lo = f"{spec['amount_min']:,.0f}" if spec["amount_min"] is not None else "…"
+        hi = f"{spec['amount_max']:,.0f}" if spec["amount_max"] is not None else "…"
+        parts.append(f"số tiền {lo} → {hi} USD")
+    return "; ".join(parts) or "tất cả hóa đơn"
+
+
+def run_invoice_query(index: InvoiceQueryIndex, text: str, as_of: Any = None) -> str:
+    """Answer a free-text invoice question with only the matching aggregates"""
+    spec = parse_invoice_query(text, index.categories.get("vendor", []), as_of=as_of)
+    rows = index.select(**{k: v for k, v in spec.items() if k not in ("group_by", "limit")})
+    result = index.aggregate(rows, group_by=spec["group_by"], limit=spec["limit"])
+    lines = [f"**Hóa đơn ({_describe(spec)}):** {result['count']:,} hóa đơn, tổng {result['amount']:,.2f} USD"]
+    if result["count"]:
+        lines.append(f"- Trung bình {result['avg']:,.2f} USD, nhỏ nhất {result['min']:,.2f}, lớn nhất {result['max']:,.2f}")
+    if result["groups"] is not None:
+        shown = len(result["groups"])
+        more = f" (top {shown}/{result['group_count']})" if shown < result["group_count"] else ""
+        lines += [f"\n**Theo {spec['group_by']}{more}:**", result["groups"].to_string(index=False)]
+    elif 0 < result["count"] <= LIST_LIMIT:
+        listed = index.rows(rows)
+        for col in ("invoice_date", "due_date"):
+            if col in listed:
+                listed[col] = pd.to_datetime(listed[col]).dt.strftime("%Y-%m-%d")
+        lines += ["", listed.to_string(index=False)]
+    return "\n".join(lines)
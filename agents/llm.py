@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from agents.fake_llm import FakeLLMScript, LatencyModel, count_tokens
+from agents.llm_cache import langchain_cache
+
+_ = load_dotenv()
+
+PROVIDERS = ("openai", "ollama", "fake")
+_ROLES = {"human": "user", "ai": "assistant", "system": "system", "function": "function", "tool": "tool"}
+
+# Totals across every FakeChatModel call; `simulated_seconds` is the time spent
+# sleeping for the latency model, i.e. what a real LLM would have cost.
+FAKE_STATS = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "simulated_seconds": 0.0}
+_stats_lock = threading.Lock()
+
+
+def reset_fake_stats() -> Dict[str, float]:
+    with _stats_lock:
+        previous = dict(FAKE_STATS)
+        FAKE_STATS.update(calls=0, prompt_tokens=0, completion_tokens=0, simulated_seconds=0.0)
+    return previous
+
+
+def _message_dict(message: BaseMessage) -> Dict[str, Any]:
+    role = _ROLES.get(message.type, getattr(message, "role", "user"))
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    return {"role": role, "content": content or ""}
+
+
+class FakeChatModel(BaseChatModel):
+    """Offline, deterministic chat model.
+
+    Replies come from `FakeLLMScript`: valid router labels, ReAct traces and
+    OpenAI function/tool calls that make the agents run their real tools.
+    Latency is simulated with `LatencyModel` (zero by default), so timing an
+    agent with zero latency measures pure orchestration and tool overhead.
+    """
+
+    script: Dict[str, str] = {}
+    completion_tokens: int = 60
+    latency_ms: float = 0.0
+    ms_per_token: float = 0.0
+    ms_per_prompt_token: float = 0.0
+    jitter: float = 0.0
+    seed: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        dicts = [_message_dict(m) for m in messages]
+        reply = FakeLLMScript(self.script, self.completion_tokens).respond(
+            dicts, functions=kwargs.get("functions"), tools=kwargs.get("tools"))
+        content = reply["content"]
+        for s in stop or []:
+            if s in content:
+                content = content[:content.index(s)]
+
+        additional_kwargs = {}
+        if reply["function_call"]:
+            additional_kwargs["function_call"] = reply["function_call"]
+        if reply["tool_calls"]:
+            additional_kwargs["tool_calls"] = reply["tool_calls"]
+
+        prompt_tokens = sum(count_tokens(m["content"]) for m in dicts)
+        completion_tokens = count_tokens(content or str(additional_kwargs))
+        with _stats_lock:
+            seed = self.seed + FAKE_STATS["calls"]
+        delay = LatencyModel(self.latency_ms, self.ms_per_token, self.ms_per_prompt_token,
+                             self.jitter, seed).total(prompt_tokens, completion_tokens)
+        if delay > 0:
+            time.sleep(delay)
+        with _stats_lock:
+            FAKE_STATS["calls"] += 1
+            FAKE_STATS["prompt_tokens"] += prompt_tokens
+            FAKE_STATS["completion_tokens"] += completion_tokens
+            FAKE_STATS["simulated_seconds"] += delay
+
+        message = AIMessage(content=content, additional_kwargs=additional_kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)],
+                          llm_output={"token_usage": {"prompt_tokens": prompt_tokens,
+                                                      "completion_tokens": completion_tokens}})
+
+
+def fake_settings() -> Dict[str, Any]:
+    """FakeChatModel settings from MAS_FAKE_* environment variables."""
+    script = FakeLLMScript.from_file(os.getenv("MAS_FAKE_SCRIPT")).script
+    return {
+        "script": script,
+        "completion_tokens": int(os.getenv("MAS_FAKE_COMPLETION_TOKENS", "60")),
+        "latency_ms": float(os.getenv("MAS_FAKE_LATENCY_MS", "0")),
+        "ms_per_token": float(os.getenv("MAS_FAKE_MS_PER_TOKEN", "0")),
+        "ms_per_prompt_token": float(os.getenv("MAS_FAKE_MS_PER_PROMPT_TOKEN", "0")),
+        "jitter": float(os.getenv("MAS_FAKE_JITTER", "0")),
+        "seed": int(os.getenv("MAS_FAKE_SEED", "0")),
+    }
+
+
+def get_llm(model: Optional[str] = None, temperature: float = 0.0, streaming: bool = False,
+            provider: Optional[str] = None) -> BaseChatModel:
+    """Chat model for the configured provider (MAS_LLM_PROVIDER: openai | ollama | fake).
+
+    `model` names an OpenAI model; Ollama uses OLLAMA_MODEL. Temperature-0
+    models get the shared completion cache (agents/llm_cache.py) in a
+    provider:model namespace; sampled ones are never cached.
+    """
+    provider = (provider or os.getenv("MAS_LLM_PROVIDER", "openai")).lower()
+
+    def cache(name: str):
+        return langchain_cache(f"{provider}:{name}") if temperature == 0 else None
+
+    if provider == "fake":
+        return FakeChatModel(cache=cache("fake"), **fake_settings())
+    if provider == "ollama":
+        from langchain_community.chat_models import ChatOllama
+        name = os.getenv("OLLAMA_MODEL", "llama2")
+        return ChatOllama(model=name, temperature=temperature, cache=cache(name))
+    if provider == "openai":
+        from langchain_openai import ChatOpenAI
+        name = model or os.getenv("OPENAI_MODEL", "gpt-4")
+        return ChatOpenAI(model=name, temperature=temperature, streaming=streaming,
+                          openai_api_key=os.getenv("OPENAI_API_KEY"), cache=cache(name))
+    raise ValueError(f"Unknown MAS_LLM_PROVIDER '{provider}'. Choose from: {', '.join(PROVIDERS)}")
@@ -0,0 +1,215 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+# MAS_LLM_CACHE: SQLite file for cached completions; "off" disables caching
+DEFAULT_PATH = ".cache/llm_cache.sqlite"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 100_000
+DEFAULT_MEMORY_ENTRIES = 1024
+# Share of entries dropped when the table is full, so eviction runs rarely
+EVICT_FRACTION = 0.1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS completions_last_access ON completions (last_access);
+"""
+_COUNTERS = ("memory_hits", "disk_hits", "misses", "writes", "expired", "evicted")
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Digest of the serialized messages and the model string (model, parameters, stop, bound tools)"""
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Completion cache: an in-process LRU in front of a SQLite table.
+
+    Entries live in namespaces (one per provider:model) and expire after
+    `ttl` seconds; past `max_entries` the least recently read are evicted.
+    SQLite (WAL mode, one connection per thread) lets several API workers
+    share the file. Values are opaque strings; the LangChain adapter from
+    `langchain_cache` serializes generations into them.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, ttl: Optional[float] = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, memory_entries: int = DEFAULT_MEMORY_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._writes_since_check = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, namespace: str, counter: str, n: int = 1) -> None:
+        stats = self._stats.setdefault(namespace, dict.fromkeys(_COUNTERS, 0))
+        stats[counter] += n
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def _remember(self, namespace: str, key: str, value: str, created: float) -> None:
+        self._memory[(namespace, key)] = (value, created)
+        self._memory.move_to_end((namespace, key))
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            hit = self._memory.get((namespace, key))
+            if hit is not None and not self._expired(hit[1], now):
+                self._memory.move_to_end((namespace, key))
+                self._count(namespace, "memory_hits")
+                return hit[0]
+        conn = self._connection()
+        row = conn.execute("SELECT value, created FROM completions WHERE namespace = ? AND key = ?",
+                           (namespace, key)).fetchone()
+        with self._lock:
+            self._memory.pop((namespace, key), None)
+            if row is None:
+                self._count(namespace, "misses")
+                return None
+            if self._expired(row[1], now):
+                self._count(namespace, "expired")
+                self._count(namespace, "misses")
+                expired = True
+            else:
+                self._remember(namespace, key, row[0], row[1])
+                self._count(namespace, "disk_hits")
+                expired = False
+        if expired:
+            conn.execute("DELETE FROM completions WHERE namespace = ? AND key = ?", (namespace, key))
+            return None
+        conn.execute("UPDATE completions SET last_access = ? WHERE namespace = ? AND key = ?", (now, namespace, key))
+        return row[0]
+
+    def put(self, namespace: str, key: str, value: str) -> None:
+        now = time.time()
+        conn = self._connection()
+        conn.execute("INSERT OR REPLACE INTO completions (namespace, key, value, created, last_access) "
+                     "VALUES (?, ?, ?, ?, ?)", (namespace, key, value, now, now))
+        with self._lock:
+            self._remember(namespace, key, value, now)
+            self._count(namespace, "writes")
+            self._writes_since_check += 1
+            check = self._writes_since_check >= max(1, int(self.max_entries * EVICT_FRACTION))
+            if check:
+                self._writes_since_check = 0
+        if check:
+            self._enforce_limits(conn, now)
+
+    def _enforce_limits(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired rows, then the least recently read ones beyond `max_entries`"""
+        if self.ttl is not None:
+            conn.execute("DELETE FROM completions WHERE created < ?", (now - self.ttl,))
+        total = conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        excess = total - self.max_entries
+        if excess > 0:
+            # Evict down to (1 - EVICT_FRACTION) of the limit so the next check is far away
+            excess += int(self.max_entries * EVICT_FRACTION)
+            victims = conn.execute("SELECT namespace, key FROM completions ORDER BY last_access LIMIT ?",
+                                   (excess,)).fetchall()
+            conn.executemany("DELETE FROM completions WHERE namespace = ? AND key = ?", victims)
+            with self._lock:
+                for namespace, key in victims:
+                    self._memory.pop((namespace, key), None)
+                    self._count(namespace, "evicted")
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        conn = self._connection()
+        if namespace is None:
+            conn.execute("DELETE FROM completions")
+        else:
+            conn.execute("DELETE FROM completions WHERE namespace = ?", (namespace,))
+        with self._lock:
+            for key in [k for k in self._memory if namespace is None or k[0] == namespace]:
+                del self._memory[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters per namespace (this process) plus entries stored per namespace (all processes)"""
+        rows = self._connection().execute(
+            "SELECT namespace, COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM completions GROUP BY namespace"
+        ).fetchall()
+        with self._lock:
+            namespaces = {ns: dict(counters) for ns, counters in self._stats.items()}
+            memory = len(self._memory)
+        for ns, entries, size in rows:
+            namespaces.setdefault(ns, dict.fromkeys(_COUNTERS, 0)).update(entries=entries, bytes=size)
+        for counters in namespaces.values():
+            counters.setdefault("entries", 0)
+            counters.setdefault("bytes", 0)
+            lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+            counters["hit_rate"] = round((counters["memory_hits"] + counters["disk_hits"]) / lookups, 4) if lookups else None
+        return {"path": self.path, "ttl_seconds": self.ttl, "max_entries": self.max_entries,
+                "memory_entries": memory, "namespaces": namespaces}
+
+
+@lru_cache(maxsize=1)
+def get_llm_cache() -> Optional[LLMCache]:
+    """Process-wide cache configured from MAS_LLM_CACHE* variables; None when disabled"""
+    path = os.getenv("MAS_LLM_CACHE", DEFAULT_PATH)
+    if path.lower() in ("", "0", "off", "false", "none"):
+        return None
+    ttl = float(os.getenv("MAS_LLM_CACHE_TTL", DEFAULT_TTL_SECONDS))
+    return LLMCache(path, ttl=ttl if ttl > 0 else None,
+                    max_entries=int(os.getenv("MAS_LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                    memory_entries=int(os.getenv("MAS_LLM_CACHE_MEMORY", DEFAULT_MEMORY_ENTRIES)))
+
+
+@lru_cache(maxsize=1)
+def _adapter_class():
+    from langchain_core.caches import BaseCache
+    from langchain_core.load import dumps, loads
+
+    class NamespacedLLMCache(BaseCache):
+        """LangChain cache interface over one namespace of an LLMCache"""
+
+        def __init__(self, store: LLMCache, namespace: str):
+            self.store = store
+            self.namespace = namespace
+
+        def lookup(self, prompt: str, llm_string: str):
+            value = self.store.get(self.namespace, cache_key(prompt, llm_string))
+            return loads(value) if value is not None else None
+
+        def update(self, prompt: str, llm_string: str, return_val) -> None:
+            self.store.put(self.namespace, cache_key(prompt, llm_string), dumps(list(return_val)))
+
+        def clear(self, **kwargs: Any) -> None:
+            self.store.clear(self.namespace)
+
+    return NamespacedLLMCache
+
+
+def langchain_cache(namespace: str):
+    """`cache=` argument for a chat model, or None when caching is disabled"""
+    store = get_llm_cache()
+    return _adapter_class()(store, namespace) if store is not None else None
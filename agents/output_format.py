@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Union
+
+import pandas as pd
+
+# Tokens a single tool result may put into a prompt; the full result goes to the artifact store
+DEFAULT_TOKEN_BUDGET = int(os.getenv("MAS_TOOL_TOKEN_BUDGET", "400"))
+# Artifacts kept in memory (oldest evicted first); MAS_ARTIFACT_DIR also writes them to disk
+ARTIFACT_LIMIT = int(os.getenv("MAS_ARTIFACT_LIMIT", "256"))
+STATS_COLUMNS = 6
+CACHE_MAX_CHARS = 16384
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    """tiktoken's cl100k_base when installed (and its vocabulary is available), else None"""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=8192)
+def _cached_count(text: str) -> int:
+    return len(_encoder().encode(text, disallowed_special=()))
+
+
+def count_tokens(text: str) -> int:
+    """Prompt tokens for `text`; ~4 characters per token without tiktoken.
+
+    tiktoken counts of prompt-sized strings are cached (the same rows get
+    re-rendered while a table is fitted to its budget); large texts are not,
+    so the cache never pins whole datasets in memory.
+    """
+    encoder = _encoder()
+    if encoder is None:
+        return max(1, (len(text) + 3) // 4)
+    if len(text) <= CACHE_MAX_CHARS:
+        return _cached_count(text)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+class ArtifactStore:
+    """Full tool results kept out of the prompt, retrievable by id (GET /artifacts/{id}).
+
+    Bounded LRU in memory; with `directory` each artifact is also written
+    there so other processes serving the API can find it. A DataFrame may be
+    stored as is; it is rendered to CSV only when someone asks for it.
+    """
+
+    def __init__(self, max_items: int = ARTIFACT_LIMIT, directory: Optional[str] = None):
+        self.max_items = max_items
+        self.directory = directory
+        self._items: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, artifact_id: str) -> str:
+        return os.path.join(self.directory, f"{artifact_id}.json")
+
+    def put(self, content: Union[str, pd.DataFrame], title: str = "", media_type: str = "text/plain") -> str:
+        if isinstance(content, pd.DataFrame):
+            media_type = "text/csv"
+            if self.directory:
+                content = _csv(content)
+        artifact = {"id": uuid.uuid4().hex[:16], "title": title, "media_type": media_type,
+                    "created": time.time(), "content": content}
+        with self._lock:
+            self._items[artifact["id"]] = artifact
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        if self.directory:
+            with open(self._path(artifact["id"]), "w", encoding="utf-8") as f:
+                json.dump(artifact, f, ensure_ascii=False)
+        return artifact["id"]
+
+    def get(self, artifact_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            artifact = self._items.get(artifact_id)
+            if artifact is not None:
+                self._items.move_to_end(artifact_id)
+                if isinstance(artifact["content"], pd.DataFrame):
+                    artifact["content"] = _csv(artifact["content"])
+                return artifact
+        if self.directory and artifact_id.isalnum() and os.path.exists(self._path(artifact_id)):
+            with open(self._path(artifact_id), encoding="utf-8") as f:
+                return json.load(f)
+        return None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+@lru_cache(maxsize=1)
+def get_artifact_store() -> ArtifactStore:
+    return ArtifactStore(directory=os.getenv("MAS_ARTIFACT_DIR") or None)
+
+
+def _csv(df: pd.DataFrame) -> str:
+    return df.to_csv(index=False, float_format="%.2f")
+
+
+def _pointer(artifact_id: str) -> str:
+    return f"full result: artifact {artifact_id} (GET /artifacts/{artifact_id})"
+
+
+def _stats(df: pd.DataFrame) -> str:
+    """One line per column: sum/mean/min/max for numbers, distinct count and top value otherwise"""
+    lines = []
+    for col in list(df.columns)[:STATS_COLUMNS]:
+        values = df[col].dropna()
+        if values.empty:
+            continue
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            lines.append(f"- {col}: sum {values.sum():,.2f}, mean {values.mean():,.2f}, "
+                         f"min {values.min():,.2f}, max {values.max():,.2f}")
+        else:
+            top = values.astype(str).value_counts()
+            if top.iloc[0] == 1:
+                lines.append(f"- {col}: {len(top):,} distinct values")
+            else:
+                lines.append(f"- {col}: {len(top):,} distinct, most common {top.index[0]!r} ({top.iloc[0]:,})")
+    return "\n".join(lines)
+
+
+def format_table(df: pd.DataFrame, title: str = "", budget: Optional[int] = None,
+                 sort_by: Optional[str] = None, ascending: bool = False) -> str:
+    """Render a table within `budget` prompt tokens.
+
+    Tries, in order: the aligned table, compact CSV, the top-N rows as CSV plus
+    column statistics and an "N more rows" line, and finally statistics only.
+    Whenever rows are left out, the full CSV is stored as an artifact and its
+    id is included so the caller (or the user) can fetch it.
+    """
+    budget = budget or DEFAULT_TOKEN_BUDGET
+    header = f"{title}\n" if title else ""
+    if df.empty:
+        return f"{header}(no rows)"
+    if sort_by is not None and sort_by in df:
+        df = df.sort_values(sort_by, ascending=ascending, kind="stable")
+    # Every row costs at least a token, so large tables skip straight to top-N
+    if len(df) <= budget:
+        for text in (header + df.to_string(index=False), header + _csv(df).rstrip("\n")):
+            if count_tokens(text) <= budget:
+                return text
+
+    artifact_id = get_artifact_store().put(df, title=title)
+    stats = f"{len(df):,} rows; column stats:\n{_stats(df)}"
+
+    def render(n: int) -> str:
+        rows = _csv(df.head(n)).rstrip("\n") if n else ""
+        more = f"... {len(df) - n:,} more rows" if n else ""
+        parts = [p for p in (rows, more, stats, _pointer(artifact_id)) if p]
+        return header + "\n".join(parts)
+
+    # Largest N that fits; rendering is monotonic in N, so binary search
+    lo, hi = 0, min(len(df), budget)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(render(mid)) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    text = render(lo)
+    if count_tokens(text) <= budget:
+        return text
+    return fit_text(text, budget, artifact_id=artifact_id)
+
+
+def fit_text(text: str, budget: Optional[int] = None, title: str = "", artifact_id: Optional[str] = None) -> str:
+    """Keep whole leading lines of `text` within `budget` tokens, pointing at the full text as an artifact"""
+    budget = budget or DEFAULT_TOKEN_BUDGET
+    if count_tokens(text) <= budget:
+        return text
+    artifact_id = artifact_id or get_artifact_store().put(text, title=title)
+    lines: List[str] = text.splitlines()
+    kept: List[str] = []
+    used = count_tokens(_pointer(artifact_id)) + 8  # room for the "... N more lines" line
+    for line in lines:
+        cost = count_tokens(line + "\n")
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    kept.append(f"... {len(lines) - len(kept):,} more lines; {_pointer(artifact_id)}")
+    return "\n".join(kept)
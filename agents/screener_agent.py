@@ -0,0 +1,63 @@
+from functools import lru_cache
+
+from langchain.agents import AgentExecutor, create_react_agent
+from langchain.prompts import PromptTemplate
+from langchain.tools import tool
+from agents.llm import get_llm
+import os
+from dotenv import load_dotenv
+
+from agents.fundamentals_screener import FundamentalsScreener, run_screen_query
+
+load_dotenv()
+
+
+@lru_cache(maxsize=1)
+def get_screener() -> FundamentalsScreener:
+    """Ratios are computed once per process; queries reuse them"""
+    return FundamentalsScreener.from_csv()
+
+
+@tool
+def screen_sp500(query: str) -> str:
+    """
+    Screens S&P 500 companies on their latest quarterly fundamentals.
+    Input: the screening request in plain language, e.g.
+    'Large-Cap with falling OCF margin', 'Mid-Cap, gross margin > 40%, top 10 by revenue yoy',
+    'accruals < 0 and rising revenue yoy'.
+    Supported metrics: OCF margin, gross margin, operating margin, OCF/net income, accruals,
+    working capital intensity, revenue / OCF / net income growth (QoQ by default, YoY when asked).
+    """
+    return run_screen_query(get_screener(), query)
+
+
+llm = get_llm(model="gpt-4", temperature=0)
+
+tools = [screen_sp500]
+prompt_template = """
+You are an equity research assistant screening S&P 500 fundamentals, responding in Vietnamese.
+
+You have access to the following tools:
+
+{tools}
+
+Use the following format:
+
+Question: the input question you must answer
+Thought: you should always think about what to do
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (this Thought/Action/Action Input/Observation can repeat N times)
+Thought: I now know the final answer
+Final Answer: the final answer to the original input question in Vietnamese.
+
+Begin!
+
+Question: {input}
+{agent_scratchpad}
+"""
+
+prompt = PromptTemplate.from_template(prompt_template)
+agent = create_react_agent(llm, tools, prompt)
+screener_agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
@@ -0,0 +1,194 @@
+import functools
+import inspect
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Memoized tool results kept per process (oldest evicted first)
+RESULT_LIMIT = int(os.getenv("MAS_TOOL_CACHE_SIZE", "512"))
+# Threads for tools dispatched together in one agent step
+PARALLEL_WORKERS = int(os.getenv("MAS_TOOL_WORKERS", "4"))
+
+
+def data_version(paths: Iterable[str]) -> Tuple:
+    """(path, mtime_ns, size) per data file; a rewritten file changes the version"""
+    version = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            version.append((os.path.abspath(path), st.st_mtime_ns, st.st_size))
+        except OSError:
+            version.append((os.path.abspath(path), None, None))
+    return tuple(version)
+
+
+class ToolResultCache:
+    """Tool outputs keyed by (tool, arguments, data version), shared by every run in the process.
+
+    Identical calls that arrive while the first is still running wait for its
+    result instead of computing it again.
+    """
+
+    def __init__(self, max_entries: int = RESULT_LIMIT):
+        self.max_entries = max_entries
+        self._results: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._running: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "shared": 0}
+
+    def call(self, key: Tuple, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._results[key]
+            running = self._running.get(key)
+            if running is None:
+                running = self._running[key] = Future()
+                owner = True
+                self.stats["misses"] += 1
+            else:
+                owner = False
+                self.stats["shared"] += 1
+        if not owner:
+            return running.result()
+        try:
+            result = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._running[key]
+            running.set_exception(e)
+            raise
+        with self._lock:
+            del self._running[key]
+            self._results[key] = result
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        running.set_result(result)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "entries": len(self._results)}
+
+
+TOOL_CACHE = ToolResultCache()
+
+
+def memoized(name: Optional[str] = None, data: Sequence[str] = (),
+             cache: Optional[ToolResultCache] = None, version: Optional[Callable[..., Any]] = None) -> Callable:
+    """Decorator: reuse a tool's result for the same arguments while its data files are unchanged.
+
+    Arguments are bound to the signature with defaults applied, so `f()` and
+    `f(days=30)` share an entry. `version`, called with the tool's arguments,
+    adds whatever else the result depends on (today's date, a model's state).
+    For methods `self` is not part of the key, so `version` must describe the
+    instance's state. Put it under `@tool` so LangChain still sees the
+    original signature and docstring. Errors are not cached.
+    """
+    def decorate(fn: Callable) -> Callable:
+        signature = inspect.signature(fn)
+        tool_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = sorted((k, v) for k, v in bound.arguments.items() if k != "self")
+            key = (tool_name, repr(arguments), data_version(data),
+                   version(*args, **kwargs) if version is not None else None)
+            return (cache or TOOL_CACHE).call(key, lambda: fn(*args, **kwargs))
+
+        return wrapper
+
+    return decorate
+
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=PARALLEL_WORKERS, thread_name_prefix="tool")
+        return _pool
+
+
+def run_parallel(calls: Sequence[Tuple[str, Callable[..., Any], Tuple, Dict[str, Any]]]) -> List[Tuple[str, str]]:
+    """Run independent tool calls concurrently; returns (name, output) in call order.
+
+    A failing call yields its error text instead of aborting the others, the
+    same way a single tool error is reported back to the agent.
+    """
+    if len(calls) == 1:
+        name, fn, args, kwargs = calls[0]
+        futures = [(name, None, fn, args, kwargs)]
+    else:
+        futures = [(name, _executor().submit(fn, *args, **kwargs), fn, args, kwargs)
+                   for name, fn, args, kwargs in calls]
+    results = []
+    for name, future, fn, args, kwargs in futures:
+        try:
+            output = future.result() if future is not None else fn(*args, **kwargs)
+        except Exception as e:
+            output = f"Error in {name}: {e}"
+        results.append((name, str(output)))
+    return results
+
+
+def merge_outputs(results: Sequence[Tuple[str, str]]) -> str:
+    """One observation for the next LLM turn, a section per tool"""
+    return "\n\n".join(f"### {name}\n{output.strip()}" for name, output in results)
+
+
+def parse_tool_calls(text: Any, known: Sequence[str]) -> List[Tuple[str, str]]:
+    """(tool, input) pairs from a JSON list of {"tool", "input"} objects or from
+    `name(input) | name2(input)` / `name: input | name2` text (one call per line also works)"""
+    if isinstance(text, (list, dict)):
+        items = text if isinstance(text, list) else [text]
+    else:
+        try:
+            items = json.loads(text)
+            items = items if isinstance(items, list) else [items]
+        except (TypeError, ValueError):
+            items = []
+            for part in re.split(r"[|\n]", str(text)):
+                match = re.match(r"\s*([\w.-]+)\s*(?:\((.*)\)|:(.*))?\s*$", part)
+                if match:
+                    items.append({"tool": match.group(1), "input": match.group(2) or match.group(3) or ""})
+    calls = []
+    for item in items:
+        if isinstance(item, str):
+            item = {"tool": item, "input": ""}
+        if not isinstance(item, dict):
+            continue
+        name = str(item.get("tool") or item.get("name") or "").strip()
+        if name in known:
+            calls.append((name, str(item.get("input", item.get("args", ""))).strip()))
+    return calls
+
+
+def make_parallel_tool(tools: Dict[str, Callable[[str], Any]]) -> Callable[[str], str]:
+    """Callable for a `run_tools_in_parallel`-style tool over single-input tools.
+
+    The agent names several tools in one action; they run concurrently and
+    their outputs come back as one merged observation, so independent checks
+    cost one LLM round-trip instead of one each.
+    """
+    def run(text: Any) -> str:
+        calls = parse_tool_calls(text, list(tools))
+        if not calls:
+            return f"No known tools in input. Available: {', '.join(tools)}"
+        return merge_outputs(run_parallel([(name, tools[name], (arg,), {}) for name, arg in calls]))
+
+    return run
@@ -1,5 +1,6 @@
 import os
 import sys
+import uuid
 import streamlit as st
 import pandas as pd
 ROOT = os.path.dirname(os.path.abspath(__file__))
@@ -51,7 +52,9 @@ with col5:
 
 query = st.text_input("Nhập câu hỏi của bạn:", value="")
 if st.button("Run") and query:
-    state = mas_app.invoke({"messages": [{"role": "user", "content": query}]})
+    # One session per browser tab so follow-up questions keep their context
+    session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+    state = mas_app.invoke({"messages": [{"role": "user", "content": query}], "session_id": session_id})
     out = state.get("result", {})
     st.write(out)
     if isinstance(out.get("output"), list):
@@ -1,6 +1,11 @@
 import os
 import sys
-from fastapi import FastAPI
+import uuid
+from contextlib import nullcontext
+from typing import Dict, List, Literal, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response
 from pydantic import BaseModel
 
 ROOT = os.path.dirname(os.path.abspath(__file__))
@@ -9,10 +14,45 @@ if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
 from orchestration.mas_graph import app as mas_app
+from agents.cashflow_scenarios import parse_scenarios
+from agents.fundamentals_screener import parse_screen_query
+from agents.llm_cache import get_llm_cache
+from agents.output_format import get_artifact_store
+from agents.tool_runtime import TOOL_CACHE
+from orchestration.admission import Overloaded, admission_snapshot, estimate_tokens, get_admission
+from orchestration.memory import get_session_store
+from orchestration.worker_pool import JobTimeout, get_worker_pool, run_job_async, shutdown_worker_pool
 
 
 class Query(BaseModel):
     query: str
+    # Continue a conversation; a new id is returned when omitted
+    session_id: Optional[str] = None
+    # Batch/report requests yield to interactive ones and may queue longer before being shed
+    priority: Literal["interactive", "batch"] = "interactive"
+
+
+class ScenarioRequest(BaseModel):
+    grid: Optional[Dict[str, List[float]]] = None
+    scenarios: Optional[List[Dict[str, float]]] = None
+    text: Optional[str] = None
+    horizon_days: int = 90
+    use_forecast: bool = True
+
+
+class ScreenFilter(BaseModel):
+    column: str
+    op: str
+    value: float
+
+
+class ScreenRequest(BaseModel):
+    query: Optional[str] = None
+    filters: List[ScreenFilter] = []
+    size_category: Optional[str] = None
+    sort_by: Optional[str] = None
+    ascending: bool = False
+    limit: Optional[int] = 20
 
 
 app = FastAPI(title="MAS Finance API")
@@ -23,8 +63,91 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def metrics():
+    cache = get_llm_cache()
+    return {"llm_cache": cache.stats() if cache is not None else None,
+            "tool_cache": TOOL_CACHE.snapshot(),
+            "sessions": get_session_store().snapshot(),
+            "admission": admission_snapshot(),
+            "artifacts": len(get_artifact_store()),
+            "worker_pool": pool.snapshot() if (pool := get_worker_pool()) is not None else None}
+
+
 @app.post("/query")
 def run_query(payload: Query):
-    result = mas_app.invoke({"messages": [{"role": "user", "content": payload.query}]})
+    session_id = payload.session_id or uuid.uuid4().hex
+    admission = get_admission()
+    slot = admission.admit(payload.priority, estimate_tokens(payload.query)) if admission else nullcontext()
+    try:
+        with slot:
+            result = mas_app.invoke({"messages": [{"role": "user", "content": payload.query}], "session_id": session_id})
+    except Overloaded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except JobTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     # result contains state with 'result'
-    return {"result": result.get("result")}
+    return {"result": result.get("result"), "session_id": session_id}
+
+
+@app.on_event("startup")
+def _start_workers():
+    # Spawn (and preload) the workers before the first request rather than during it
+    get_worker_pool()
+
+
+@app.on_event("shutdown")
+def _flush_sessions():
+    get_session_store().flush()
+    shutdown_worker_pool()
+
+
+@app.get("/artifacts/{artifact_id}")
+def get_artifact(artifact_id: str):
+    """Full result of a tool call whose prompt-facing output was truncated to its token budget"""
+    artifact = get_artifact_store().get(artifact_id)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired artifact")
+    return Response(artifact["content"], media_type=artifact["media_type"])
+
+
+async def _run(name: str, *args):
+    """Run a job from orchestration.jobs off the event loop; bad input is a 400, a stuck job a 504"""
+    try:
+        return await run_job_async(name, *args)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except JobTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+
+@app.post("/scenarios")
+async def run_scenarios(payload: ScenarioRequest):
+    """Evaluate a grid or list of what-if adjustments against the cash-flow forecast"""
+    if payload.horizon_days < 1:
+        raise HTTPException(status_code=400, detail="horizon_days must be positive")
+    skipped = []
+    if payload.grid:
+        scenarios = payload.grid
+    elif payload.scenarios:
+        scenarios = [{}] + payload.scenarios
+    else:
+        scenarios = [{}] + parse_scenarios(payload.text or "", skipped)
+    result = await _run("evaluate_scenarios", scenarios, payload.horizon_days, payload.use_forecast)
+    return {"horizon_days": payload.horizon_days, "scenarios": result, "skipped": skipped}
+
+
+@app.post("/screener")
+async def run_screener(payload: ScreenRequest):
+    """Filter/rank S&P 500 companies on their latest quarter; `query` is parsed like the agent tool
+    and explicit fields override it"""
+    if payload.query:
+        spec = parse_screen_query(payload.query)
+    else:
+        spec = {"filters": [], "size_category": None, "sort_by": None, "ascending": False, "limit": payload.limit}
+    for field in ("size_category", "sort_by", "ascending", "limit"):
+        if field in payload.model_fields_set:
+            spec[field] = getattr(payload, field)
+    spec["filters"] = spec["filters"] + [(f.column, f.op, f.value) for f in payload.filters]
+    result = await _run("screen", spec)
+    return {"spec": spec, "count": len(result), "results": result}
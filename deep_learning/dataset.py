@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import torch
+from torch.utils.data import DataLoader, Dataset
+
+TARGET_COLUMN = 'Total Cash From Operating Activities'
+FEATURE_COLUMNS = [
+    'Total Cash From Operating Activities',
+    'Net Income',
+    'Depreciation And Amortization',
+    'Change In Working Capital',
+    'Total Revenue',
+    'Gross Profit',
+    'Operating Income',
+    'Total Assets',
+    'Accounts Receivable',
+    'Inventory',
+    'Accounts Payable'
+]
+DEFAULT_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'financial_data_sp500.csv')
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+CACHE_VERSION = 2
+
+
+def operating_cash_flow(df):
+    """Reported operating cash flow, falling back to the indirect-method estimate
+    Net Income + D&A + Change In Working Capital where it is missing
+    (recent yfinance releases no longer fill the reported column)."""
+    reported = pd.to_numeric(df[TARGET_COLUMN], errors='coerce') if TARGET_COLUMN in df else np.nan
+    estimate = (
+        pd.to_numeric(df['Net Income'], errors='coerce')
+        + pd.to_numeric(df['Depreciation And Amortization'], errors='coerce')
+        + pd.to_numeric(df['Change In Working Capital'], errors='coerce')
+    )
+    return estimate if np.isscalar(reported) else reported.fillna(estimate)
+
+
+def split_cutoff(target_date, val_fraction):
+    """Target date (int64 ns) from which samples go to validation"""
+    return int(np.quantile(target_date, 1.0 - val_fraction))
+
+
+def build_windows(df, window=4, horizon=1, feature_columns=FEATURE_COLUMNS, val_fraction=0.2):
+    """Turn quarterly fundamentals into per-ticker sliding windows.
+
+    Features are forward-filled within each ticker and z-scored with that
+    ticker's own mean/std; remaining NaNs become 0 (the ticker mean). Each
+    sample is `window` consecutive quarters and the target is the
+    normalized operating cash flow `horizon` quarters after the window.
+
+    The mean/std come only from quarters before the train/validation cutoff
+    (see `split_cutoff`), so validation quarters do not leak into training
+    inputs. Tickers with no quarter before the cutoff get no samples.
+    """
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['date'])
+    df = df.sort_values(['ticker', 'date']).reset_index(drop=True)
+    df[TARGET_COLUMN] = operating_cash_flow(df)
+
+    raw = df[feature_columns].apply(pd.to_numeric, errors='coerce').astype(float)
+    target_raw = raw[TARGET_COLUMN].to_numpy()
+    dates = df['date'].to_numpy().astype('datetime64[ns]').astype(np.int64)
+    ticker_codes, tickers = pd.factorize(df['ticker'], sort=False)
+    position = df.groupby('ticker', sort=False).cumcount().to_numpy()
+    size = df.groupby('ticker', sort=False)['ticker'].transform('size').to_numpy()
+
+    # Sample i ends at row `end` and predicts row `end + horizon` of the same ticker
+    end = np.flatnonzero((position >= window - 1) & (position + horizon < size))
+    end = end[~np.isnan(target_raw[end + horizon])]
+    if len(end) == 0:
+        raise ValueError(f"No ticker has {window + horizon} quarters of history")
+    cutoff = split_cutoff(dates[end + horizon], val_fraction)
+
+    fit = raw.copy()
+    fit.loc[dates >= cutoff] = np.nan
+    stats = fit.groupby(df['ticker'], sort=False)
+    mean = stats.transform('mean')
+    std = stats.transform('std').replace(0, np.nan).fillna(1.0)
+    features = ((raw.groupby(df['ticker'], sort=False).ffill() - mean) / std).fillna(0.0).to_numpy(dtype=np.float32)
+
+    target_mean = mean[TARGET_COLUMN].to_numpy()
+    target_std = std[TARGET_COLUMN].to_numpy()
+    target = ((target_raw - target_mean) / target_std).astype(np.float32)
+    has_stats = ~np.isnan(target_mean)
+
+    end = end[has_stats[end]]
+    offsets = np.arange(-window + 1, 1)
+    X = features[end[:, None] + offsets]
+    y = target[end + horizon][:, None]
+
+    last = np.flatnonzero((position == size - 1) & (size >= window) & has_stats)
+    first_row = np.flatnonzero(position == 0)
+    return {
+        'X': X,
+        'y': y,
+        'ticker_idx': ticker_codes[end].astype(np.int32),
+        'target_date': dates[end + horizon],
+        'last_X': features[last[:, None] + offsets],
+        'last_ticker_idx': ticker_codes[last].astype(np.int32),
+        'meta': {
+            'tickers': list(tickers),
+            'target_mean': np.nan_to_num(target_mean[first_row]).tolist(),
+            'target_std': target_std[first_row].tolist(),
+            'feature_columns': list(feature_columns),
+            'window': window,
+            'horizon': horizon,
+            'val_fraction': val_fraction,
+            'split_cutoff': cutoff,
+        },
+    }
+
+
+def _cache_key(csv_path, window, horizon, feature_columns, val_fraction):
+    stat = os.stat(csv_path)
+    payload = json.dumps([
+        CACHE_VERSION, os.path.abspath(csv_path), stat.st_mtime_ns, stat.st_size,
+        window, horizon, list(feature_columns), val_fraction
+    ])
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def prepare_windows(csv_path=DEFAULT_CSV, window=4, horizon=1, feature_columns=FEATURE_COLUMNS,
+                    cache_dir=DEFAULT_CACHE_DIR, val_fraction=0.2):
+    """Build the windowed arrays once and cache them as .npy files.
+
+    Returns the cache directory. The key covers the CSV's path, size and
+    mtime plus the window and split settings, so a changed CSV is rebuilt and
+    repeated runs (or concurrent sweep trials) reuse the same files.
+    """
+    path = os.path.join(cache_dir, _cache_key(csv_path, window, horizon, feature_columns, val_fraction))
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        return path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    arrays = build_windows(pd.read_csv(csv_path), window, horizon, feature_columns, val_fraction)
+    tmp = tempfile.mkdtemp(dir=cache_dir, prefix='.tmp-')
+    for name, value in arrays.items():
+        if name != 'meta':
+            np.save(os.path.join(tmp, f'{name}.npy'), np.ascontiguousarray(value))
+    with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(arrays['meta'], f)
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        # Another process finished the same cache first
+        shutil.rmtree(tmp, ignore_errors=True)
+    return path
+
+
+def load_windows(cache_path):
+    """Memory-map cached arrays (copy-on-write, so tensors can wrap them without copying)"""
+    arrays = {
+        name[:-4]: np.load(os.path.join(cache_path, name), mmap_mode='c')
+        for name in os.listdir(cache_path) if name.endswith('.npy')
+    }
+    with open(os.path.join(cache_path, 'meta.json'), encoding='utf-8') as f:
+        arrays['meta'] = json.load(f)
+    return arrays
+
+
+class FundamentalsWindowDataset(Dataset):
+    """Sliding windows of quarterly fundamentals served from the .npy cache.
+
+    Only the cache path is pickled, so DataLoader workers memory-map the
+    same files instead of receiving copies of the arrays.
+    """
+
+    def __init__(self, csv_path=DEFAULT_CSV, window=4, horizon=1, indices=None,
+                 feature_columns=FEATURE_COLUMNS, cache_dir=DEFAULT_CACHE_DIR, val_fraction=0.2):
+        self.cache_path = prepare_windows(csv_path, window, horizon, feature_columns, cache_dir, val_fraction)
+        self.window = window
+        self.horizon = horizon
+        self._tensors = None
+        self.meta = self.arrays['meta']
+        self.indices = np.arange(len(self.arrays['y'])) if indices is None else np.asarray(indices)
+
+    @property
+    def arrays(self):
+        if self._tensors is None:
+            arrays = load_windows(self.cache_path)
+            self._tensors = {
+                name: (value if name == 'meta' else torch.from_numpy(value))
+                for name, value in arrays.items()
+            }
+        return self._tensors
+
+    @property
+    def input_size(self):
+        return len(self.meta['feature_columns'])
+
+    def subset(self, indices):
+        """Dataset over a subset of samples sharing the same cache"""
+        subset = FundamentalsWindowDataset.__new__(FundamentalsWindowDataset)
+        subset.__dict__.update(self.__getstate__())
+        subset.indices = self.indices[np.asarray(indices)]
+        return subset
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_tensors'] = None
+        return state
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        j = int(self.indices[i])
+        arrays = self.arrays
+        return arrays['X'][j], arrays['y'][j]
+
+
+def make_dataloaders(csv_path=DEFAULT_CSV, window=4, horizon=1, batch_size=64, val_fraction=0.2,
+                     num_workers=0, seed=42, cache_dir=DEFAULT_CACHE_DIR):
+    """Train/validation DataLoaders split by target date (latest quarters go to validation)"""
+    dataset = FundamentalsWindowDataset(csv_path, window, horizon, cache_dir=cache_dir, val_fraction=val_fraction)
+    target_date = np.asarray(dataset.arrays['target_date'])
+    # The cutoff the normalization stats were computed before
+    cutoff = dataset.meta['split_cutoff']
+    train_idx = np.flatnonzero(target_date < cutoff)
+    val_idx = np.flatnonzero(target_date >= cutoff)
+    if len(val_idx) == 0 or len(train_idx) == 0:
+        raise ValueError(f"Cannot split {len(target_date)} windows into train/validation sets")
+
+    loader_kwargs = dict(
+        batch_size=batch_size,
+        num_workers=num_workers,
+        persistent_workers=num_workers > 0,
+    )
+    generator = torch.Generator().manual_seed(seed)
+    train_loader = DataLoader(dataset.subset(train_idx), shuffle=True, generator=generator, **loader_kwargs)
+    val_loader = DataLoader(dataset.subset(val_idx), shuffle=False, **loader_kwargs)
+    return train_loader, val_loader, dataset
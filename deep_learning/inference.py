@@ -0,0 +1,292 @@
+import argparse
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import torch
+from torch import nn
+
+from deep_learning.dataset import DEFAULT_CACHE_DIR, DEFAULT_CSV, load_windows, prepare_windows
+from deep_learning.train import LSTM
+
+
+def configure_threads(num_threads=None, interop_threads=None):
+    """Pin torch's intra-op (and optionally inter-op) thread pools for CPU serving."""
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # Can only be set once, before any inter-op work has started
+            pass
+
+
+def lstm_from_state_dict(state_dict):
+    """Rebuild an LSTM with the architecture implied by its weights."""
+    num_layers = sum(1 for k in state_dict if k.startswith('lstm.weight_ih_l'))
+    hidden_size = state_dict['lstm.weight_hh_l0'].shape[1]
+    input_size = state_dict['lstm.weight_ih_l0'].shape[1]
+    output_size = state_dict['fc.weight'].shape[0]
+    model = LSTM(input_size, hidden_size, output_size, num_layers=num_layers)
+    model.load_state_dict(state_dict)
+    return model.eval()
+
+
+def read_checkpoint(path):
+    """(state_dict, data config) from a train_model checkpoint or a bare state dict.
+
+    The config holds the dataset `window`/`horizon` the model was trained
+    with; it is empty for bare state dicts and older checkpoints.
+    """
+    state = torch.load(path, map_location='cpu')
+    if isinstance(state, dict) and 'model_state' in state:
+        return state['model_state'], {key: state[key] for key in ('window', 'horizon') if key in state}
+    return state, {}
+
+
+def load_checkpoint(path):
+    """Load a model from a train_model checkpoint (best.pt or last.pt) or a bare state dict."""
+    return lstm_from_state_dict(read_checkpoint(path)[0])
+
+
+def quantize(model):
+    """Dynamic int8 quantization of the LSTM and Linear layers (weights int8, activations float)."""
+    return torch.ao.quantization.quantize_dynamic(model.eval(), {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+
+
+def export_torchscript(model, path, example_input):
+    model.eval()
+    try:
+        scripted = torch.jit.script(model)
+    except Exception:
+        scripted = torch.jit.trace(model, example_input)
+    scripted.save(path)
+    return path
+
+
+def export_onnx(model, path, example_input):
+    model.eval()
+    torch.onnx.export(
+        model, example_input, path,
+        input_names=['input'], output_names=['output'],
+        dynamic_axes={'input': {0: 'batch'}, 'output': {0: 'batch'}},
+        opset_version=17,
+    )
+    return path
+
+
+class DynamicBatcher:
+    """Groups concurrent single-window requests into one forward pass.
+
+    The first queued request opens a batch; requests arriving within
+    `max_wait_ms`, up to `max_batch_size`, join it.
+    """
+
+    def __init__(self, model, max_batch_size=32, max_wait_ms=5.0):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._closed = False
+        self.batches = 0
+        self.requests = 0
+        self._thread = threading.Thread(target=self._run, name='lstm-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, window):
+        """Queue one (window, features) input; returns a Future for its output row."""
+        if self._closed:
+            raise RuntimeError('Batcher is closed')
+        future = Future()
+        self._queue.put((torch.as_tensor(window, dtype=torch.float32), future))
+        return future
+
+    def predict(self, window, timeout=None):
+        return self.submit(window).result(timeout=timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+
+            inputs, futures = zip(*batch)
+            try:
+                with torch.inference_mode():
+                    outputs = self.model(torch.stack(inputs))
+                for future, output in zip(futures, outputs):
+                    future.set_result(output)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+            self.batches += 1
+            self.requests += len(batch)
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+
+class LSTMInferenceService:
+    """CPU serving for the trained LSTM, with per-ticker operating cash flow forecasts.
+
+    The latest window of each ticker and its normalization stats come from
+    the dataset cache, so a forecast is one batched forward pass plus
+    de-normalization.
+    """
+
+    def __init__(self, model, window=4, horizon=1, csv_path=DEFAULT_CSV, cache_dir=DEFAULT_CACHE_DIR,
+                 max_batch_size=32, max_wait_ms=5.0):
+        self.model = model.eval()
+        arrays = load_windows(prepare_windows(csv_path, window=window, horizon=horizon, cache_dir=cache_dir))
+        self.meta = arrays['meta']
+        self.last_X = torch.from_numpy(arrays['last_X'])
+        self.ticker_rows = {
+            self.meta['tickers'][code]: (row, int(code)) for row, code in enumerate(arrays['last_ticker_idx'])
+        }
+        self.batcher = DynamicBatcher(self.model, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+    @classmethod
+    def from_checkpoint(cls, path, quantized=True, num_threads=None, **kwargs):
+        """Service for a checkpoint, with the window/horizon it was trained with"""
+        configure_threads(num_threads)
+        state_dict, config = read_checkpoint(path)
+        for key, value in config.items():
+            if kwargs.get(key, value) != value:
+                raise ValueError(f"{path} was trained with {key}={value}, not {kwargs[key]}")
+            kwargs[key] = value
+        model = lstm_from_state_dict(state_dict)
+        return cls(quantize(model) if quantized else model, **kwargs)
+
+    def forecast_ticker(self, ticker, timeout=5.0):
+        """Next-quarter operating cash flow forecast (in USD) for `ticker`."""
+        ticker = ticker.strip().upper()
+        if ticker not in self.ticker_rows:
+            raise KeyError(f"No recent window for ticker {ticker}")
+        row, code = self.ticker_rows[ticker]
+        normalized = float(self.batcher.predict(self.last_X[row], timeout=timeout)[0])
+        return normalized * self.meta['target_std'][code] + self.meta['target_mean'][code]
+
+    def close(self):
+        self.batcher.close()
+
+
+_SERVICE = None
+_SERVICE_LOCK = threading.Lock()
+
+
+def get_service(checkpoint_path=None, **kwargs):
+    """Process-wide service, created on first use from `checkpoint_path` or $LSTM_CHECKPOINT."""
+    global _SERVICE
+    with _SERVICE_LOCK:
+        if _SERVICE is None:
+            path = checkpoint_path or os.getenv('LSTM_CHECKPOINT')
+            if not path:
+                raise RuntimeError('No LSTM checkpoint configured (set LSTM_CHECKPOINT)')
+            kwargs.setdefault('num_threads', int(os.getenv('LSTM_NUM_THREADS', '0')) or None)
+            _SERVICE = LSTMInferenceService.from_checkpoint(path, **kwargs)
+        return _SERVICE
+
+
+def benchmark(models, input_size, window=4, n_requests=2000, concurrency=16, max_batch_size=32, max_wait_ms=2.0):
+    """Compare eager per-request inference against the dynamic batcher for each model.
+
+    `models` maps a name to a callable model. Returns one row per
+    (model, mode) with throughput and latency percentiles.
+    """
+    inputs = torch.randn(n_requests, window, input_size)
+    rows = []
+
+    def summarize(name, mode, latencies, elapsed):
+        lat = np.asarray(latencies) * 1000
+        rows.append({
+            'model': name, 'mode': mode, 'requests': n_requests,
+            'throughput_rps': n_requests / elapsed,
+            'p50_ms': np.percentile(lat, 50), 'p95_ms': np.percentile(lat, 95), 'p99_ms': np.percentile(lat, 99),
+        })
+
+    for name, model in models.items():
+        with torch.inference_mode():
+            model(inputs[:1])  # warm-up
+            latencies = []
+            started = time.perf_counter()
+            for i in range(n_requests):
+                t0 = time.perf_counter()
+                model(inputs[i:i + 1])
+                latencies.append(time.perf_counter() - t0)
+            summarize(name, 'sequential', latencies, time.perf_counter() - started)
+
+        batcher = DynamicBatcher(model, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+        def timed(i):
+            t0 = time.perf_counter()
+            batcher.predict(inputs[i])
+            return time.perf_counter() - t0
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            started = time.perf_counter()
+            latencies = list(pool.map(timed, range(n_requests)))
+            elapsed = time.perf_counter() - started
+        batcher.close()
+        summarize(name, f'batched x{concurrency}', latencies, elapsed)
+
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export and benchmark the LSTM for CPU inference')
+    parser.add_argument('--checkpoint', required=True, help='train_model checkpoint (best.pt)')
+    parser.add_argument('--window', type=int, default=None,
+                        help='Input quarters (default: the window stored in the checkpoint, else 4)')
+    parser.add_argument('--export-dir', default=None, help='Write TorchScript/ONNX exports here')
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    configure_threads(args.threads)
+    state_dict, config = read_checkpoint(args.checkpoint)
+    model = lstm_from_state_dict(state_dict)
+    window = args.window or config.get('window', 4)
+    quantized = quantize(model)
+    input_size = model.lstm.input_size
+    example = torch.randn(1, window, input_size)
+
+    if args.export_dir:
+        os.makedirs(args.export_dir, exist_ok=True)
+        print('TorchScript:', export_torchscript(model, os.path.join(args.export_dir, 'lstm.pt'), example))
+        print('TorchScript (int8):', export_torchscript(quantized, os.path.join(args.export_dir, 'lstm_int8.pt'), example))
+        try:
+            print('ONNX:', export_onnx(model, os.path.join(args.export_dir, 'lstm.onnx'), example))
+        except Exception as e:
+            print(f'ONNX export failed: {e}')
+
+    if args.benchmark:
+        results = benchmark({'eager': model, 'int8': quantized}, input_size, window=window,
+                            n_requests=args.requests, concurrency=args.concurrency)
+        print(results.to_string(index=False, float_format=lambda v: f'{v:,.2f}'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import torch
+
+from deep_learning.dataset import DEFAULT_CACHE_DIR, DEFAULT_CSV, make_dataloaders, prepare_windows
+from deep_learning.train import LSTM, train_model
+
+DEFAULT_SPACE = {
+    'hidden_size': [32, 64, 128],
+    'num_layers': [1, 2],
+    'learning_rate': ('log', 1e-4, 1e-2),
+    'window': [4, 8],
+}
+PARAM_COLUMNS = ('hidden_size', 'num_layers', 'learning_rate', 'window')
+RESULT_COLUMNS = ('trial_id', 'rung', 'epochs', *PARAM_COLUMNS, 'val_loss', 'wall_time', 'stopped_early')
+
+
+def _sample(spec, rng):
+    """One value from a space entry: a list of choices or ('log'|'uniform'|'int', low, high)."""
+    if isinstance(spec, tuple):
+        kind, low, high = spec
+        if kind == 'log':
+            return math.exp(rng.uniform(math.log(low), math.log(high)))
+        if kind == 'uniform':
+            return rng.uniform(low, high)
+        if kind == 'int':
+            return rng.randint(low, high)
+        raise ValueError(f"Unknown distribution: {kind}")
+    return rng.choice(list(spec))
+
+
+def expand_space(space, mode='grid', n_trials=None, seed=42):
+    """Trial parameter sets for a search space.
+
+    grid: cartesian product of the list entries (range entries are not allowed).
+    random: `n_trials` independent samples.
+    """
+    if mode == 'grid':
+        ranges = [name for name, spec in space.items() if isinstance(spec, tuple)]
+        if ranges:
+            raise ValueError(f"Grid search needs explicit values for: {ranges}")
+        names = list(space)
+        trials = [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+        return trials[:n_trials] if n_trials else trials
+    if mode == 'random':
+        rng = random.Random(seed)
+        return [{name: _sample(spec, rng) for name, spec in space.items()} for _ in range(n_trials or 10)]
+    raise ValueError(f"Unknown search mode: {mode}")
+
+
+def trial_dir_name(params, seed, batch_size, csv_path):
+    """Checkpoint directory of a trial, keyed by everything that shapes its training run."""
+    key = json.dumps({'params': params, 'seed': seed, 'batch_size': batch_size,
+                      'csv': os.path.abspath(csv_path)}, sort_keys=True, default=str)
+    return 'trial_' + hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+
+
+def rung_epochs(min_epochs, max_epochs, eta):
+    """Epoch budget of each successive-halving rung, e.g. 1, 3, 9, 20"""
+    if eta < 2 or min_epochs < 1:
+        raise ValueError("eta must be >= 2 and min_epochs >= 1")
+    budgets = []
+    epochs = min_epochs
+    while epochs < max_epochs:
+        budgets.append(epochs)
+        epochs *= eta
+    budgets.append(max_epochs)
+    return budgets
+
+
+def _init_worker(num_threads):
+    # Each trial gets a fixed share of the cores instead of torch's default of all of them
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+
+def _run_trial(task):
+    """Train one trial up to the rung's epoch budget, resuming from its own checkpoint."""
+    params = task['params']
+    checkpoint_dir = task['checkpoint_dir']
+    last_path = os.path.join(checkpoint_dir, 'last.pt')
+    patience = task['patience']
+
+    started = time.perf_counter()
+    checkpoint = torch.load(last_path, map_location='cpu') if os.path.exists(last_path) else None
+    already_stopped = (
+        checkpoint is not None and patience is not None
+        and checkpoint['epochs_without_improvement'] >= patience
+    )
+    if not already_stopped:
+        torch.manual_seed(task['seed'])
+        train_loader, val_loader, dataset = make_dataloaders(
+            task['csv_path'], window=int(params['window']), batch_size=task['batch_size'],
+            seed=task['seed'], cache_dir=task['cache_dir'],
+        )
+        model = LSTM(dataset.input_size, int(params['hidden_size']), 1, num_layers=int(params['num_layers']))
+        train_model(
+            model, train_loader, val_loader,
+            num_epochs=task['epochs'], learning_rate=float(params['learning_rate']),
+            checkpoint_dir=checkpoint_dir, patience=patience, resume=True, verbose=False,
+        )
+        checkpoint = torch.load(last_path, map_location='cpu')
+
+    return {
+        'trial_id': task['trial_id'],
+        'rung': task['rung'],
+        'epochs': checkpoint['epoch'],
+        **{name: params[name] for name in PARAM_COLUMNS},
+        'val_loss': checkpoint['best_val_loss'],
+        'wall_time': time.perf_counter() - started,
+        'stopped_early': checkpoint['epoch'] < task['epochs'],
+    }
+
+
+def run_sweep(space=None, mode='random', n_trials=None, min_epochs=2, max_epochs=20, eta=3,
+              max_workers=None, out_dir='sweeps', csv_path=DEFAULT_CSV, cache_dir=DEFAULT_CACHE_DIR,
+              batch_size=64, patience=None, seed=42, resume=False):
+    """Successive-halving hyperparameter sweep over LSTM trials.
+
+    Every rung trains the surviving trials up to its epoch budget in a
+    process pool (resuming from each trial's checkpoint), then keeps the best
+    1/eta by validation loss. The windowed datasets are cached once up front
+    and memory-mapped by the workers. Results are written to
+    `out_dir/results.csv` after every rung and returned as a DataFrame.
+
+    Checkpoint directories are keyed by the trial's parameters and seed. A
+    non-empty `out_dir` is refused unless `resume` is set, in which case its
+    matching trials continue from their checkpoints and results are appended.
+    """
+    space = space or DEFAULT_SPACE
+    trials = expand_space(space, mode=mode, n_trials=n_trials, seed=seed)
+    for params in trials:
+        missing = set(PARAM_COLUMNS) - set(params)
+        if missing:
+            raise ValueError(f"Search space is missing {sorted(missing)}")
+    if not resume and os.path.isdir(out_dir) and os.listdir(out_dir):
+        raise ValueError(f"{out_dir} already holds a sweep; resume it or use another output directory")
+
+    # Build every window length's cache in the parent so trials never parse the CSV
+    for window in sorted({int(p['window']) for p in trials}):
+        prepare_windows(csv_path, window=window, cache_dir=cache_dir)
+
+    os.makedirs(out_dir, exist_ok=True)
+    results_path = os.path.join(out_dir, 'results.csv')
+    checkpoint_dirs = [
+        os.path.join(out_dir, trial_dir_name(params, seed + i, batch_size, csv_path))
+        for i, params in enumerate(trials)
+    ]
+    max_workers = max_workers or min(len(trials), os.cpu_count() or 1)
+    num_threads = max(1, (os.cpu_count() or 1) // max_workers)
+
+    survivors = list(range(len(trials)))
+    rows = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(num_threads,)) as pool:
+        budgets = rung_epochs(min_epochs, max_epochs, eta)
+        for rung, epochs in enumerate(budgets):
+            tasks = [
+                {
+                    'trial_id': i,
+                    'rung': rung,
+                    'epochs': epochs,
+                    'params': trials[i],
+                    'checkpoint_dir': checkpoint_dirs[i],
+                    'csv_path': csv_path,
+                    'cache_dir': cache_dir,
+                    'batch_size': batch_size,
+                    'patience': patience,
+                    'seed': seed + i,
+                }
+                for i in survivors
+            ]
+            rung_rows = list(pool.map(_run_trial, tasks))
+            rows.extend(rung_rows)
+            pd.DataFrame(rung_rows, columns=RESULT_COLUMNS).to_csv(
+                results_path, mode='a', header=not os.path.exists(results_path), index=False
+            )
+            print(f"Rung {rung} ({epochs} epochs): {len(rung_rows)} trials, "
+                  f"best val loss {min(r['val_loss'] for r in rung_rows):.4f}")
+
+            if rung + 1 < len(budgets):
+                keep = max(1, len(rung_rows) // eta)
+                ranked = sorted(rung_rows, key=lambda r: r['val_loss'])
+                survivors = [r['trial_id'] for r in ranked[:keep]]
+
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Successive-halving hyperparameter sweep for the LSTM')
+    parser.add_argument('--space', default=None,
+                        help='JSON search space (or path to a JSON file); ranges as ["log", low, high]')
+    parser.add_argument('--mode', choices=['grid', 'random'], default='random',
+                        help='grid needs explicit values for every parameter (no ranges)')
+    parser.add_argument('--trials', type=int, default=None, help='Number of random trials (or grid cap)')
+    parser.add_argument('--min-epochs', type=int, default=2)
+    parser.add_argument('--max-epochs', type=int, default=20)
+    parser.add_argument('--eta', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--patience', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--csv', default=DEFAULT_CSV)
+    parser.add_argument('--out-dir', default='sweeps')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue the sweep already in --out-dir instead of refusing a non-empty one')
+    args = parser.parse_args()
+
+    space = None
+    if args.space:
+        text = open(args.space, encoding='utf-8').read() if os.path.exists(args.space) else args.space
+        # JSON has no tuples; a ["log", low, high] style entry is a range
+        space = {
+            name: tuple(spec) if spec and isinstance(spec[0], str) else spec
+            for name, spec in json.loads(text).items()
+        }
+
+    results = run_sweep(
+        space, mode=args.mode, n_trials=args.trials, min_epochs=args.min_epochs, max_epochs=args.max_epochs,
+        eta=args.eta, max_workers=args.workers, out_dir=args.out_dir, csv_path=args.csv,
+        batch_size=args.batch_size, patience=args.patience, seed=args.seed, resume=args.resume,
+    )
+    final = results.sort_values(['rung', 'val_loss'], ascending=[False, True])
+    print(final.head(10).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 from torch import nn
+import copy
 import torch
 from torch.utils.data import DataLoader 
 from torch import optim
@@ -22,18 +23,57 @@ class LSTM(nn.Module):
         out = self.fc(out[:, -1, :])
         return out
     
-def train_model(model, train_loader, val_loader, num_epochs=20, learning_rate=0.001):
+def save_checkpoint(path, state):
+    """Write a checkpoint atomically so an interrupted save never corrupts the last one."""
+    tmp_path = path + '.tmp'
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def train_model(model, train_loader, val_loader, num_epochs=20, learning_rate=0.001,
+                checkpoint_dir=None, checkpoint_every=1, patience=None, resume=False, verbose=True):
+    """Train with validation-based model selection.
+
+    checkpoint_dir: if set, `last.pt` (model, optimizer and epoch state) is
+        written every `checkpoint_every` epochs and `best.pt` holds the best
+        weights so far.
+    patience: stop after this many epochs without validation improvement.
+    resume: continue from `checkpoint_dir/last.pt` if it exists.
+    verbose: show progress bars and per-epoch losses.
+    """
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
     model.to(device)
     criterion = nn.MSELoss()
     optimizer = optim.Adam(model.parameters(), lr=learning_rate)
     best_val_loss = float('inf')
     best_model_state = None
+    epochs_without_improvement = 0
+    start_epoch = 0
+
+    # Saved with the weights so the inference service builds inputs of the same shape
+    data_config = {key: getattr(train_loader.dataset, key)
+                   for key in ('window', 'horizon') if hasattr(train_loader.dataset, key)}
 
-    for epoch in range(num_epochs):
+    last_path = best_path = None
+    if checkpoint_dir:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        last_path = os.path.join(checkpoint_dir, 'last.pt')
+        best_path = os.path.join(checkpoint_dir, 'best.pt')
+        if resume and os.path.exists(last_path):
+            checkpoint = torch.load(last_path, map_location=device)
+            model.load_state_dict(checkpoint['model_state'])
+            optimizer.load_state_dict(checkpoint['optimizer_state'])
+            start_epoch = checkpoint['epoch']
+            best_val_loss = checkpoint['best_val_loss']
+            best_model_state = checkpoint['best_model_state']
+            epochs_without_improvement = checkpoint['epochs_without_improvement']
+            if verbose:
+                print(f"Resumed from {last_path} at epoch {start_epoch}")
+
+    for epoch in range(start_epoch, num_epochs):
         model.train()
         train_losses = []
-        for inputs, targets in tqdm(train_loader, desc=f"Epoch {epoch+1}/{num_epochs} - Training"):
+        for inputs, targets in tqdm(train_loader, desc=f"Epoch {epoch+1}/{num_epochs} - Training", disable=not verbose):
             inputs, targets = inputs.to(device), targets.to(device)
             optimizer.zero_grad()
             outputs = model(inputs)
@@ -47,7 +87,7 @@ def train_model(model, train_loader, val_loader, num_epochs=20, learning_rate=0.
         model.eval()
         val_losses = []
         with torch.no_grad():
-            for inputs, targets in tqdm(val_loader, desc=f"Epoch {epoch+1}/{num_epochs} - Validation"):
+            for inputs, targets in tqdm(val_loader, desc=f"Epoch {epoch+1}/{num_epochs} - Validation", disable=not verbose):
                 inputs, targets = inputs.to(device), targets.to(device)
                 outputs = model(inputs)
                 loss = criterion(outputs, targets)
@@ -55,13 +95,38 @@ def train_model(model, train_loader, val_loader, num_epochs=20, learning_rate=0.
         
         avg_val_loss = sum(val_losses) / len(val_losses)
 
-        print(f"Epoch [{epoch+1}/{num_epochs}], Train Loss: {avg_train_loss:.4f}, Val Loss: {avg_val_loss:.4f}")
+        if verbose:
+            print(f"Epoch [{epoch+1}/{num_epochs}], Train Loss: {avg_train_loss:.4f}, Val Loss: {avg_val_loss:.4f}")
 
         if avg_val_loss < best_val_loss:
             best_val_loss = avg_val_loss
-            best_model_state = model.state_dict()
+            # state_dict() returns live references to the parameters; copy them
+            best_model_state = copy.deepcopy(model.state_dict())
+            epochs_without_improvement = 0
+            if best_path:
+                save_checkpoint(best_path, {'epoch': epoch + 1, 'val_loss': best_val_loss,
+                                            'model_state': best_model_state, **data_config})
+        else:
+            epochs_without_improvement += 1
+
+        stop_early = patience is not None and epochs_without_improvement >= patience
+        if last_path and ((epoch + 1) % checkpoint_every == 0 or stop_early or epoch + 1 == num_epochs):
+            save_checkpoint(last_path, {
+                'epoch': epoch + 1,
+                'model_state': model.state_dict(),
+                'optimizer_state': optimizer.state_dict(),
+                'best_val_loss': best_val_loss,
+                'best_model_state': best_model_state,
+                'epochs_without_improvement': epochs_without_improvement,
+                **data_config,
+            })
+
+        if stop_early:
+            if verbose:
+                print(f"Early stopping: no improvement in {patience} epochs (best val loss {best_val_loss:.4f})")
+            break
 
-    if best_model_state:
+    if best_model_state is not None:
         model.load_state_dict(best_model_state)
     
-    return model
\ No newline at end of file
+    return model
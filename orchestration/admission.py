@@ -0,0 +1,231 @@
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from agents.output_format import count_tokens
+
+# Request classes in priority order; a batch request is admitted only when no interactive one is waiting
+PRIORITIES = ("interactive", "batch")
+# MAS_ADMISSION=off admits everything (no limits, no queueing)
+ENABLED = os.getenv("MAS_ADMISSION", "on").lower() not in ("0", "off", "false", "no")
+# Concurrent /query runs per LLM backend: AIMD moves the limit between MIN and MAX, starting at INITIAL
+MIN_INFLIGHT = int(os.getenv("MAS_ADMISSION_MIN_INFLIGHT", "1"))
+MAX_INFLIGHT = int(os.getenv("MAS_ADMISSION_MAX_INFLIGHT", "16"))
+INITIAL_INFLIGHT = int(os.getenv("MAS_ADMISSION_INITIAL_INFLIGHT", "4"))
+# A run slower than this counts as congestion and shrinks the limit
+LATENCY_TARGET_SECONDS = float(os.getenv("MAS_ADMISSION_LATENCY_TARGET", "20"))
+DECREASE_FACTOR = 0.7
+# Longest a request may wait in the queue (per class) before it is shed with 429
+QUEUE_SLO_SECONDS = {"interactive": float(os.getenv("MAS_ADMISSION_QUEUE_SLO", "2")),
+                     "batch": float(os.getenv("MAS_ADMISSION_BATCH_QUEUE_SLO", "30"))}
+MAX_QUEUE = int(os.getenv("MAS_ADMISSION_MAX_QUEUE", "64"))
+# Token-rate budget per backend (0 = unlimited) and the tokens charged per request on top of the query
+TOKENS_PER_MINUTE = float(os.getenv("MAS_LLM_TOKENS_PER_MINUTE", "0"))
+REQUEST_TOKENS = int(os.getenv("MAS_ADMISSION_REQUEST_TOKENS", "2000"))
+
+
+class Overloaded(Exception):
+    """Request shed by admission control; `retry_after` is a hint in whole seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, tokens: float, now: float) -> float:
+        """Seconds until `tokens` are available (0 when they are now)"""
+        self._refill(now)
+        tokens = min(tokens, self.capacity)
+        return 0.0 if self.tokens >= tokens else (tokens - self.tokens) / self.rate
+
+    def wait_time_after(self, queued: float, tokens: float, now: float) -> float:
+        """Seconds until `tokens` are available once `queued` tokens ahead of them are taken"""
+        self._refill(now)
+        deficit = queued + min(tokens, self.capacity) - self.tokens
+        return max(0.0, deficit) / self.rate
+
+    def take(self, tokens: float) -> None:
+        self.tokens -= min(tokens, self.capacity)
+
+
+class AdmissionController:
+    """Admission for one LLM backend: an adaptive in-flight limit, a token-rate
+    budget and a priority queue with a wait SLO.
+
+    The limit follows AIMD on observed run latency: +1 per limit's worth of
+    runs finishing under `latency_target`, x DECREASE_FACTOR (at most once per
+    `latency_target`) when a run is slower or fails. When the backend slows
+    down the limit shrinks, so the requests that are admitted still finish in
+    time and the rest are turned away quickly with 429 instead of all timing
+    out together.
+
+    Waiters are served by priority, then arrival. A request is rejected on
+    arrival when the queue is full or its expected wait (for a slot or for
+    its tokens) already exceeds its class's SLO, and again if it is still
+    queued when the SLO runs out.
+    """
+
+    def __init__(self, name: str, min_inflight: int = MIN_INFLIGHT, max_inflight: int = MAX_INFLIGHT,
+                 initial_inflight: int = INITIAL_INFLIGHT, latency_target: float = LATENCY_TARGET_SECONDS,
+                 queue_slo: Optional[Dict[str, float]] = None, max_queue: int = MAX_QUEUE,
+                 tokens_per_minute: float = TOKENS_PER_MINUTE):
+        self.name = name
+        self.min_inflight = max(1, min_inflight)
+        self.max_inflight = max(self.min_inflight, max_inflight)
+        self.limit = float(min(max(initial_inflight, self.min_inflight), self.max_inflight))
+        self.latency_target = latency_target
+        self.queue_slo = {**QUEUE_SLO_SECONDS, **(queue_slo or {})}
+        self.max_queue = max_queue
+        self.bucket = TokenBucket(tokens_per_minute / 60, tokens_per_minute) if tokens_per_minute > 0 else None
+        self.in_flight = 0
+        self.latency = latency_target / 2  # EWMA of run time, for wait estimates
+        self._last_decrease = 0.0
+        self._queue: List[List[Any]] = []  # heap of [priority, seq, tokens, granted]
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self.stats = {"admitted": 0, "completed": 0, "failed": 0, "shed_queue_full": 0,
+                      "shed_expected_wait": 0, "shed_timeout": 0, "queue_wait_seconds": 0.0}
+
+    def _expected_wait(self, ahead: int) -> float:
+        return (ahead + 1) / max(1, int(self.limit)) * self.latency
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._expected_wait(len(self._queue))))
+
+    def _grant(self, now: float) -> float:
+        """Admit waiters at the head while slots and tokens allow; returns seconds until tokens free up"""
+        while self._queue and self.in_flight < int(self.limit):
+            head = self._queue[0]
+            if self.bucket is not None:
+                delay = self.bucket.wait_time(head[2], now)
+                if delay > 0:
+                    return delay
+                self.bucket.take(head[2])
+            heapq.heappop(self._queue)
+            head[3] = True
+            self.in_flight += 1
+            self._cond.notify_all()
+        return 0.0
+
+    def acquire(self, priority: str = "interactive", tokens: int = 0) -> None:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}; use one of: {', '.join(PRIORITIES)}")
+        rank = PRIORITIES.index(priority)
+        slo = self.queue_slo[priority]
+        start = time.monotonic()
+        with self._cond:
+            waiting_ahead = [w for w in self._queue if w[0] <= rank]
+            saturated = self.in_flight >= int(self.limit)
+            if (saturated or self._queue) and len(self._queue) >= self.max_queue:
+                self.stats["shed_queue_full"] += 1
+                raise Overloaded(f"{self.name}: admission queue is full", self._retry_after())
+            expected = self._expected_wait(len(waiting_ahead)) if saturated else 0.0
+            token_wait = 0.0
+            if self.bucket is not None:
+                queued_tokens = sum(min(w[2], self.bucket.capacity) for w in waiting_ahead)
+                token_wait = self.bucket.wait_time_after(queued_tokens, tokens, start)
+            if max(expected, token_wait) > slo:
+                self.stats["shed_expected_wait"] += 1
+                retry_after = max(self._retry_after(), math.ceil(token_wait))
+                raise Overloaded(f"{self.name}: expected queue wait exceeds {slo:g}s", retry_after)
+            waiter = [rank, next(self._seq), tokens, False]
+            heapq.heappush(self._queue, waiter)
+            while True:
+                now = time.monotonic()
+                token_delay = self._grant(now)
+                if waiter[3]:
+                    break
+                remaining = start + slo - now
+                if remaining <= 0:
+                    self._queue.remove(waiter)
+                    heapq.heapify(self._queue)
+                    self.stats["shed_timeout"] += 1
+                    # Our leaving may unblock the waiters behind us
+                    self._cond.notify_all()
+                    raise Overloaded(f"{self.name}: queued longer than {slo:g}s", self._retry_after())
+                self._cond.wait(min(remaining, token_delay) if token_delay > 0 else remaining)
+            self.stats["admitted"] += 1
+            self.stats["queue_wait_seconds"] += time.monotonic() - start
+
+    def release(self, latency: float, ok: bool = True) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self.latency = 0.8 * self.latency + 0.2 * latency
+            self.stats["completed" if ok else "failed"] += 1
+            now = time.monotonic()
+            if ok and latency <= self.latency_target:
+                self.limit = min(self.max_inflight, self.limit + 1 / self.limit)
+            elif now - self._last_decrease >= self.latency_target:
+                self.limit = max(self.min_inflight, self.limit * DECREASE_FACTOR)
+                self._last_decrease = now
+            self._grant(now)
+
+    @contextmanager
+    def admit(self, priority: str = "interactive", tokens: int = 0) -> Iterator[None]:
+        """Hold a slot for the duration of the block; raises Overloaded when shed"""
+        self.acquire(priority, tokens)
+        start = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.release(time.monotonic() - start, ok)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            queued = {p: sum(1 for w in self._queue if w[0] == i) for i, p in enumerate(PRIORITIES)}
+            stats = dict(self.stats)
+            tokens = None
+            if self.bucket is not None:
+                self.bucket.wait_time(0, time.monotonic())
+                tokens = round(self.bucket.tokens)
+            snapshot = {"limit": round(self.limit, 2), "in_flight": self.in_flight, "queued": queued,
+                        "latency_ewma_seconds": round(self.latency, 3), "tokens_available": tokens}
+        wait = stats.pop("queue_wait_seconds")
+        stats["avg_queue_wait_ms"] = round(1000 * wait / stats["admitted"], 2) if stats["admitted"] else None
+        return {**snapshot, **stats}
+
+
+def estimate_tokens(query: str) -> int:
+    """Tokens charged against the backend's rate budget for one /query run"""
+    return count_tokens(query) + REQUEST_TOKENS
+
+
+_controllers: Dict[str, AdmissionController] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_admission(backend: Optional[str] = None) -> Optional[AdmissionController]:
+    """Controller for an LLM backend (MAS_LLM_PROVIDER by default); None when admission is off"""
+    if not ENABLED:
+        return None
+    backend = (backend or os.getenv("MAS_LLM_PROVIDER", "openai")).lower()
+    with _controllers_lock:
+        if backend not in _controllers:
+            _controllers[backend] = AdmissionController(backend)
+        return _controllers[backend]
+
+
+def admission_snapshot() -> Dict[str, Any]:
+    with _controllers_lock:
+        controllers = dict(_controllers)
+    return {name: controller.snapshot() for name, controller in controllers.items()}
@@ -0,0 +1,72 @@
+# Jobs the API hands to the worker pool (or runs inline when the pool is off).
+# Arguments and results are plain picklable values; datasets and models are
+# loaded once per process and cached, at worker startup when preloaded.
+import os
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+_predictor_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def cashflow_model():
+    from agents.cashflow_model import CashFlowPredictor, load_cashflow_data
+
+    df = load_cashflow_data()
+    predictor = CashFlowPredictor()
+    predictor.train(df)
+    return df, predictor
+
+
+@lru_cache(maxsize=1)
+def screener():
+    from agents.fundamentals_screener import FundamentalsScreener
+
+    return FundamentalsScreener.from_csv(os.path.join(ROOT, "financial_data_sp500.csv"))
+
+
+def route_query(query: str, history: Optional[List[Dict[str, str]]] = None,
+                last_agent: Optional[str] = None) -> Dict[str, Any]:
+    from agents.coord import route_query as route
+
+    return route(query, history=history, last_agent=last_agent)
+
+
+def evaluate_scenarios(scenarios: Any, horizon_days: int, use_forecast: bool) -> List[Dict[str, Any]]:
+    from agents.cashflow_scenarios import evaluate_scenarios as evaluate
+
+    df, predictor = cashflow_model()
+    forecast = None
+    if use_forecast:
+        with _predictor_lock:
+            forecast = predictor.predict_many(range(1, horizon_days + 1))["predicted_cashflow"]
+    result = evaluate(df, scenarios, horizon=horizon_days, forecast=forecast)
+    return result.astype(object).where(result.notna(), None).to_dict(orient="records")
+
+
+def screen(spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    result = screener().screen(**spec)
+    result["date"] = result["date"].dt.strftime("%Y-%m-%d")
+    return result.astype(object).where(result.notna(), None).to_dict(orient="records")
+
+
+def _warm_agents() -> None:
+    from agents.coord import get_router
+
+    get_router()
+
+
+JOBS: Dict[str, Callable[..., Any]] = {
+    "route_query": route_query,
+    "evaluate_scenarios": evaluate_scenarios,
+    "screen": screen,
+}
+# What a worker can load before taking jobs (MAS_WORKER_PRELOAD, comma separated)
+PRELOADS: Dict[str, Callable[[], Any]] = {
+    "cashflow": cashflow_model,
+    "screener": screener,
+    "agents": _warm_agents,
+}
@@ -1,18 +1,42 @@
 from typing import List, Dict
-from agents.coord import route_query
+from orchestration.memory import get_session_store, session_from_messages
+from orchestration.worker_pool import run_job
 
 
 class _SimpleApp:
     """Lightweight drop-in replacement exposing invoke({...}) like langgraph app.
 
-    Expects state: {"messages": [{"role": str, "content": str}, ...]}
+    Expects state: {"messages": [{"role": str, "content": str}, ...], "session_id": optional str}
     Returns state with {"result": any} merged.
+
+    With a session_id, history comes from the session store (recent turns plus
+    a rolling summary, bounded in tokens) and the turn is recorded there; a
+    repeated question is answered from the session's cached result while the
+    data files are unchanged, unless its answer depended on the conversation
+    (follow-ups, agents that read the history). Without
+    one, earlier messages in the state serve as (bounded) history.
+
+    Sessions stay in this process; routing and the agent run are a job for
+    the worker pool (inline when MAS_WORKERS is 0).
     """
 
     def invoke(self, state: Dict) -> Dict:
         messages: List[Dict] = state.get("messages", [])
         user_msg = (messages[-1] if messages else {}).get("content", "")
-        out = route_query(user_msg)
+        session_id = state.get("session_id")
+        if session_id:
+            session = get_session_store().get(session_id)
+        else:
+            session = session_from_messages(messages[:-1])
+
+        out = session.cached_result(user_msg) if session_id else None
+        if out is None:
+            out = run_job("route_query", user_msg, history=session.history(), last_agent=session.last_agent)
+            uses_context = out.pop("uses_context", True)
+            if session_id and not uses_context and not str(out.get("output", "")).startswith("Error in agent"):
+                session.remember_result(user_msg, out)
+        if session_id:
+            session.add_turn(user_msg, str(out.get("output", "")), out.get("type"))
         new_state = dict(state)
         new_state["result"] = out
         return new_state
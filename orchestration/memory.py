@@ -0,0 +1,260 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+from agents.output_format import count_tokens
+from agents.tool_runtime import data_version
+
+# Turns (question + answer) kept verbatim; older ones are folded into the summary
+RECENT_TURNS = int(os.getenv("MAS_SESSION_TURNS", "4"))
+# Token caps for the prompt: one message and the rolling summary
+MESSAGE_TOKENS = 300
+SUMMARY_TOKENS = 400
+# Answers cached per session, kept whole; bounded by count and by total output characters
+CACHED_RESULTS = 8
+CACHED_RESULT_CHARS = 200_000
+# A repeated question within a session is answered from its cached result for this long
+RESULT_TTL_SECONDS = 300
+# ... or until one of the data files the agents read changes
+DATA_FILES = ("data/cashflow_data.csv", "data/transactions_extended.csv", "data/budgets_extended.csv",
+              "data/invoices_data.csv", "financial_data_sp500.csv")
+# Sessions held in memory; least recently used ones spill to MAS_SESSION_DB when set
+MAX_SESSIONS = int(os.getenv("MAS_SESSION_MAX", "1000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+
+
+def clip(text: str, tokens: int) -> str:
+    """Leading part of `text` that fits in `tokens`"""
+    if count_tokens(text) <= tokens:
+        return text
+    end = len(text)
+    while end > 0 and count_tokens(text[:end] + " …") > tokens:
+        end = int(end * tokens / count_tokens(text[:end] + " …") * 0.95)
+    return text[:end].rstrip() + " …"
+
+
+def summarize_turn(question: str, answer: str) -> str:
+    """Default summary line for a turn leaving the window: first sentence of each side"""
+    def first(text: str, limit: int) -> str:
+        text = re.sub(r"\s+", " ", text).strip()
+        sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+        return sentence if len(sentence) <= limit else sentence[:limit].rstrip() + "…"
+    return f"- Q: {first(question, 160)} → A: {first(answer, 240)}"
+
+
+def normalize_query(text: str) -> str:
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+
+class Session:
+    """One conversation: recent turns verbatim, a rolling summary of older
+    ones, and the latest results per question.
+
+    `history()` is at most SUMMARY_TOKENS + 2 * RECENT_TURNS * MESSAGE_TOKENS
+    tokens however long the session runs, so the prompt (and turn latency)
+    stays flat. Turns leaving the window go through `summarizer(question,
+    answer)`, extractive by default so adding a turn needs no LLM call; the
+    summary keeps its newest lines within SUMMARY_TOKENS.
+    """
+
+    def __init__(self, session_id: str, summarizer: Callable[[str, str], str] = summarize_turn):
+        self.id = session_id
+        self.summarizer = summarizer
+        self.turns: List[Dict[str, Any]] = []
+        self.summary_lines: List[str] = []
+        self.results: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.turn_count = 0
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+    @property
+    def summary(self) -> str:
+        return "\n".join(self.summary_lines)
+
+    @property
+    def last_agent(self) -> Optional[str]:
+        return self.turns[-1].get("agent") if self.turns else None
+
+    def add_turn(self, question: str, answer: str, agent: Optional[str] = None) -> None:
+        with self.lock:
+            self._add_turn(question, answer, agent)
+
+    def _add_turn(self, question: str, answer: str, agent: Optional[str]) -> None:
+        self.turns.append({"question": clip(question, MESSAGE_TOKENS), "answer": clip(answer, MESSAGE_TOKENS),
+                           "agent": agent})
+        self.turn_count += 1
+        while len(self.turns) > RECENT_TURNS:
+            old = self.turns.pop(0)
+            self.summary_lines.append(self.summarizer(old["question"], old["answer"]))
+        while len(self.summary_lines) > 1 and count_tokens(self.summary) > SUMMARY_TOKENS:
+            self.summary_lines.pop(0)
+        if self.summary_lines:
+            self.summary_lines[-1] = clip(self.summary_lines[-1], SUMMARY_TOKENS)
+        self.updated = time.time()
+
+    def history(self) -> List[Dict[str, str]]:
+        """Messages for the next prompt: the summary (as a system message) then the recent turns"""
+        messages = []
+        if self.summary_lines:
+            messages.append({"role": "system", "content": f"Tóm tắt hội thoại trước đó:\n{self.summary}"})
+        for turn in self.turns:
+            messages.append({"role": "user", "content": turn["question"]})
+            messages.append({"role": "assistant", "content": turn["answer"]})
+        return messages
+
+    def history_tokens(self) -> int:
+        return sum(count_tokens(m["content"]) for m in self.history())
+
+    def cached_result(self, query: str) -> Optional[Dict[str, Any]]:
+        key = normalize_query(query)
+        data = _data_version()
+        with self.lock:
+            entry = self.results.get(key)
+            if entry is None or time.time() - entry["at"] > RESULT_TTL_SECONDS or entry["data"] != data:
+                return None
+            self.results.move_to_end(key)
+            return entry["result"]
+
+    def remember_result(self, query: str, result: Dict[str, Any]) -> None:
+        """Cache the full answer; only the copy in the prompt history (add_turn) is clipped.
+
+        Only answers that did not depend on the conversation belong here:
+        the same question after other turns may mean something else.
+        """
+        key = normalize_query(query)
+        data = _data_version()
+        with self.lock:
+            self.results[key] = {"result": result, "at": time.time(), "data": data}
+            self.results.move_to_end(key)
+            while len(self.results) > 1 and (len(self.results) > CACHED_RESULTS
+                                             or self._result_chars() > CACHED_RESULT_CHARS):
+                self.results.popitem(last=False)
+
+    def _result_chars(self) -> int:
+        return sum(len(str(entry["result"].get("output", ""))) for entry in self.results.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "turns": self.turns, "summary_lines": self.summary_lines,
+                "results": list(self.results.items()), "turn_count": self.turn_count, "updated": self.updated}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], summarizer: Callable[[str, str], str] = summarize_turn) -> "Session":
+        session = cls(data["id"], summarizer)
+        session.turns = data["turns"]
+        session.summary_lines = data["summary_lines"]
+        session.results = OrderedDict((k, v) for k, v in data["results"])
+        session.turn_count = data["turn_count"]
+        session.updated = data["updated"]
+        return session
+
+
+def _data_version() -> List[List[Any]]:
+    # Lists, so a version read back from the session DB compares equal
+    return [list(item) for item in data_version(DATA_FILES)]
+
+
+def session_from_messages(messages: List[Dict[str, Any]]) -> Session:
+    """Throwaway session holding (bounded) history from a client-supplied message list"""
+    session = Session("transient")
+    question = None
+    for message in messages:
+        if message.get("role") == "user":
+            question = message.get("content", "")
+        elif message.get("role") == "assistant" and question is not None:
+            session.add_turn(question, str(message.get("content", "")))
+            question = None
+    return session
+
+
+class SessionStore:
+    """Sessions by id: an in-memory LRU, optionally spilling evicted sessions to SQLite.
+
+    With `path`, a session pushed out of memory is written to the file and
+    loaded back on its next request; `flush()` writes the ones still in
+    memory (e.g. at shutdown). Without it, evicted sessions start over.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, path: Optional[str] = None,
+                 summarizer: Callable[[str, str], str] = summarize_turn):
+        self.max_sessions = max_sessions
+        self.path = path
+        self.summarizer = summarizer
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn = None
+        self.stats = {"created": 0, "loaded": 0, "spilled": 0, "dropped": 0}
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute(_SCHEMA)
+
+    def _spill(self, session: Session) -> None:
+        if self._conn is None:
+            self.stats["dropped"] += 1
+            return
+        self._conn.execute("INSERT OR REPLACE INTO sessions (id, data, updated) VALUES (?, ?, ?)",
+                           (session.id, json.dumps(session.to_dict(), ensure_ascii=False), session.updated))
+        self.stats["spilled"] += 1
+
+    def _load(self, session_id: str) -> Optional[Session]:
+        if self._conn is None:
+            return None
+        row = self._conn.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        self.stats["loaded"] += 1
+        return Session.from_dict(json.loads(row[0]), self.summarizer)
+
+    def get(self, session_id: Optional[str] = None) -> Session:
+        """The session with this id, created when unknown (a new id when None)"""
+        session_id = session_id or uuid.uuid4().hex
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._load(session_id)
+                if session is None:
+                    session = Session(session_id, self.summarizer)
+                    self.stats["created"] += 1
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    _, evicted = self._sessions.popitem(last=False)
+                    self._spill(evicted)
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def flush(self) -> None:
+        if self._conn is None:
+            return
+        with self._lock:
+            for session in self._sessions.values():
+                self._spill(session)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "in_memory": len(self._sessions)}
+
+
+@lru_cache(maxsize=1)
+def get_session_store() -> SessionStore:
+    return SessionStore(path=os.getenv("MAS_SESSION_DB") or None)
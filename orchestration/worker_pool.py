@@ -0,0 +1,298 @@
+import asyncio
+import itertools
+import multiprocessing as mp
+import os
+import pickle
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Sequence
+
+from orchestration.jobs import JOBS, PRELOADS
+
+# Worker processes; 0 runs jobs inline in the API process, "auto" uses every core
+WORKERS = os.getenv("MAS_WORKERS", "0")
+# Seconds a job may run before its worker is killed and replaced
+JOB_TIMEOUT = float(os.getenv("MAS_JOB_TIMEOUT", "120"))
+# A worker is replaced after this many jobs or once its resident memory passes the ceiling
+MAX_JOBS_PER_WORKER = int(os.getenv("MAS_WORKER_MAX_JOBS", "500"))
+MAX_RSS_MB = float(os.getenv("MAS_WORKER_MAX_RSS_MB", "2048"))
+# Datasets/models loaded by each worker before it takes jobs (names from jobs.PRELOADS)
+PRELOAD = os.getenv("MAS_WORKER_PRELOAD", "cashflow,screener")
+# Loading preloads can take a while (model training); it does not count against job timeouts
+START_TIMEOUT = 300.0
+
+
+class JobTimeout(TimeoutError):
+    pass
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _transferable(error: BaseException) -> BaseException:
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+def _worker_main(conn, preload: Sequence[str]) -> None:
+    """Worker loop: load preloads, then run (job_id, name, args, kwargs) messages until told to stop"""
+    for name in preload:
+        try:
+            PRELOADS[name]()
+        except Exception:
+            # The job that needs it will load it (and report the error) itself
+            pass
+    conn.send(("ready", _rss_mb()))
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+        job_id, name, args, kwargs = message
+        try:
+            reply = (job_id, True, JOBS[name](*args, **kwargs))
+        except Exception as e:
+            reply = (job_id, False, _transferable(e))
+        try:
+            conn.send(reply + (_rss_mb(),))
+        except Exception as e:
+            conn.send((job_id, False, RuntimeError(f"Result of {name} could not be sent back: {e}"), _rss_mb()))
+
+
+class _Worker:
+    def __init__(self, ctx, preload: Sequence[str]):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child, list(preload)), daemon=True)
+        self.process.start()
+        child.close()
+        self.ready = False
+        self.jobs = 0
+        self.rss_mb = 0.0
+
+    def wait_ready(self, timeout: float) -> None:
+        if not self.conn.poll(timeout):
+            raise RuntimeError("Worker did not start in time")
+        _, self.rss_mb = self.conn.recv()
+        self.ready = True
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(2)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+
+
+class WorkerPool:
+    """Long-lived worker processes running jobs from `orchestration.jobs`.
+
+    Each worker preloads its datasets/models once and then serves jobs, so
+    CPU-heavy work (model training and prediction, full-frame pandas) runs on
+    other cores instead of holding the API process's GIL. Jobs wait in one
+    local queue; a dispatcher thread per worker sends them over a pipe.
+
+    A job running past its timeout gets its worker killed (the only way to
+    stop it) and replaced; workers are also replaced after `max_jobs` jobs or
+    when their resident memory exceeds `max_rss_mb`. The replacement starts
+    loading its preloads right away.
+    """
+
+    def __init__(self, size: int, preload: Sequence[str] = (), job_timeout: float = JOB_TIMEOUT,
+                 max_jobs: int = MAX_JOBS_PER_WORKER, max_rss_mb: float = MAX_RSS_MB):
+        unknown = [name for name in preload if name not in PRELOADS]
+        if unknown:
+            raise ValueError(f"Unknown preload(s): {', '.join(unknown)}; available: {', '.join(PRELOADS)}")
+        self.size = size
+        self.preload = list(preload)
+        self.job_timeout = job_timeout
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self._ctx = mp.get_context("spawn")
+        self._queue: "queue.Queue" = queue.Queue()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._workers: List[Optional[_Worker]] = [None] * size
+        self._busy = 0
+        self._closed = False
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "timeouts": 0, "recycled": 0,
+                      "crashed": 0, "wait_seconds": 0.0, "run_seconds": 0.0, "max_wait_seconds": 0.0}
+        self._threads = [threading.Thread(target=self._dispatch, args=(slot,), name=f"job-dispatch-{slot}",
+                                          daemon=True) for slot in range(size)]
+        for slot, thread in enumerate(self._threads):
+            self._workers[slot] = _Worker(self._ctx, self.preload)
+            thread.start()
+
+    def submit(self, name: str, *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Future:
+        if name not in JOBS:
+            raise KeyError(f"Unknown job {name!r}")
+        if self._closed:
+            raise RuntimeError("Worker pool is closed")
+        future: Future = Future()
+        with self._lock:
+            self.stats["submitted"] += 1
+        self._queue.put((future, name, args, kwargs, timeout or self.job_timeout, time.perf_counter()))
+        return future
+
+    def _count(self, **deltas: float) -> None:
+        with self._lock:
+            for key, delta in deltas.items():
+                self.stats[key] += delta
+
+    def _dispatch(self, slot: int) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            future, name, args, kwargs, timeout, enqueued = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            waited = time.perf_counter() - enqueued
+            with self._lock:
+                self._busy += 1
+                self.stats["wait_seconds"] += waited
+                self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], waited)
+            try:
+                self._run(slot, future, name, args, kwargs, timeout)
+            finally:
+                with self._lock:
+                    self._busy -= 1
+        worker = self._workers[slot]
+        if worker is not None:
+            worker.stop()
+
+    def _run(self, slot: int, future: Future, name: str, args: tuple, kwargs: dict, timeout: float) -> None:
+        worker = self._workers[slot]
+        try:
+            if worker is None or not worker.process.is_alive():
+                worker = self._workers[slot] = _Worker(self._ctx, self.preload)
+            if not worker.ready:
+                worker.wait_ready(START_TIMEOUT)
+            job_id = next(self._ids)
+            started = time.perf_counter()
+            try:
+                worker.conn.send((job_id, name, args, kwargs))
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                self._count(failed=1)
+                future.set_exception(TypeError(f"Arguments of {name} cannot be sent to a worker: {e}"))
+                return
+            if not worker.conn.poll(timeout):
+                worker.kill()
+                self._workers[slot] = _Worker(self._ctx, self.preload)
+                self._count(timeouts=1, failed=1, run_seconds=timeout)
+                future.set_exception(JobTimeout(f"Job {name} exceeded {timeout:g}s"))
+                return
+            _, ok, result, worker.rss_mb = worker.conn.recv()
+        except (EOFError, OSError, RuntimeError) as e:
+            # Worker died (crash, OOM kill) or never came up
+            if worker is not None:
+                worker.kill()
+            self._workers[slot] = None
+            self._count(crashed=1, failed=1)
+            future.set_exception(RuntimeError(f"Worker failed while running {name}: {e}"))
+            return
+        worker.jobs += 1
+        self._count(completed=1 if ok else 0, failed=0 if ok else 1, run_seconds=time.perf_counter() - started)
+        if worker.jobs >= self.max_jobs or worker.rss_mb > self.max_rss_mb:
+            worker.stop()
+            self._workers[slot] = _Worker(self._ctx, self.preload)
+            self._count(recycled=1)
+        if ok:
+            future.set_result(result)
+        else:
+            future.set_exception(result)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            busy = self._busy
+        finished = stats["completed"] + stats["failed"]
+        workers = [{"pid": w.process.pid, "ready": w.ready, "jobs": w.jobs, "rss_mb": round(w.rss_mb, 1)}
+                   for w in self._workers if w is not None]
+        return {"workers": self.size, "busy": busy, "queue_depth": self._queue.qsize(),
+                **{k: v for k, v in stats.items() if not k.endswith("_seconds")},
+                "avg_wait_ms": round(1000 * stats["wait_seconds"] / finished, 2) if finished else None,
+                "max_wait_ms": round(1000 * stats["max_wait_seconds"], 2),
+                "avg_run_ms": round(1000 * stats["run_seconds"] / finished, 2) if finished else None,
+                "processes": workers}
+
+    def close(self) -> None:
+        """Let queued jobs finish, then stop the workers"""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+def pool_size(setting: str = WORKERS) -> int:
+    if setting.strip().lower() == "auto":
+        return os.cpu_count() or 1
+    return max(0, int(setting))
+
+
+_pool: Optional[WorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> Optional[WorkerPool]:
+    """Process-wide pool sized by MAS_WORKERS; None when jobs run inline"""
+    global _pool
+    size = pool_size()
+    if size == 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # Artifacts are created in the workers; a shared directory lets the API serve them
+            os.environ.setdefault("MAS_ARTIFACT_DIR", os.path.join(".cache", "artifacts"))
+            from agents.output_format import get_artifact_store
+
+            get_artifact_store.cache_clear()
+            _pool = WorkerPool(size, [p.strip() for p in PRELOAD.split(",") if p.strip()])
+        return _pool
+
+
+def shutdown_worker_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+def run_job(name: str, *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+    """Run a job on the pool and wait for it (inline, without a timeout, when the pool is off)"""
+    pool = get_worker_pool()
+    if pool is None:
+        return JOBS[name](*args, **kwargs)
+    return pool.submit(name, *args, timeout=timeout, **kwargs).result()
+
+
+async def run_job_async(name: str, *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+    """`run_job` for async endpoints: the event loop keeps serving while the job runs"""
+    pool = get_worker_pool()
+    if pool is None:
+        return await asyncio.to_thread(JOBS[name], *args, **kwargs)
+    return await asyncio.wrap_future(pool.submit(name, *args, timeout=timeout, **kwargs))
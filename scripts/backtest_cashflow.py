@@ -0,0 +1,53 @@
+import os
+import sys
+import argparse
+
+# Ensure project root is on sys.path when running as a script
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from agents.cashflow_backtest import compare_configs, run_backtest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the cash-flow forecaster")
+    parser.add_argument("--data", default="data/cashflow_data.csv", help="Cash-flow CSV to evaluate on")
+    parser.add_argument("--synthetic-days", type=int, default=None,
+                        help="Use a generated history of this many days instead of --data")
+    parser.add_argument("--config", action="append", default=[],
+                        help="Model configuration 'name:key=value,...' (repeatable), "
+                             "e.g. small:n_estimators=50,max_depth=8")
+    parser.add_argument("--horizons", default="1,7,30", help="Comma-separated forecast horizons in days")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--min-train", type=int, default=None)
+    parser.add_argument("--train-window", type=int, default=None,
+                        help="Sliding training window in days (default: expanding)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default=None, help="Write per-fold results to this CSV")
+    args = parser.parse_args()
+
+    results = run_backtest(
+        path=args.data,
+        synthetic_days=args.synthetic_days,
+        config_specs=args.config,
+        horizons=[int(h) for h in args.horizons.split(",")],
+        n_folds=args.folds,
+        min_train=args.min_train,
+        train_window=args.train_window,
+        max_workers=args.workers,
+    )
+    summary = results["summary"]
+
+    print("Per-horizon results:")
+    print(summary.to_string(index=False, float_format=lambda v: f"{v:,.3f}"))
+    print("\nConfiguration comparison (MAE):")
+    print(compare_configs(summary).to_string(float_format=lambda v: f"{v:,.3f}"))
+
+    if args.out:
+        results["folds"].to_csv(args.out, index=False)
+        print(f"\nPer-fold results saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,451 @@
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# Ensure project root is on sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from scripts.generate_synthetic_data import DEFAULT_FILES, write_table
+
+DEFAULT_SCALES = "100,1000,10000"
+# Fixed reference date so a workspace (and thus every result) is reproducible
+AS_OF = "2025-06-30"
+RAG_DIM = 768
+
+
+# -- workspaces ---------------------------------------------------------------------------------
+def prepare_workspace(root: str, scale: int, seed: int, max_cashflow_days: int) -> str:
+    """Synthetic data/ tree for one scale, generated once and reused.
+
+    Tools read relative `data/...` paths, so benchmarks run with the
+    workspace as working directory. Cash-flow history is capped because
+    training cost grows linearly with days.
+    """
+    path = os.path.join(root, f"scale-{scale}-seed-{seed}")
+    marker = os.path.join(path, ".complete")
+    if os.path.exists(marker):
+        return path
+    rows = {table: scale for table in DEFAULT_FILES}
+    rows["cashflow"] = min(scale, max_cashflow_days)
+    for table, file in DEFAULT_FILES.items():
+        target = os.path.join(path, file)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        write_table(table, rows[table], target, seed=seed, workers=1, as_of=AS_OF)
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(rows, f)
+    return path
+
+
+# -- measurement --------------------------------------------------------------------------------
+def measure(fn: Callable[[], Any], repeat: int = 5, min_sample_time: float = 0.05) -> Dict[str, Any]:
+    """Per-call timings over `repeat` samples.
+
+    The first call doubles as warm-up and calibration: fast calls are looped
+    so each sample lasts at least `min_sample_time`, which keeps timer
+    resolution out of sub-millisecond results.
+    """
+    t0 = time.perf_counter()
+    fn()
+    first = time.perf_counter() - t0
+    loops = 1
+    if first < min_sample_time:
+        loops = max(1, int(min_sample_time / max(first, 1e-7)))
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - t0) / loops * 1000)
+    return {
+        "median_ms": round(statistics.median(samples), 4),
+        "min_ms": round(min(samples), 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "stdev_ms": round(statistics.stdev(samples), 4) if len(samples) > 1 else 0.0,
+        "first_call_ms": round(first * 1000, 4),
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+# -- benchmark definitions ----------------------------------------------------------------------
+# Each setup(ctx) does the untimed preparation and returns the callable to time.
+# Setups import lazily: a missing optional dependency skips the benchmark only.
+
+def _invoices(ctx):
+    from agents.invoice_agent import analyze_all_invoices
+    return lambda: analyze_all_invoices.func("Tổng quan hóa đơn")
+
+
+def _invoice_aging(ctx):
+    from agents.invoice_aging import InvoiceAgingIndex, format_aging_report, load_invoices
+    index = InvoiceAgingIndex(load_invoices(DEFAULT_FILES["invoices"]))
+    return lambda: format_aging_report(index, as_of=AS_OF, days=30)
+
+
+def _invoice_query(ctx):
+    from agents.invoice_aging import load_invoices
+    from agents.invoice_query import InvoiceQueryIndex, run_invoice_query
+    index = InvoiceQueryIndex(load_invoices(DEFAULT_FILES["invoices"]))
+    question = f"Hóa đơn của {index.categories['vendor'][0]} quý 2/2025 trên 1,000 USD theo trạng thái"
+    return lambda: run_invoice_query(index, question, as_of=AS_OF)
+
+
+def _budget_cube(ctx):
+    import pandas as pd
+    from agents.budget_cube import BudgetCube, answer_budget_query
+    cube = BudgetCube(pd.read_csv(DEFAULT_FILES["budgets"]))
+    return lambda: answer_budget_query(cube, "Marketing Q2 2024", as_of=AS_OF)
+
+
+def _cashflow_trends(ctx):
+    from agents.cashflow_agent import analyze_cashflow_trends
+    from agents.cashflow_model import load_cashflow_data
+    df = load_cashflow_data()
+    return lambda: analyze_cashflow_trends(df)
+
+
+def _predictor_train(ctx):
+    from agents.cashflow_model import CashFlowPredictor, load_cashflow_data
+    df = load_cashflow_data()
+    return lambda: CashFlowPredictor().train(df)
+
+
+def _predictor_predict(ctx):
+    from agents.cashflow_model import CashFlowPredictor, load_cashflow_data
+    df = load_cashflow_data()
+    predictor = CashFlowPredictor()
+    predictor.train(df)
+    return lambda: predictor.predict(df, days_ahead=30)
+
+
+def _alert(name):
+    def setup(ctx):
+        import agents.alert_agent as alert_agent
+        detector = getattr(alert_agent, name)
+        return lambda: detector.func()
+    return setup
+
+
+def _subscriptions(ctx):
+    from agents.spending_agent import summarize_subscriptions
+    return lambda: summarize_subscriptions(DEFAULT_FILES["transactions"])
+
+
+class _HashEmbedder:
+    """Deterministic unit vectors, so retrieval is timed without an embedding server."""
+
+    def embed_query(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vec = np.random.default_rng(seed).standard_normal(RAG_DIM)
+        return (vec / np.linalg.norm(vec)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(t) for t in texts]
+
+
+def _rag_retrieval(ctx):
+    import rag.vectorstore as vectorstore
+    embedder = _HashEmbedder()
+    vectors = np.random.default_rng(0).standard_normal((ctx["scale"], RAG_DIM))
+    vectorstore._INDEX = [(f"policy document {i}", v.tolist()) for i, v in enumerate(vectors)]
+    vectorstore._EMBEDDER = embedder
+    vectorstore._get_embedder.cache_clear()
+    retriever = vectorstore.get_retriever(k=4)
+    return lambda: retriever.get_relevant_documents("Chính sách chi tiêu > 5000 USD cần ai duyệt?")
+
+
+def _query(intent):
+    def setup(ctx):
+        # Build the agents here so a missing LLM dependency marks the benchmark skipped
+        import agents.coord  # noqa: F401
+        from orchestration.mas_graph import app
+        from scripts.test_agents import TEST_QUERIES
+        queries = TEST_QUERIES[intent]
+
+        def run():
+            for query in queries:
+                app.invoke({"messages": [{"role": "user", "content": query}]})
+        return run
+    return setup
+
+
+MICRO = {
+    "tool.analyze_all_invoices": _invoices,
+    "tool.invoice_aging": _invoice_aging,
+    "tool.query_invoices": _invoice_query,
+    "tool.budget_cube": _budget_cube,
+    "tool.analyze_cashflow_trends": _cashflow_trends,
+    "model.cashflow_predictor.train": _predictor_train,
+    "model.cashflow_predictor.predict": _predictor_predict,
+    "tool.detect_high_value_transactions": _alert("detect_high_value_transactions"),
+    "tool.detect_unusual_hours_transactions": _alert("detect_unusual_hours_transactions"),
+    "tool.detect_over_budget_spending": _alert("detect_over_budget_spending"),
+    "tool.detect_late_supplier_payments": _alert("detect_late_supplier_payments"),
+    "tool.summarize_subscriptions": _subscriptions,
+    "rag.retrieval": _rag_retrieval,
+}
+# Training dominates wall time; fewer samples are plenty at that duration
+REPEAT_OVERRIDES = {"model.cashflow_predictor.train": 3}
+
+
+def _macro() -> Dict[str, Callable]:
+    from scripts.test_agents import TEST_QUERIES
+    return {f"query.{intent}": _query(intent) for intent in TEST_QUERIES}
+
+
+def select(names: List[str], pattern: Optional[str]) -> List[str]:
+    return [n for n in names if not pattern or re.search(pattern, n)]
+
+
+def run_scale(scale: int, workspace: str, options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """All benchmarks for one scale; runs in a fresh process so module-level
+    caches (router, trained agents) are built from this scale's data."""
+    os.environ.setdefault("MAS_LLM_PROVIDER", options["provider"])
+    # Repeated queries would be answered from the completion cache after the first sample
+    os.environ.setdefault("MAS_LLM_CACHE", "off")
+    # Likewise memoized tool results: every sample should do the work
+    os.environ.setdefault("MAS_TOOL_CACHE_SIZE", "0")
+    os.chdir(workspace)
+    with open(".complete", encoding="utf-8") as f:
+        rows = json.load(f)
+
+    benchmarks = [("micro", name, setup) for name, setup in MICRO.items()]
+    if options["macro"]:
+        benchmarks += [("macro", name, setup) for name, setup in _macro().items()]
+    ctx = {"scale": scale, "rows": rows}
+    results = []
+    for group, name, setup in benchmarks:
+        if name not in options["names"]:
+            continue
+        result = _run_one(group, name, setup, ctx, options)
+        results.append(result)
+        if options["verbose"]:
+            print(f"  {name:<42} {_describe(result)}", flush=True)
+    return results
+
+
+def _run_one(group: str, name: str, setup: Callable, ctx: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    result = {"name": name, "group": group, "scale": ctx["scale"]}
+    try:
+        fn = setup(ctx)
+        if group == "macro":
+            from agents.llm import reset_fake_stats
+            reset_fake_stats()
+    except ImportError as e:
+        return {**result, "status": "skipped", "detail": f"missing dependency: {e.name or e}"}
+    except Exception as e:
+        return {**result, "status": "error", "detail": f"setup failed: {type(e).__name__}: {e}"}
+
+    try:
+        stats = measure(fn, repeat=REPEAT_OVERRIDES.get(name, options["repeat"]),
+                        min_sample_time=options["min_sample_time"])
+    except Exception as e:
+        return {**result, "status": "error", "detail": f"{type(e).__name__}: {e}"}
+    result.update(status="ok", **stats)
+    if group == "macro":
+        # Simulated LLM time is slept inside the timings; report it so it can be subtracted
+        llm = reset_fake_stats()
+        runs = stats["loops"] * stats["repeat"] + 1
+        result["llm_calls_per_run"] = round(llm["calls"] / runs, 2)
+        result["simulated_llm_ms_per_run"] = round(llm["simulated_seconds"] * 1000 / runs, 4)
+    return result
+
+
+def _describe(result: Dict[str, Any]) -> str:
+    if result["status"] != "ok":
+        return f"{result['status']}: {result['detail']}"
+    return f"{result['median_ms']:>12.3f} ms  (min {result['min_ms']:.3f}, ±{result['stdev_ms']:.3f})"
+
+
+# -- machine info -------------------------------------------------------------------------------
+def _cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        out = subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return out.stdout.strip() if out.returncode == 0 else None
+
+
+def machine_info() -> Dict[str, Any]:
+    import pandas as pd
+    import sklearn
+
+    memory = None
+    if hasattr(os, "sysconf"):
+        try:
+            memory = round(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 2 ** 30, 2)
+        except (ValueError, OSError):
+            pass
+    return {
+        "platform": platform.platform(),
+        "cpu": _cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "memory_gb": memory,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "git_commit": _git("rev-parse", "HEAD"),
+        "git_dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+    }
+
+
+# -- commands -----------------------------------------------------------------------------------
+def cmd_run(args) -> int:
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    names = select(list(MICRO), args.only)
+    if args.macro:
+        names += select(list(_macro()), args.only)
+    if not names:
+        print(f"No benchmark matches '{args.only}'")
+        return 2
+    options = {"names": names, "repeat": args.repeat, "min_sample_time": args.min_sample_time,
+               "macro": args.macro, "provider": args.provider, "verbose": True}
+
+    workspace_root = os.path.abspath(args.workspace)
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    for scale in scales:
+        workspace = prepare_workspace(workspace_root, scale, args.seed, args.max_cashflow_days)
+        print(f"scale={scale:,}", flush=True)
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            results.extend(pool.submit(run_scale, scale, workspace, options).result())
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": machine_info(),
+        "settings": {"scales": scales, "repeat": args.repeat, "min_sample_time": args.min_sample_time,
+                     "seed": args.seed, "as_of": AS_OF, "max_cashflow_days": args.max_cashflow_days,
+                     "llm_provider": os.getenv("MAS_LLM_PROVIDER", args.provider), "only": args.only},
+        "results": results,
+    }
+    output = args.output or os.path.join(ROOT, "benchmarks", "results",
+                                          datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Results saved to {output}")
+    return 0
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], metric: str = "median_ms",
+            threshold: float = 0.10, min_delta_ms: float = 0.05) -> List[Dict[str, Any]]:
+    """Pair results by (name, scale). A change counts only if it exceeds both the
+    relative `threshold` and the absolute `min_delta_ms` noise floor."""
+    key = lambda r: (r["name"], r["scale"])
+    scales = {r["scale"] for r in current["results"]}
+    # Scales the current run did not cover are not "missing"
+    base = {key(r): r for r in baseline["results"] if r["scale"] in scales}
+    rows = []
+    for r in current["results"]:
+        b = base.pop(key(r), None)
+        row = {"name": r["name"], "scale": r["scale"], "baseline": None, "current": None, "change": None}
+        if b is None or r["status"] != "ok" or b["status"] != "ok":
+            if b is None:
+                verdict = "new"
+            elif r["status"] != "ok":
+                verdict = r["status"]
+            else:
+                verdict = "no baseline"
+            rows.append({**row, "baseline": b.get(metric) if b else None, "current": r.get(metric),
+                         "verdict": verdict})
+            continue
+        old, new = b[metric], r[metric]
+        change = (new - old) / old if old else 0.0
+        significant = abs(new - old) >= min_delta_ms and abs(change) > threshold
+        verdict = "ok"
+        if significant:
+            verdict = "REGRESSION" if change > 0 else "improved"
+        rows.append({**row, "baseline": old, "current": new, "change": round(change, 4), "verdict": verdict})
+    for (name, scale), b in base.items():
+        rows.append({"name": name, "scale": scale, "baseline": b.get(metric), "current": None, "change": None,
+                     "verdict": "missing"})
+    return rows
+
+
+MACHINE_KEYS = ("cpu", "cpu_count", "python", "numpy", "pandas", "sklearn")
+
+
+def cmd_compare(args) -> int:
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    differs = [k for k in MACHINE_KEYS if baseline["machine"].get(k) != current["machine"].get(k)]
+    if differs:
+        print("Warning: results come from different environments (" +
+              ", ".join(f"{k}: {baseline['machine'].get(k)} -> {current['machine'].get(k)}" for k in differs) + ")")
+
+    rows = compare(baseline, current, args.metric, args.threshold, args.min_delta_ms)
+    fmt = lambda v: f"{v:>12.3f}" if isinstance(v, (int, float)) else f"{'-':>12}"
+    print(f"{'benchmark':<42}{'scale':>8}{'baseline':>12}{'current':>12}{'change':>9}  verdict  ({args.metric})")
+    for row in sorted(rows, key=lambda r: (r["name"], r["scale"])):
+        change = f"{row['change'] * 100:>+8.1f}%" if row["change"] is not None else f"{'-':>9}"
+        print(f"{row['name']:<42}{row['scale']:>8}{fmt(row['baseline'])}{fmt(row['current'])}{change}  {row['verdict']}")
+
+    regressions = [r for r in rows if r["verdict"] == "REGRESSION"]
+    improved = sum(1 for r in rows if r["verdict"] == "improved")
+    print(f"\n{len(regressions)} regression(s), {improved} improvement(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Micro/macro benchmarks with regression tracking")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run benchmarks and save results as JSON")
+    run.add_argument("--scales", default=DEFAULT_SCALES, help="Comma-separated synthetic row counts")
+    run.add_argument("--only", default=None, help="Regex selecting benchmark names")
+    run.add_argument("--repeat", type=int, default=5, help="Timed samples per benchmark")
+    run.add_argument("--min-sample-time", type=float, default=0.05,
+                     help="Loop fast calls until a sample lasts at least this many seconds")
+    run.add_argument("--no-macro", dest="macro", action="store_false", help="Skip end-to-end _SimpleApp queries")
+    run.add_argument("--provider", default="fake",
+                     help="LLM provider for macro benchmarks when MAS_LLM_PROVIDER is unset")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--max-cashflow-days", type=int, default=3650)
+    run.add_argument("--workspace", default=os.path.join(ROOT, "benchmarks", "workspaces"))
+    run.add_argument("--output", default=None, help="Default: benchmarks/results/<timestamp>.json")
+
+    cmp_ = sub.add_parser("compare", help="Compare results against a baseline; exit 1 on regressions")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("current")
+    cmp_.add_argument("--metric", default="median_ms", choices=["median_ms", "min_ms", "mean_ms"])
+    cmp_.add_argument("--threshold", type=float, default=0.10, help="Relative change flagged (0.10 = 10%%)")
+    cmp_.add_argument("--min-delta-ms", type=float, default=0.05, help="Ignore absolute changes below this")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sys.exit(cmd_run(args) if args.command == "run" else cmd_compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available; returns the time spent waiting."""
+        tokens = min(float(tokens), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def backoff_delay(attempt: int, base_delay: float = 1.0, max_delay: float = 30.0) -> float:
+    """Exponential backoff with +/-50% jitter so retrying workers do not stampede together."""
+    return min(max_delay, base_delay * (2 ** attempt)) * random.uniform(0.5, 1.5)
+
+
+def call_with_retries(fn, *args, max_retries: int = 4, base_delay: float = 1.0, max_delay: float = 30.0,
+                      sleep=time.sleep, **kwargs):
+    """Call `fn`, retrying any exception up to `max_retries` times with exponential backoff."""
+    for attempt in range(max_retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            if attempt == max_retries:
+                raise
+            sleep(backoff_delay(attempt, base_delay, max_delay))
+
+
+class FinancialsSource:
+    """Where quarterly statements come from.
+
+    `fetch(ticker, since)` returns one row per quarter with a `date` column
+    plus `ticker`, `marketCap` and the statement line items, limited to
+    quarters after `since` when given; None means the ticker has no data. Errors are raised so the engine can retry them.
+    `requests_per_fetch` is the number of upstream calls one fetch makes,
+    charged against the rate limiter.
+    """
+
+    requests_per_fetch = 1
+
+    def fetch(self, ticker: str, since: Optional[str] = None) -> Optional[pd.DataFrame]:
+        raise NotImplementedError
+
+
+def _after(df: pd.DataFrame, since: Optional[str]) -> Optional[pd.DataFrame]:
+    if since is None:
+        return df
+    df = df[pd.to_datetime(df['date']) > pd.Timestamp(since)]
+    return df if not df.empty else None
+
+
+class YFinanceSource(FinancialsSource):
+    """Yahoo Finance statements: cash flow, income statement and balance sheet.
+
+    Market cap comes from `fast_info` (price x shares) instead of the much
+    heavier `info` endpoint.
+    """
+
+    requests_per_fetch = 4
+
+    def __init__(self):
+        import yfinance  # optional: only needed for live fetches
+        self._yf = yfinance
+
+    def fetch(self, ticker: str, since: Optional[str] = None) -> Optional[pd.DataFrame]:
+        # The statements endpoints have no date filter; they return the last few quarters
+        handle = self._yf.Ticker(ticker)
+        statements = [handle.quarterly_cashflow.T, handle.quarterly_financials.T, handle.quarterly_balance_sheet.T]
+        if any(s.empty for s in statements):
+            return None
+        df = pd.concat(statements, axis=1)
+        df = df.loc[:, ~df.columns.duplicated()].copy()
+        try:
+            market_cap = handle.fast_info['marketCap']
+        except Exception:
+            market_cap = None
+        df['ticker'] = ticker
+        df['marketCap'] = market_cap or 0
+        df.index.name = 'date'
+        df = df.reset_index()
+        df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+        return _after(df, since)
+
+
+class StubSource(FinancialsSource):
+    """Deterministic offline source for tests and dry runs.
+
+    Generates `quarters` quarters per ticker ending at `as_of`; a quarter's
+    values depend only on (seed, ticker, date), so moving `as_of` forward
+    adds new quarters without changing old ones. `failure_rate` makes that
+    share of calls raise, and `latency` simulates network time.
+    """
+
+    def __init__(self, columns: Sequence[str], quarters: int = 8, as_of: str = "2024-12-31",
+                 failure_rate: float = 0.0, latency: float = 0.0, seed: int = 42):
+        self.columns = list(columns)
+        self.quarters = quarters
+        self.as_of = pd.Timestamp(as_of)
+        self.failure_rate = failure_rate
+        self.latency = latency
+        self.seed = seed
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def fetch(self, ticker: str, since: Optional[str] = None) -> Optional[pd.DataFrame]:
+        with self._lock:
+            self.calls += 1
+            fail = self._rng.random() < self.failure_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise ConnectionError(f"stub failure for {ticker}")
+        key = [self.seed, *ticker.encode("utf-8")]
+        dates = pd.date_range(end=self.as_of, periods=self.quarters, freq=pd.offsets.QuarterEnd())
+        scale = np.random.default_rng(key).lognormal(21, 1)
+        values = np.stack([
+            np.random.default_rng(key + [d.toordinal()]).normal(1.0, 0.2, size=len(self.columns))
+            for d in dates
+        ]) * scale
+        df = pd.DataFrame(values, columns=self.columns)
+        df.insert(0, 'date', dates.strftime('%Y-%m-%d'))
+        df.insert(1, 'ticker', ticker)
+        df.insert(2, 'marketCap', int(scale * 20))
+        return _after(df, since)
+
+
+def _safe_name(ticker: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in ticker)
+
+
+class FetchEngine:
+    """Concurrent, rate-limited, resumable fetch of many tickers.
+
+    Each finished ticker is written to `checkpoint_dir/<ticker>.csv` (or an
+    `<ticker>.empty` marker when the source has no data) before the next is
+    reported, so a rerun only fetches tickers that are missing or failed.
+    """
+
+    def __init__(self, source: FinancialsSource, checkpoint_dir: str, max_workers: int = 8,
+                 rate: float = 4.0, burst: Optional[float] = None, max_retries: int = 4,
+                 base_delay: float = 1.0, columns: Optional[Sequence[str]] = None):
+        self.source = source
+        self.checkpoint_dir = checkpoint_dir
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.columns = list(columns) if columns is not None else None
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def _paths(self, ticker: str) -> Dict[str, str]:
+        base = os.path.join(self.checkpoint_dir, _safe_name(ticker))
+        return {"data": base + ".csv", "empty": base + ".empty"}
+
+    def is_done(self, ticker: str) -> bool:
+        return any(os.path.exists(p) for p in self._paths(ticker).values())
+
+    def _write(self, ticker: str, df: Optional[pd.DataFrame]) -> None:
+        paths = self._paths(ticker)
+        if df is None or df.empty:
+            open(paths["empty"], "w").close()
+            return
+        if self.columns is not None:
+            df = df.reindex(columns=['date'] + [c for c in self.columns if c != 'date'])
+        tmp = paths["data"] + ".tmp"
+        df.to_csv(tmp, index=False)
+        os.replace(tmp, paths["data"])
+
+    def _fetch_one(self, ticker: str, since: Optional[str] = None) -> Optional[pd.DataFrame]:
+        def attempt():
+            self.bucket.acquire(getattr(self.source, "requests_per_fetch", 1))
+            return self.source.fetch(ticker, since=since)
+        df = call_with_retries(attempt, max_retries=self.max_retries, base_delay=self.base_delay)
+        self._write(ticker, df)
+        return df
+
+    def run(self, tickers: Iterable[str], since: Optional[Dict[str, str]] = None,
+            progress: bool = True) -> Dict[str, Any]:
+        """Fetch every ticker without a checkpoint. Returns a summary report.
+
+        `since` maps tickers to the date after which quarters are requested.
+        """
+        since = since or {}
+        tickers = list(dict.fromkeys(tickers))
+        pending = [t for t in tickers if not self.is_done(t)]
+        report: Dict[str, Any] = {
+            "requested": len(tickers),
+            "skipped": len(tickers) - len(pending),
+            "fetched": 0,
+            "empty": 0,
+            "failed": {},
+        }
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._fetch_one, t, since.get(t)): t for t in pending}
+            for future in tqdm(as_completed(futures), total=len(futures), disable=not progress):
+                ticker = futures[future]
+                try:
+                    df = future.result()
+                except Exception as e:
+                    report["failed"][ticker] = f"{type(e).__name__}: {e}"
+                    continue
+                report["fetched" if df is not None and not df.empty else "empty"] += 1
+        report["elapsed_seconds"] = time.perf_counter() - started
+        return report
+
+    def load(self, tickers: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Concatenate the checkpointed frames (all of them, or only `tickers`)."""
+        if tickers is None:
+            files = sorted(f for f in os.listdir(self.checkpoint_dir) if f.endswith(".csv"))
+            paths = [os.path.join(self.checkpoint_dir, f) for f in files]
+        else:
+            paths = [p for p in (self._paths(t)["data"] for t in tickers) if os.path.exists(p)]
+        frames: List[pd.DataFrame] = [pd.read_csv(p) for p in paths]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
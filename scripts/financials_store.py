@@ -0,0 +1,203 @@
+import json
+import os
+import shutil
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+KEY_COLUMNS = ('ticker', 'date')
+# Ticker-level snapshot repeated on every row; not part of change detection
+SNAPSHOT_COLUMNS = ('marketCap',)
+INDEX_FILE = '_index.json'
+
+
+def _parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+    df['ticker'] = df['ticker'].astype(str)
+    for col in df.columns:
+        if col not in KEY_COLUMNS and col != 'size_category':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+    return df.drop_duplicates('date', keep='last').sort_values('date').reset_index(drop=True)
+
+
+def _changed(old: pd.DataFrame, new: pd.DataFrame, columns: Sequence[str]) -> np.ndarray:
+    """Row mask: any value differs (NaN == NaN), with float round-off tolerance."""
+    if not columns:
+        return np.zeros(len(new), dtype=bool)
+    a = old[list(columns)].to_numpy(dtype=float)
+    b = new[list(columns)].to_numpy(dtype=float)
+    same = np.isclose(a, b, rtol=1e-12, atol=0.0, equal_nan=True)
+    return ~same.all(axis=1)
+
+
+class PartitionedFinancialsStore:
+    """Quarterly fundamentals stored as one file per ticker.
+
+    Partitions are Parquet (CSV when no Parquet engine is installed). A small
+    `_index.json` keeps each ticker's latest quarter and row count, so
+    deciding what to refresh never opens the partitions. `upsert` rewrites a
+    partition only when rows were inserted or values changed.
+    """
+
+    def __init__(self, root: str, fmt: Optional[str] = None):
+        self.root = root
+        self.fmt = fmt or ('parquet' if _parquet_available() else 'csv')
+        os.makedirs(root, exist_ok=True)
+        self._index = self._load_index()
+
+    # -- index ---------------------------------------------------------------------------
+    def _index_path(self) -> str:
+        return os.path.join(self.root, INDEX_FILE)
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        if os.path.exists(self._index_path()):
+            with open(self._index_path(), encoding='utf-8') as f:
+                return json.load(f)
+        index = {}
+        for name in os.listdir(self.root):
+            stem, ext = os.path.splitext(name)
+            if ext in ('.parquet', '.csv') and not stem.startswith('_'):
+                df = self._read_path(os.path.join(self.root, name))
+                index[str(df['ticker'].iloc[0])] = {'latest': df['date'].max(), 'rows': len(df), 'file': name}
+        return index
+
+    def _save_index(self) -> None:
+        tmp = self._index_path() + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, indent=0, sort_keys=True)
+        os.replace(tmp, self._index_path())
+
+    def latest_dates(self) -> Dict[str, str]:
+        return {ticker: entry['latest'] for ticker, entry in self._index.items()}
+
+    @property
+    def tickers(self) -> List[str]:
+        return sorted(self._index)
+
+    # -- partitions ----------------------------------------------------------------------
+    def _file_name(self, ticker: str) -> str:
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in ticker)
+        return f"{safe}.{self.fmt}"
+
+    def _read_path(self, path: str) -> pd.DataFrame:
+        if path.endswith('.parquet'):
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path, dtype={'ticker': str, 'date': str})
+        return _normalize(df)
+
+    def read(self, ticker: str) -> Optional[pd.DataFrame]:
+        entry = self._index.get(ticker)
+        if entry is None:
+            return None
+        return self._read_path(os.path.join(self.root, entry['file']))
+
+    def _write(self, ticker: str, df: pd.DataFrame) -> None:
+        name = self._index.get(ticker, {}).get('file') or self._file_name(ticker)
+        path = os.path.join(self.root, name)
+        tmp = path + '.tmp'
+        if name.endswith('.parquet'):
+            df.to_parquet(tmp, index=False)
+        else:
+            df.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+        self._index[ticker] = {'latest': df['date'].max(), 'rows': len(df), 'file': name}
+
+    def upsert(self, ticker: str, new: pd.DataFrame) -> pd.DataFrame:
+        """Merge fetched rows into the ticker's partition by date.
+
+        Returns the inserted/updated rows with a `change` column; an empty
+        result means the partition was left untouched.
+        """
+        new = _normalize(new.assign(ticker=ticker))
+        old = self.read(ticker)
+        if old is None or old.empty:
+            self._write(ticker, new)
+            return new.assign(change='insert')
+
+        columns = list(dict.fromkeys(list(old.columns) + list(new.columns)))
+        old = old.reindex(columns=columns)
+        new = new.reindex(columns=columns)
+        compare = [c for c in columns if c not in KEY_COLUMNS and c not in SNAPSHOT_COLUMNS and c != 'size_category']
+
+        overlap = new['date'].isin(old['date']).to_numpy()
+        inserted = new[~overlap]
+        matched_new = new[overlap].set_index('date')
+        matched_old = old.set_index('date').loc[matched_new.index]
+        updated = matched_new[_changed(matched_old, matched_new, compare)].reset_index()
+
+        if inserted.empty and updated.empty:
+            return new.iloc[0:0].assign(change=pd.Series(dtype=str))
+
+        merged = pd.concat([old[~old['date'].isin(updated['date'])], updated, inserted], ignore_index=True)
+        merged = merged.sort_values('date').reset_index(drop=True)
+        for col in SNAPSHOT_COLUMNS:
+            if col in new and new[col].notna().any():
+                # Latest snapshot applies to the whole ticker
+                merged[col] = new[col].dropna().iloc[-1]
+        self._write(ticker, merged[columns])
+        return pd.concat([inserted.assign(change='insert'), updated.assign(change='update')], ignore_index=True)
+
+    def upsert_many(self, frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """Upsert several tickers and persist the index once. Returns the change report."""
+        changes = [self.upsert(ticker, df) for ticker, df in frames.items() if df is not None and not df.empty]
+        self._save_index()
+        changes = [c for c in changes if not c.empty]
+        if not changes:
+            return pd.DataFrame(columns=['ticker', 'date', 'change'])
+        report = pd.concat(changes, ignore_index=True)
+        return report[['ticker', 'date', 'change'] + [c for c in report.columns if c not in ('ticker', 'date', 'change')]]
+
+    def import_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Seed the store from a combined frame (e.g. an existing financial_data_sp500.csv)."""
+        frames = {ticker: group for ticker, group in df.groupby('ticker', sort=False)}
+        return self.upsert_many(frames)
+
+    def load(self, tickers: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        tickers = self.tickers if tickers is None else [t for t in tickers if t in self._index]
+        frames = [self.read(t) for t in tickers]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
+        self._index = {}
+
+
+def due_for_refresh(latest: Dict[str, str], tickers: Iterable[str], as_of: Optional[str] = None,
+                    min_age_days: int = 91) -> List[str]:
+    """Tickers with no stored data or whose next quarter has ended by `as_of`.
+
+    A ticker reported through Q3 has nothing new to fetch until Q4 ends, so
+    skipping it saves every upstream request for that ticker.
+    """
+    as_of = pd.Timestamp(as_of) if as_of else pd.Timestamp.today().normalize()
+    due = []
+    for ticker in tickers:
+        last = latest.get(ticker)
+        if last is None or (as_of - pd.Timestamp(last)).days >= min_age_days:
+            due.append(ticker)
+    return due
+
+
+def refresh_since(latest: Dict[str, str], tickers: Iterable[str], lookback_quarters: int = 1) -> Dict[str, str]:
+    """Per-ticker `since` date: the latest stored quarter minus `lookback_quarters`,
+    so recently restated quarters are refetched and compared too."""
+    since = {}
+    for ticker in tickers:
+        last = latest.get(ticker)
+        if last is not None:
+            # Quarter ends are ~91 days apart; stop halfway-ish into the previous gap
+            days = 91 * lookback_quarters - 30 if lookback_quarters > 0 else 0
+            since[ticker] = (pd.Timestamp(last) - pd.Timedelta(days=days)).strftime('%Y-%m-%d')
+    return since
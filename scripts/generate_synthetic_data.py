@@ -1,225 +1,192 @@
-import pandas as pd
-import numpy as np
-import random
-from datetime import datetime, timedelta
+import argparse
 import json
-from typing import List, Dict
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
 
-# Set seed for reproducibility
-np.random.seed(42)
+# Seed for the RAG documents (the tables take their own Generator)
 random.seed(42)
+DEFAULT_SEED = 42
+
+DEPARTMENTS = [
+    "Marketing", "Sales", "R&D", "Engineering", "HR", "Finance",
+    "Operations", "Customer Success", "Product", "Legal", "IT", "Admin"
+]
+PROJECTS = [f"Project_{i:03d}" for i in range(1, 51)]
+QUARTERS = ["Q1", "Q2", "Q3", "Q4"]
+BUDGET_CATEGORIES = ["Capital", "Operating", "R&D", "Marketing", "Travel"]
+
+MERCHANTS = [
+    "Amazon Web Services", "Microsoft Azure", "Google Cloud", "Slack", "Zoom", "Notion",
+    "Adobe Creative Suite", "Salesforce", "HubSpot", "Stripe", "PayPal", "Shopify",
+    "LinkedIn Ads", "Google Ads", "Facebook Ads", "Twitter Ads", "TikTok Ads",
+    "Uber", "Lyft", "Delta Airlines", "United Airlines", "American Airlines",
+    "Marriott", "Hilton", "Airbnb", "Expedia", "Booking.com",
+    "Starbucks", "McDonald's", "Subway", "Chipotle", "Pizza Hut",
+    "Office Depot", "Staples", "Best Buy", "Apple Store", "Microsoft Store",
+    "GitHub", "Atlassian", "Trello", "Asana", "Monday.com", "Basecamp"
+]
+TRANSACTION_CATEGORIES = [
+    "subscription", "travel", "marketing", "payroll", "office_supplies",
+    "software", "hardware", "consulting", "legal", "insurance", "utilities",
+    "meals", "entertainment", "training", "conference", "advertising"
+]
+# Log-normal mean of the amount per category: subscription $100-2000, travel $500-5000,
+# marketing $1000-10000, payroll $5000-50000, everything else $200-3000
+CATEGORY_MU = np.array([{"subscription": 6, "travel": 7, "marketing": 8, "payroll": 9}.get(c, 6.5)
+                        for c in TRANSACTION_CATEGORIES])
+EMPLOYEES = [f"EMP_{i:03d}" for i in range(1, 101)]
+PAYMENT_METHODS = ["credit_card", "bank_transfer", "check", "cash"]
+TRANSACTION_STATUSES = ["completed", "pending", "failed"]
+CASHFLOW_CATEGORIES = ["operating", "investing", "financing"]
+
+VENDORS = [
+    "TechCorp Solutions", "Global Services Inc", "Premier Consulting", "Elite Systems",
+    "Advanced Technologies", "Professional Services Co", "Innovation Labs", "Digital Partners",
+    "Strategic Solutions", "Excellence Corp", "Prime Services", "Superior Systems",
+    "Enterprise Solutions", "Premium Technologies", "Master Services", "Ultimate Systems"
+]
+INVOICE_TYPES = ["services", "products", "consulting", "software", "hardware", "maintenance"]
+PAYMENT_TERMS = ["Net 30", "Net 15", "Net 45", "Due on Receipt", "Net 60"]
+TERM_DAYS = np.array([30, 15, 45, 0, 60])
+INVOICE_STATUSES = ["pending", "approved", "paid", "overdue", "disputed", "cancelled"]
+MANAGERS = [f"Manager_{i}" for i in range(1, 21)]
+PO_NUMBERS = [f"PO_{i}" for i in range(1000, 10000)]
+
+
+def _rng(rng: Optional[np.random.Generator]) -> np.random.Generator:
+    return rng if rng is not None else np.random.default_rng(DEFAULT_SEED)
+
 
-def generate_budget_data(n=100) -> pd.DataFrame:
+def _as_of(as_of: Optional[Any]) -> np.datetime64:
+    return np.datetime64(pd.Timestamp(as_of or date.today()).date(), "D")
+
+
+def _choice(rng: np.random.Generator, categories: List[str], n: int) -> pd.Categorical:
+    """Uniform categorical column drawn as integer codes"""
+    return pd.Categorical.from_codes(rng.integers(0, len(categories), n), categories=categories)
+
+
+def _ids(prefix: str, start: int, n: int, width: int = 6) -> np.ndarray:
+    numbers = np.arange(start + 1, start + n + 1).astype(str)
+    return np.char.add(prefix, np.char.zfill(numbers, width))
+
+
+def generate_budget_data(n=100, rng=None, start=0) -> pd.DataFrame:
     """Generate synthetic budget data for Budget Agent"""
-    departments = [
-        "Marketing", "Sales", "R&D", "Engineering", "HR", "Finance", 
-        "Operations", "Customer Success", "Product", "Legal", "IT", "Admin"
-    ]
-    
-    projects = [f"Project_{i:03d}" for i in range(1, 51)]
-    quarters = ["Q1", "Q2", "Q3", "Q4"]
-    
-    data = []
-    for i in range(n):
-        dept = random.choice(departments)
-        project = random.choice(projects)
-        quarter = random.choice(quarters)
-        year = random.choice([2023, 2024])
-        
-        # Generate realistic budget amounts
-        base_amount = np.random.lognormal(10, 1)  # Log-normal distribution
-        approved = round(base_amount, 2)
-        
-        # Actual spent varies around approved (80-120% typically)
-        variance_factor = np.random.normal(0.95, 0.15)
-        variance_factor = max(0.5, min(1.5, variance_factor))  # Clamp between 50-150%
-        actual = round(approved * variance_factor, 2)
-        
-        data.append({
-            "dept": dept,
-            "project_id": project,
-            "quarter": quarter,
-            "year": year,
-            "approved_amount": approved,
-            "actual_spent": actual,
-            "category": random.choice(["Capital", "Operating", "R&D", "Marketing", "Travel"])
-        })
-    
-    return pd.DataFrame(data)
+    rng = _rng(rng)
+    approved = rng.lognormal(10, 1, n)
+    # Actual spent varies around approved (80-120% typically), clamped to 50-150%
+    variance_factor = np.clip(rng.normal(0.95, 0.15, n), 0.5, 1.5)
+    return pd.DataFrame({
+        "dept": _choice(rng, DEPARTMENTS, n),
+        "project_id": _choice(rng, PROJECTS, n),
+        "quarter": _choice(rng, QUARTERS, n),
+        "year": rng.choice(np.array([2023, 2024]), n),
+        "approved_amount": approved.round(2),
+        "actual_spent": (approved.round(2) * variance_factor).round(2),
+        "category": _choice(rng, BUDGET_CATEGORIES, n),
+    })
+
 
-def generate_transaction_data(n=100) -> pd.DataFrame:
+def generate_transaction_data(n=100, rng=None, as_of=None, start=0) -> pd.DataFrame:
     """Generate synthetic transaction data for Spending/Alert Agent"""
-    merchants = [
-        "Amazon Web Services", "Microsoft Azure", "Google Cloud", "Slack", "Zoom", "Notion",
-        "Adobe Creative Suite", "Salesforce", "HubSpot", "Stripe", "PayPal", "Shopify",
-        "LinkedIn Ads", "Google Ads", "Facebook Ads", "Twitter Ads", "TikTok Ads",
-        "Uber", "Lyft", "Delta Airlines", "United Airlines", "American Airlines",
-        "Marriott", "Hilton", "Airbnb", "Expedia", "Booking.com",
-        "Starbucks", "McDonald's", "Subway", "Chipotle", "Pizza Hut",
-        "Office Depot", "Staples", "Best Buy", "Apple Store", "Microsoft Store",
-        "GitHub", "Atlassian", "Trello", "Asana", "Monday.com", "Basecamp"
-    ]
-    
-    categories = [
-        "subscription", "travel", "marketing", "payroll", "office_supplies",
-        "software", "hardware", "consulting", "legal", "insurance", "utilities",
-        "meals", "entertainment", "training", "conference", "advertising"
-    ]
-    
-    employees = [f"EMP_{i:03d}" for i in range(1, 101)]
-    
-    data = []
-    for i in range(n):
-        # Generate transaction date in last 12 months
-        days_ago = random.randint(1, 365)
-        date = datetime.now() - timedelta(days=days_ago)
-        
-        merchant = random.choice(merchants)
-        category = random.choice(categories)
-        employee = random.choice(employees)
-        
-        # Generate amount based on category (different distributions)
-        if category == "subscription":
-            amount = np.random.lognormal(6, 1)  # $100-2000 typically
-        elif category == "travel":
-            amount = np.random.lognormal(7, 1)  # $500-5000 typically
-        elif category == "marketing":
-            amount = np.random.lognormal(8, 1)  # $1000-10000 typically
-        elif category == "payroll":
-            amount = np.random.lognormal(9, 1)  # $5000-50000 typically
-        else:
-            amount = np.random.lognormal(6.5, 1)  # $200-3000 typically
-        
-        amount = round(amount, 2)
-        
-        # Generate fraud flag (5% chance of fraud)
-        fraud_flag = 1 if random.random() < 0.05 else 0
-        
-        # Make some transactions anomalous (high amounts)
-        if random.random() < 0.1:  # 10% chance of high amount
-            amount = round(amount * np.random.uniform(3, 10), 2)
-        
-        data.append({
-            "transaction_id": f"TXN_{i+1:06d}",
-            "amount": amount,
-            "date": date.strftime("%Y-%m-%d"),
-            "category": category,
-            "merchant": merchant,
-            "employee_id": employee,
-            "fraud_flag": fraud_flag,
-            "description": f"Payment to {merchant} for {category}",
-            "payment_method": random.choice(["credit_card", "bank_transfer", "check", "cash"]),
-            "currency": "USD",
-            "status": random.choice(["completed", "pending", "failed"]),
-            "approval_required": 1 if amount > 5000 else 0
-        })
-    
-    return pd.DataFrame(data)
+    rng = _rng(rng)
+    # Transaction dates in the 12 months before as_of
+    dates = _as_of(as_of) - rng.integers(1, 366, n).astype("timedelta64[D]")
+    merchant = rng.integers(0, len(MERCHANTS), n)
+    category = rng.integers(0, len(TRANSACTION_CATEGORIES), n)
 
-def generate_cashflow_data(n=100) -> pd.DataFrame:
-    """Generate synthetic cash flow data for Cash Flow Agent"""
-    data = []
-    base_date = datetime(2023, 1, 1)
-    
-    for i in range(n):
-        date = base_date + timedelta(days=i)
-        month = date.month
-        quarter = f"Q{(month-1)//3 + 1}"
-        
-        # Generate realistic cash flow patterns
-        # Revenue (positive)
-        revenue = np.random.lognormal(12, 0.5)  # $50k-500k typically
-        
-        # Operating expenses (negative)
-        operating_exp = np.random.lognormal(11.5, 0.4)  # $30k-300k typically
-        
-        # Capital expenditures (negative, less frequent)
-        capex = np.random.lognormal(10, 1) if random.random() < 0.3 else 0
-        
-        # Net cash flow
-        net_cashflow = revenue - operating_exp - capex
-        
-        # Cash balance (cumulative)
-        if i == 0:
-            cash_balance = np.random.lognormal(13, 0.5)  # $100k-1M starting
-        else:
-            prev_balance = data[-1]["cash_balance"]
-            cash_balance = prev_balance + net_cashflow
-        
-        data.append({
-            "date": date.strftime("%Y-%m-%d"),
-            "quarter": quarter,
-            "revenue": round(revenue, 2),
-            "operating_expenses": round(operating_exp, 2),
-            "capital_expenditures": round(capex, 2),
-            "net_cashflow": round(net_cashflow, 2),
-            "cash_balance": round(cash_balance, 2),
-            "cash_flow_category": random.choice(["operating", "investing", "financing"]),
-            "forecast_accuracy": round(np.random.uniform(0.85, 0.98), 3)
-        })
-    
-    return pd.DataFrame(data)
+    amount = rng.lognormal(CATEGORY_MU[category], 1.0)
+    fraud_flag = (rng.random(n) < 0.05).astype(int)
+    # 10% of transactions are anomalously large
+    spike = rng.random(n) < 0.1
+    amount = amount.round(2)
+    amount[spike] = (amount[spike] * rng.uniform(3, 10, spike.sum())).round(2)
+
+    descriptions = [f"Payment to {m} for {c}" for m in MERCHANTS for c in TRANSACTION_CATEGORIES]
+    return pd.DataFrame({
+        "transaction_id": _ids("TXN_", start, n),
+        "amount": amount,
+        "date": dates,
+        "category": pd.Categorical.from_codes(category, categories=TRANSACTION_CATEGORIES),
+        "merchant": pd.Categorical.from_codes(merchant, categories=MERCHANTS),
+        "employee_id": _choice(rng, EMPLOYEES, n),
+        "fraud_flag": fraud_flag,
+        "description": pd.Categorical.from_codes(merchant * len(TRANSACTION_CATEGORIES) + category,
+                                                 categories=descriptions),
+        "payment_method": _choice(rng, PAYMENT_METHODS, n),
+        "currency": "USD",
+        "status": _choice(rng, TRANSACTION_STATUSES, n),
+        "approval_required": (amount > 5000).astype(int),
+    })
 
-def generate_invoice_data(n=100) -> pd.DataFrame:
+
+def generate_cashflow_data(n=100, rng=None, start=0, opening_balance=None) -> pd.DataFrame:
+    """Generate synthetic cash flow data for Cash Flow Agent.
+
+    Day `start + i` after 2023-01-01. `cash_balance` accumulates from
+    `opening_balance` (drawn at $100k-1M when not given); chunked writers
+    pass 0 and add the running balance of the previous chunks.
+    """
+    rng = _rng(rng)
+    dates = np.datetime64("2023-01-01") + np.arange(start, start + n).astype("timedelta64[D]")
+    revenue = rng.lognormal(12, 0.5, n).round(2)            # $50k-500k typically
+    operating_exp = rng.lognormal(11.5, 0.4, n).round(2)    # $30k-300k typically
+    capex_draw = rng.lognormal(10, 1, n)
+    capex = np.where(rng.random(n) < 0.3, capex_draw, 0.0).round(2)  # less frequent
+    net_cashflow = (revenue - operating_exp - capex).round(2)
+    if opening_balance is None:
+        opening_balance = rng.lognormal(13, 0.5)
+    quarter = (pd.DatetimeIndex(dates).quarter - 1).to_numpy()
+    return pd.DataFrame({
+        "date": dates,
+        "quarter": pd.Categorical.from_codes(quarter, categories=QUARTERS),
+        "revenue": revenue,
+        "operating_expenses": operating_exp,
+        "capital_expenditures": capex,
+        "net_cashflow": net_cashflow,
+        "cash_balance": (opening_balance + np.cumsum(net_cashflow)).round(2),
+        "cash_flow_category": _choice(rng, CASHFLOW_CATEGORIES, n),
+        "forecast_accuracy": rng.uniform(0.85, 0.98, n).round(3),
+    })
+
+
+def generate_invoice_data(n=100, rng=None, as_of=None, start=0) -> pd.DataFrame:
     """Generate synthetic invoice data for Invoice Management Agent"""
-    vendors = [
-        "TechCorp Solutions", "Global Services Inc", "Premier Consulting", "Elite Systems",
-        "Advanced Technologies", "Professional Services Co", "Innovation Labs", "Digital Partners",
-        "Strategic Solutions", "Excellence Corp", "Prime Services", "Superior Systems",
-        "Enterprise Solutions", "Premium Technologies", "Master Services", "Ultimate Systems"
-    ]
-    
-    invoice_types = ["services", "products", "consulting", "software", "hardware", "maintenance"]
-    payment_terms = ["Net 30", "Net 15", "Net 45", "Due on Receipt", "Net 60"]
-    statuses = ["pending", "approved", "paid", "overdue", "disputed", "cancelled"]
-    
-    data = []
-    for i in range(n):
-        # Generate invoice date
-        days_ago = random.randint(1, 180)
-        invoice_date = datetime.now() - timedelta(days=days_ago)
-        
-        vendor = random.choice(vendors)
-        invoice_type = random.choice(invoice_types)
-        payment_term = random.choice(payment_terms)
-        status = random.choice(statuses)
-        
-        # Generate amount
-        amount = np.random.lognormal(8, 1)  # $1000-50000 typically
-        amount = round(amount, 2)
-        
-        # Calculate due date based on payment terms
-        if payment_term == "Due on Receipt":
-            due_date = invoice_date
-        elif payment_term == "Net 15":
-            due_date = invoice_date + timedelta(days=15)
-        elif payment_term == "Net 30":
-            due_date = invoice_date + timedelta(days=30)
-        elif payment_term == "Net 45":
-            due_date = invoice_date + timedelta(days=45)
-        else:  # Net 60
-            due_date = invoice_date + timedelta(days=60)
-        
-        # Determine if overdue
-        is_overdue = datetime.now() > due_date and status not in ["paid", "cancelled"]
-        
-        data.append({
-            "invoice_id": f"INV_{i+1:06d}",
-            "vendor": vendor,
-            "invoice_date": invoice_date.strftime("%Y-%m-%d"),
-            "due_date": due_date.strftime("%Y-%m-%d"),
-            "amount": amount,
-            "invoice_type": invoice_type,
-            "payment_terms": payment_term,
-            "status": status,
-            "is_overdue": is_overdue,
-            "description": f"Services provided by {vendor}",
-            "po_number": f"PO_{random.randint(1000, 9999)}",
-            "approval_required": 1 if amount > 10000 else 0,
-            "approved_by": f"Manager_{random.randint(1, 20)}" if status in ["approved", "paid"] else None
-        })
-    
-    return pd.DataFrame(data)
+    rng = _rng(rng)
+    as_of = _as_of(as_of)
+    invoice_date = as_of - rng.integers(1, 181, n).astype("timedelta64[D]")
+    term = rng.integers(0, len(PAYMENT_TERMS), n)
+    due_date = invoice_date + TERM_DAYS[term].astype("timedelta64[D]")
+    status = rng.integers(0, len(INVOICE_STATUSES), n)
+    amount = rng.lognormal(8, 1, n).round(2)  # $1000-50000 typically
+
+    settled = np.isin(status, [INVOICE_STATUSES.index("paid"), INVOICE_STATUSES.index("cancelled")])
+    approved = np.isin(status, [INVOICE_STATUSES.index("approved"), INVOICE_STATUSES.index("paid")])
+    vendor = rng.integers(0, len(VENDORS), n)
+    manager = np.where(approved, rng.integers(0, len(MANAGERS), n), -1)
+    return pd.DataFrame({
+        "invoice_id": _ids("INV_", start, n),
+        "vendor": pd.Categorical.from_codes(vendor, categories=VENDORS),
+        "invoice_date": invoice_date,
+        "due_date": due_date,
+        "amount": amount,
+        "invoice_type": _choice(rng, INVOICE_TYPES, n),
+        "payment_terms": pd.Categorical.from_codes(term, categories=PAYMENT_TERMS),
+        "status": pd.Categorical.from_codes(status, categories=INVOICE_STATUSES),
+        "is_overdue": (as_of > due_date) & ~settled,
+        "description": pd.Categorical.from_codes(vendor, categories=[f"Services provided by {v}" for v in VENDORS]),
+        "po_number": _choice(rng, PO_NUMBERS, n),
+        "approval_required": (amount > 10000).astype(int),
+        "approved_by": pd.Categorical.from_codes(manager, categories=MANAGERS),
+    })
+
 
 def generate_rag_documents() -> List[Dict]:
     """Generate synthetic documents for RAG system"""
@@ -309,38 +276,168 @@ def generate_rag_documents() -> List[Dict]:
     
     return documents
 
+TABLES: Dict[str, Callable[..., pd.DataFrame]] = {
+    "budgets": generate_budget_data,
+    "transactions": generate_transaction_data,
+    "cashflow": generate_cashflow_data,
+    "invoices": generate_invoice_data,
+}
+DEFAULT_FILES = {
+    "budgets": "data/budgets_extended.csv",
+    "transactions": "data/transactions_extended.csv",
+    "cashflow": "data/cashflow_data.csv",
+    "invoices": "data/invoices_data.csv",
+}
+
+
+def _chunk_seeds(seed: int, table: str, n_chunks: int) -> List[np.random.SeedSequence]:
+    """Independent per-chunk streams; the same (seed, table, chunk_size) always
+    gives the same rows, whatever the number of workers."""
+    table_key = list(table.encode("utf-8"))
+    return np.random.SeedSequence([seed, *table_key]).spawn(n_chunks)
+
+
+def _generate_chunk(task: Dict[str, Any]) -> Any:
+    """Worker: build one chunk and, for CSV, serialize it too so encoding runs in parallel.
+
+    Cash-flow chunks come back as frames because their balance still has to
+    be offset by the previous chunks.
+    """
+    generator = TABLES[task["table"]]
+    kwargs: Dict[str, Any] = {"rng": np.random.default_rng(task["seed"]), "start": task["start"]}
+    if task["table"] in ("transactions", "invoices"):
+        kwargs["as_of"] = task["as_of"]
+    if task["table"] == "cashflow":
+        kwargs["opening_balance"] = 0.0
+    df = generator(task["rows"], **kwargs)
+    if task["format"] == "csv" and task["table"] != "cashflow":
+        return _to_csv(df, task["header"])
+    return df
+
+
+def _to_csv(df: pd.DataFrame, header: bool) -> bytes:
+    # Dates repeat a lot: format each distinct day once instead of once per row
+    df = df.copy()
+    for column in df.select_dtypes("datetime").columns:
+        codes, days = pd.factorize(df[column])
+        df[column] = pd.Categorical.from_codes(codes, categories=pd.DatetimeIndex(days).strftime("%Y-%m-%d"))
+    return df.to_csv(index=False, header=header).encode("utf-8")
+
+
+def _ordered_map(fn: Callable, tasks: List[Dict[str, Any]], workers: int) -> Iterator[Any]:
+    """Yield fn(task) in task order, keeping at most 2 x workers chunks in flight"""
+    if workers <= 1:
+        for task in tasks:
+            yield fn(task)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for task in tasks:
+            pending.append(pool.submit(fn, task))
+            if len(pending) >= 2 * workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def write_table(table: str, rows: int, path: str, seed: int = DEFAULT_SEED, chunk_size: int = 500_000,
+                workers: Optional[int] = None, as_of: Optional[str] = None, fmt: Optional[str] = None) -> int:
+    """Generate `rows` rows of `table` in chunks and stream them to CSV or Parquet.
+
+    Chunks are generated in worker processes and written in order, so memory
+    stays at a few chunks regardless of `rows`. Returns the rows written.
+    """
+    fmt = fmt or ("parquet" if path.endswith(".parquet") else "csv")
+    chunk_size = max(1, min(chunk_size, rows))
+    n_chunks = -(-rows // chunk_size)
+    workers = workers or min(n_chunks, os.cpu_count() or 1)
+    as_of = str(_as_of(as_of))
+    seeds = _chunk_seeds(seed, table, n_chunks)
+    tasks = [
+        {"table": table, "rows": min(chunk_size, rows - i * chunk_size), "start": i * chunk_size,
+         "seed": seeds[i], "as_of": as_of, "format": fmt, "header": i == 0}
+        for i in range(n_chunks)
+    ]
+    # The running cash balance is the only state carried across chunks
+    balance = float(np.random.default_rng(np.random.SeedSequence([seed, 0])).lognormal(13, 0.5))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    written = 0
+    writer = None
+    try:
+        with open(tmp, "wb") as f:
+            for task, chunk in zip(tasks, _ordered_map(_generate_chunk, tasks, workers)):
+                if table == "cashflow":
+                    chunk["cash_balance"] = (chunk["cash_balance"] + balance).round(2)
+                    balance = float(chunk["cash_balance"].iloc[-1])
+                    if fmt == "csv":
+                        chunk = _to_csv(chunk, task["header"])
+                if fmt == "csv":
+                    f.write(chunk)
+                else:
+                    import pyarrow as pa  # optional: only needed for Parquet output
+                    import pyarrow.parquet as pq
+                    arrow = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(f, arrow.schema)
+                    writer.write_table(arrow)
+                written += task["rows"]
+        if writer is not None:
+            writer.close()
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return written
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate synthetic datasets for the agents")
+    parser.add_argument("--rows", type=int, default=100, help="Rows per table")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply --rows by this factor")
+    parser.add_argument("--tables", default=",".join(TABLES), help="Comma-separated subset of tables")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--as-of", default=None, help="Reference date for transactions/invoices (default: today)")
+    parser.add_argument("--chunk-size", type=int, default=500_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--out-dir", default=None,
+                        help="Write <table>.<format> here instead of the default data/ files")
+    parser.add_argument("--no-rag", action="store_true", help="Skip data/rag_documents.json")
+    return parser.parse_args()
+
+
 def main():
     """Generate all synthetic datasets"""
+    args = parse_args()
+    rows = max(1, int(args.rows * args.scale))
     print("Generating synthetic datasets...")
-    
-    # Generate datasets
-    budget_df = generate_budget_data(100)
-    transaction_df = generate_transaction_data(100)
-    cashflow_df = generate_cashflow_data(100)
-    invoice_df = generate_invoice_data(100)
-    rag_docs = generate_rag_documents()
-    
-    # Save to files
-    budget_df.to_csv("data/budgets_extended.csv", index=False)
-    transaction_df.to_csv("data/transactions_extended.csv", index=False)
-    cashflow_df.to_csv("data/cashflow_data.csv", index=False)
-    invoice_df.to_csv("data/invoices_data.csv", index=False)
-    
-    # Save RAG documents
-    with open("data/rag_documents.json", "w", encoding="utf-8") as f:
-        json.dump(rag_docs, f, ensure_ascii=False, indent=2)
-    
-    print(f"Generated {len(budget_df)} budget records")
-    print(f"Generated {len(transaction_df)} transaction records")
-    print(f"Generated {len(cashflow_df)} cashflow records")
-    print(f"Generated {len(invoice_df)} invoice records")
-    print(f"Generated {len(rag_docs)} RAG documents")
+
+    written = []
+    for table in [t.strip() for t in args.tables.split(",") if t.strip()]:
+        if table not in TABLES:
+            raise SystemExit(f"Unknown table: {table}")
+        if args.out_dir:
+            path = os.path.join(args.out_dir, f"{table}.{args.format}")
+        else:
+            path = os.path.splitext(DEFAULT_FILES[table])[0] + f".{args.format}"
+        n = write_table(table, rows, path, seed=args.seed, chunk_size=args.chunk_size,
+                        workers=args.workers, as_of=args.as_of, fmt=args.format)
+        print(f"Generated {n:,} {table} records")
+        written.append(path)
+
+    if not args.no_rag:
+        rag_docs = generate_rag_documents()
+        rag_path = os.path.join(args.out_dir or "data", "rag_documents.json")
+        with open(rag_path, "w", encoding="utf-8") as f:
+            json.dump(rag_docs, f, ensure_ascii=False, indent=2)
+        print(f"Generated {len(rag_docs)} RAG documents")
+        written.append(rag_path)
+
     print("\nFiles saved:")
-    print("- data/budgets_extended.csv")
-    print("- data/transactions_extended.csv")
-    print("- data/cashflow_data.csv")
-    print("- data/invoices_data.csv")
-    print("- data/rag_documents.json")
+    for path in written:
+        print(f"- {path}")
 
 if __name__ == "__main__":
     main()
@@ -1,7 +1,15 @@
-import yfinance as yf
+import argparse
+import os
+import shutil
+import sys
+
 import pandas as pd
-from tqdm import tqdm
-import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fetch_engine import FetchEngine, StubSource, YFinanceSource
+from financials_store import PartitionedFinancialsStore, due_for_refresh, refresh_since
+
+
 def get_sp500_tickers():
     """Returns a hardcoded list of S&P 500 tickers."""
     print("Using a reliable, hardcoded list of S&P 500 tickers.")
@@ -56,64 +64,149 @@ NECESSARY_COLUMNS = [
     'Accounts Payable'
 ]
 
-def get_company_financials(ticker_symbol):
-    """Fetches, merges, and cleans financial data for a single ticker."""
-    try:
-        ticker = yf.Ticker(ticker_symbol)
-        cash_flow = ticker.quarterly_cashflow.T
-        income_stmt = ticker.quarterly_financials.T
-        balance_sheet = ticker.quarterly_balance_sheet.T
-        
-        if cash_flow.empty or income_stmt.empty or balance_sheet.empty:
-            return None
+LARGE_CAP_THRESHOLD = 10_000_000_000
+MID_CAP_THRESHOLD = 2_000_000_000
+
+
+def categorize_size(market_cap):
+    if market_cap >= LARGE_CAP_THRESHOLD:
+        return 'Large-Cap'
+    elif market_cap >= MID_CAP_THRESHOLD:
+        return 'Mid-Cap'
+    else:
+        return 'Small-Cap'
+
+
+def build_dataset(raw_df):
+    """Final column layout of financial_data_sp500.csv from the per-ticker frames."""
+    final_df = raw_df.copy()
+    final_df['marketCap'] = pd.to_numeric(final_df['marketCap'], errors='coerce').fillna(0)
+    final_df['size_category'] = final_df['marketCap'].apply(categorize_size)
+    final_columns = ['date', 'ticker', 'marketCap', 'size_category'] + NECESSARY_COLUMNS
+    final_df = final_df.reindex(columns=final_columns)
+    final_df.sort_values(by=['ticker', 'date'], inplace=True)
+    return final_df.reset_index(drop=True)
+
 
-        df = pd.concat([cash_flow, income_stmt, balance_sheet], axis=1)
-        df = df.loc[:,~df.columns.duplicated()].copy()
-        market_cap = ticker.info.get('marketCap', 0)
+def parse_args():
+    parser = argparse.ArgumentParser(description='Fetch quarterly fundamentals for the S&P 500')
+    parser.add_argument('--output', default='financial_data_sp500.csv')
+    parser.add_argument('--checkpoint-dir', default=os.path.join('data', 'fetch_checkpoints'),
+                        help='Per-ticker results; a rerun only fetches tickers missing here. '
+                             'Removed once every ticker has been fetched')
+    parser.add_argument('--fresh', action='store_true',
+                        help='Discard checkpoints left by an earlier interrupted or failed run')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=4.0, help='Upstream requests per second')
+    parser.add_argument('--retries', type=int, default=4)
+    parser.add_argument('--tickers', default=None, help='Comma-separated subset of tickers')
+    parser.add_argument('--stub', action='store_true', help='Use the offline stub source instead of yfinance')
+    parser.add_argument('--stub-as-of', default='2024-12-31', help='Last quarter generated by the stub source')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only fetch quarters newer than the partitioned store and upsert them')
+    parser.add_argument('--store', default=os.path.join('data', 'financials_store'),
+                        help='Per-ticker partition store used by --incremental')
+    parser.add_argument('--lookback', type=int, default=1,
+                        help='Also refetch this many most recent stored quarters to catch restatements')
+    parser.add_argument('--as-of', default=None, help='Refresh date (default: today)')
+    parser.add_argument('--force', action='store_true',
+                        help='With --incremental, query every ticker even if no new quarter is due')
+    parser.add_argument('--no-export', action='store_true', help='With --incremental, skip rewriting --output')
+    return parser.parse_args()
 
-        df['ticker'] = ticker_symbol
-        df['marketCap'] = market_cap
-        return df
 
-    except Exception as e:
-        return None
+def refresh_incremental(args, tickers, source):
+    """Fetch only new (and `--lookback` recent) quarters into the partition store.
+
+    An empty store is seeded from the existing --output CSV. The fetch is
+    checkpointed under the store like a full run, so an interrupted refresh
+    resumes; the checkpoints are dropped once every ticker has been upserted.
+    """
+    store = PartitionedFinancialsStore(args.store)
+    if not store.tickers and os.path.exists(args.output):
+        print(f"Seeding the store from '{args.output}'...")
+        seeded = store.import_frame(pd.read_csv(args.output).drop(columns=['size_category'], errors='ignore'))
+        print(f"Seeded {seeded['ticker'].nunique()} tickers, {len(seeded)} rows")
+
+    latest = store.latest_dates()
+    due = tickers if args.force else due_for_refresh(latest, tickers, as_of=args.as_of)
+    print(f"{len(due)} of {len(tickers)} tickers have a new quarter due")
+
+    refresh_dir = os.path.join(args.store, '_refresh')
+    engine = FetchEngine(
+        source, refresh_dir, max_workers=args.workers, rate=args.rate,
+        max_retries=args.retries, columns=['ticker', 'marketCap'] + NECESSARY_COLUMNS,
+    )
+    report = engine.run(due, since=refresh_since(latest, due, args.lookback))
+    print(f"Fetched {report['fetched']}, resumed {report['skipped']}, nothing new {report['empty']}, "
+          f"failed {len(report['failed'])} in {report['elapsed_seconds']:.1f}s")
+
+    fetched = engine.load(due)
+    frames = {ticker: group for ticker, group in fetched.groupby('ticker', sort=False)} if not fetched.empty else {}
+    changes = store.upsert_many(frames)
+    summary = changes.groupby('change').size().to_dict() if not changes.empty else {}
+    print(f"Upserted {summary.get('insert', 0)} new and {summary.get('update', 0)} restated rows "
+          f"across {changes['ticker'].nunique() if not changes.empty else 0} partitions")
+
+    if not changes.empty:
+        reports_dir = os.path.join(args.store, '_reports')
+        os.makedirs(reports_dir, exist_ok=True)
+        stamp = pd.Timestamp.now().strftime('%Y%m%d-%H%M%S-%f')
+        report_path = os.path.join(reports_dir, f'refresh-{stamp}.csv')
+        # 'x': never overwrite the report of another refresh
+        with open(report_path, 'x', newline='', encoding='utf-8') as f:
+            changes.to_csv(f, index=False)
+        print(f"Updated rows report: {report_path}")
+    if report['failed']:
+        for ticker, error in sorted(report['failed'].items()):
+            print(f"  {ticker}: {error}")
+        print("Rerun the script to retry the failed tickers.")
+    else:
+        shutil.rmtree(refresh_dir, ignore_errors=True)
+
+    if not args.no_export and (not changes.empty or not os.path.exists(args.output)):
+        final_df = build_dataset(store.load())
+        final_df.to_csv(args.output, index=False)
+        print(f"Exported {len(final_df)} rows to '{args.output}'")
+    return changes
+
 
 if __name__ == "__main__":
-    all_tickers = get_sp500_tickers()
-    all_company_data = []
-    print(f"\nFetching financial data for {len(all_tickers)} companies... (This may take 15-20 minutes)")
+    args = parse_args()
+    all_tickers = args.tickers.split(',') if args.tickers else get_sp500_tickers()
+    source = StubSource(NECESSARY_COLUMNS, as_of=args.stub_as_of) if args.stub else YFinanceSource()
+    if args.incremental:
+        refresh_incremental(args, all_tickers, source)
+        sys.exit(0)
 
-    for ticker_symbol in tqdm(all_tickers):
-        company_df = get_company_financials(ticker_symbol)
-        if company_df is not None:
-            all_company_data.append(company_df)
-        time.sleep(0.5)
+    if args.fresh:
+        shutil.rmtree(args.checkpoint_dir, ignore_errors=True)
+    engine = FetchEngine(
+        source, args.checkpoint_dir, max_workers=args.workers, rate=args.rate,
+        max_retries=args.retries, columns=['ticker', 'marketCap'] + NECESSARY_COLUMNS,
+    )
 
-    print("\nCombining all data into a single DataFrame...")
-    final_df = pd.concat(all_company_data)
-    LARGE_CAP_THRESHOLD = 10_000_000_000
-    MID_CAP_THRESHOLD = 2_000_000_000
-
-    def categorize_size(market_cap):
-        if market_cap >= LARGE_CAP_THRESHOLD:
-            return 'Large-Cap'
-        elif market_cap >= MID_CAP_THRESHOLD:
-            return 'Mid-Cap'
-        else:
-            return 'Small-Cap'
+    print(f"\nFetching financial data for {len(all_tickers)} companies "
+          f"({args.workers} workers, {args.rate:g} requests/s)...")
+    report = engine.run(all_tickers)
+    print(f"Fetched {report['fetched']}, resumed {report['skipped']}, no data {report['empty']}, "
+          f"failed {len(report['failed'])} in {report['elapsed_seconds']:.1f}s")
+    for ticker, error in sorted(report['failed'].items()):
+        print(f"  {ticker}: {error}")
+    if report['failed']:
+        print("Rerun the script to retry the failed tickers.")
 
-    final_df['size_category'] = final_df['marketCap'].apply(categorize_size)
-    final_columns = ['ticker', 'marketCap', 'size_category'] + NECESSARY_COLUMNS
-    final_df = final_df.reindex(columns=final_columns)
-    final_df.reset_index(inplace=True)
-    final_df.rename(columns={'index': 'date'}, inplace=True)
-    final_df.sort_values(by=['ticker', 'date'], inplace=True)
+    print("\nCombining all data into a single DataFrame...")
+    final_df = build_dataset(engine.load(all_tickers))
 
     # --- 6. Save the Dataset to a File ---
-    output_filename = 'financial_data_sp500.csv'
+    output_filename = args.output
     print(f"\nSaving the final dataset to '{output_filename}'...")
     final_df.to_csv(output_filename, index=False)
     print("Save complete!")
+    if not report['failed']:
+        # Checkpoints only serve to resume this run; a later run must fetch fresh data
+        shutil.rmtree(args.checkpoint_dir, ignore_errors=True)
 
     # --- 7. Display Final Results ---
     print("\n--- Final Cleaned Dataset (First 5 Rows) ---")
@@ -121,4 +214,4 @@ if __name__ == "__main__":
     print("\n--- Dataset Info ---")
     final_df.info()
     print("\n--- Company Size Distribution ---")
-    print(final_df.drop_duplicates(subset=['ticker'])['size_category'].value_counts())
\ No newline at end of file
+    print(final_df.drop_duplicates(subset=['ticker'])['size_category'].value_counts())
@@ -0,0 +1,158 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+# Ensure project root is on sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from agents.fake_llm import FakeLLMScript, LatencyModel, count_tokens
+
+EMBEDDING_DIM = 768  # nomic-embed-text, matches rag/simple_index.json
+
+DEFAULT_CONFIG = {
+    "latency_ms": 300.0,       # time to first token
+    "ms_per_token": 15.0,      # decode time per completion token
+    "jitter": 0.2,             # +/- fraction applied to both
+    "completion_tokens": 60,   # length of generated answers
+    "seed": 0,
+}
+
+
+def _message(message: Dict[str, Any]) -> Dict[str, Any]:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return {"role": message.get("role", "user"), "content": content}
+
+
+def _apply_stop(text: str, stop: Optional[Any]) -> str:
+    if not stop:
+        return text
+    for s in [stop] if isinstance(stop, str) else stop:
+        if s and s in text:
+            text = text[:text.index(s)]
+    return text
+
+
+def _embedding(text: str) -> List[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(EMBEDDING_DIM)
+    return (vec / np.linalg.norm(vec)).tolist()
+
+
+def create_app(config: Optional[Dict[str, Any]] = None) -> FastAPI:
+    """OpenAI-compatible chat completions (plus Ollama embeddings) with simulated latency."""
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    script = FakeLLMScript(completion_tokens=config["completion_tokens"])
+    latency = LatencyModel(config["latency_ms"], config["ms_per_token"], jitter=config["jitter"], seed=config["seed"])
+    stats = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    app = FastAPI(title="LLM stub")
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok", **stats}
+
+    @app.get("/v1/models")
+    def models():
+        return {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(body: Dict[str, Any]):
+        messages = [_message(m) for m in body.get("messages", [])]
+        reply = script.respond(messages, functions=body.get("functions"), tools=body.get("tools"))
+        text = _apply_stop(reply["content"], body.get("stop"))
+        message = {"role": "assistant", "content": text}
+        finish_reason = "stop"
+        if reply["function_call"]:
+            message["function_call"], finish_reason = reply["function_call"], "function_call"
+        if reply["tool_calls"]:
+            message["tool_calls"], finish_reason = reply["tool_calls"], "tool_calls"
+        prompt_tokens = sum(count_tokens(m["content"]) for m in messages)
+        completion_tokens = count_tokens(text or json.dumps(reply["function_call"] or reply["tool_calls"]))
+        stats["requests"] += 1
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "stub")
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency.total(prompt_tokens, completion_tokens))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            }
+
+        async def events():
+            def chunk(delta, finish=None):
+                payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                           "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+                return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+            await asyncio.sleep(latency.first_token(prompt_tokens))
+            yield chunk({"role": "assistant", "content": ""})
+            if reply["function_call"]:
+                await asyncio.sleep(latency.decode(completion_tokens))
+                yield chunk({"function_call": reply["function_call"]})
+            elif reply["tool_calls"]:
+                await asyncio.sleep(latency.decode(completion_tokens))
+                yield chunk({"tool_calls": [dict(call, index=i) for i, call in enumerate(reply["tool_calls"])]})
+            else:
+                words = text.split(" ")
+                per_word = latency.decode(completion_tokens) / max(len(words), 1)
+                for i, word in enumerate(words):
+                    await asyncio.sleep(per_word)
+                    yield chunk({"content": word if i == 0 else " " + word})
+            yield chunk({}, finish_reason)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/api/embeddings")
+    async def ollama_embeddings(body: Dict[str, Any]):
+        await asyncio.sleep(latency.decode(1))
+        return {"embedding": _embedding(body.get("prompt", ""))}
+
+    return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline OpenAI/Ollama-compatible LLM stub for load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    # Ollama's default port, so OllamaEmbeddings (RAG) reaches the stub without configuration
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_CONFIG["latency_ms"])
+    parser.add_argument("--ms-per-token", type=float, default=DEFAULT_CONFIG["ms_per_token"])
+    parser.add_argument("--jitter", type=float, default=DEFAULT_CONFIG["jitter"])
+    parser.add_argument("--completion-tokens", type=int, default=DEFAULT_CONFIG["completion_tokens"])
+    parser.add_argument("--seed", type=int, default=DEFAULT_CONFIG["seed"])
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    import uvicorn
+
+    args = parse_args(argv)
+    config = {k: getattr(args, k) for k in DEFAULT_CONFIG}
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
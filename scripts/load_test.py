@@ -0,0 +1,338 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Ensure project root is on sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from scripts.test_agents import TEST_QUERIES
+
+ERROR_MARKERS = ("Error in agent",)
+
+# Surface rewrites that keep the intent: polite prefixes/suffixes, casing and punctuation
+PREFIXES = ["", "", "Cho tôi biết: ", "Làm ơn ", "Giúp tôi: ", "Anh/chị xem giúp: ", "Mình cần biết "]
+SUFFIXES = ["", "", " giúp tôi", " nhé", " ngay bây giờ", " (báo cáo ngắn gọn)", " cho ban giám đốc"]
+
+
+def paraphrase(query: str, rng: random.Random) -> str:
+    text = query.rstrip("?!. ")
+    text = rng.choice(PREFIXES) + (text[0].lower() + text[1:] if text else text) + rng.choice(SUFFIXES)
+    text = text[0].upper() + text[1:] if text else text
+    if rng.random() < 0.2:
+        text = text.lower()
+    return text + rng.choice(["?", "?", ".", ""])
+
+
+def parse_mix(items: Optional[Iterable[str]], intents: Iterable[str]) -> Dict[str, float]:
+    """`budget=3 cashflow=1` -> weights; intents not listed get 0. No items -> uniform."""
+    intents = list(intents)
+    if not items:
+        return {intent: 1.0 for intent in intents}
+    weights = {intent: 0.0 for intent in intents}
+    for item in items:
+        name, _, value = item.partition("=")
+        if name not in weights:
+            raise ValueError(f"Unknown intent '{name}'. Choose from: {', '.join(intents)}")
+        weights[name] = float(value or 1)
+    if sum(weights.values()) <= 0:
+        raise ValueError("Mix weights must sum to a positive number")
+    return weights
+
+
+class QueryMix:
+    """Endless, seeded stream of (intent, query) pairs.
+
+    Each draw either repeats a previously issued query verbatim (`repeat_rate`,
+    which is what a response cache would see) or picks an intent by weight, a
+    base query for it, and rewrites it with probability `paraphrase_rate`.
+    """
+
+    def __init__(self, queries: Dict[str, List[str]], weights: Dict[str, float],
+                 repeat_rate: float = 0.1, paraphrase_rate: float = 0.5, seed: int = 0):
+        self.queries = {k: v for k, v in queries.items() if weights.get(k, 0) > 0 and v}
+        self.intents = list(self.queries)
+        self.weights = [weights[k] for k in self.intents]
+        self.repeat_rate = repeat_rate
+        self.paraphrase_rate = paraphrase_rate
+        self.rng = random.Random(seed)
+        self.history: List[tuple] = []
+
+    def next(self) -> tuple:
+        if self.history and self.rng.random() < self.repeat_rate:
+            return self.rng.choice(self.history)
+        intent = self.rng.choices(self.intents, weights=self.weights)[0]
+        query = self.rng.choice(self.queries[intent])
+        if self.rng.random() < self.paraphrase_rate:
+            query = paraphrase(query, self.rng)
+        item = (intent, query)
+        self.history.append(item)
+        return item
+
+    def take(self, n: int) -> List[tuple]:
+        return [self.next() for _ in range(n)]
+
+
+async def send(client, url: str, intent: str, query: str, scheduled: float) -> Dict[str, Any]:
+    """POST one query. Latency runs from the scheduled send time, so a stalled
+    client in open-loop mode shows up in the numbers instead of hiding."""
+    record = {"intent": intent, "query": query, "scheduled": scheduled, "status": None, "error": None}
+    try:
+        response = await client.post(url, json={"query": query})
+        record["status"] = response.status_code
+        if response.status_code != 200:
+            record["error"] = f"HTTP {response.status_code}"
+        else:
+            body = response.text
+            if any(marker in body for marker in ERROR_MARKERS):
+                record["error"] = "agent error"
+    except Exception as e:
+        record["error"] = type(e).__name__
+    record["latency"] = time.perf_counter() - scheduled
+    return record
+
+
+async def run_open_loop(client, url: str, mix: QueryMix, rate: float, duration: float,
+                        max_in_flight: int = 256, arrival: str = "poisson") -> tuple:
+    """Fixed arrival rate regardless of response times. Arrivals beyond
+    `max_in_flight` outstanding requests are dropped and counted as errors."""
+    rng = random.Random(mix.rng.random())
+    start = time.perf_counter()
+    next_at = start
+    tasks, dropped = [], []
+    in_flight = 0
+
+    async def tracked(intent, query, scheduled):
+        nonlocal in_flight
+        try:
+            return await send(client, url, intent, query, scheduled)
+        finally:
+            in_flight -= 1
+
+    while True:
+        next_at += rng.expovariate(rate) if arrival == "poisson" else 1.0 / rate
+        if next_at - start >= duration:
+            break
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        intent, query = mix.next()
+        if in_flight >= max_in_flight:
+            dropped.append({"intent": intent, "query": query, "scheduled": next_at, "status": None,
+                            "error": "dropped", "latency": None})
+            continue
+        in_flight += 1
+        tasks.append(asyncio.create_task(tracked(intent, query, next_at)))
+    records = list(await asyncio.gather(*tasks)) + dropped
+    return records, time.perf_counter() - start
+
+
+async def run_closed_loop(client, url: str, mix: QueryMix, users: int, duration: float,
+                          think_time: float = 0.0, max_requests: Optional[int] = None) -> tuple:
+    """`users` virtual users, each sending its next query once the previous
+    one returned plus an exponential think time with mean `think_time`."""
+    rng = random.Random(mix.rng.random())
+    start = time.perf_counter()
+    deadline = start + duration
+    records = []
+
+    async def user():
+        while time.perf_counter() < deadline and (max_requests is None or len(records) < max_requests):
+            intent, query = mix.next()
+            records.append(await send(client, url, intent, query, time.perf_counter()))
+            if think_time > 0:
+                await asyncio.sleep(rng.expovariate(1.0 / think_time))
+
+    await asyncio.gather(*(user() for _ in range(users)))
+    return records, time.perf_counter() - start
+
+
+def _latency_stats(latencies: np.ndarray) -> Dict[str, Optional[float]]:
+    if latencies.size == 0:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None, "max_ms": None}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {"p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2),
+            "mean_ms": round(float(latencies.mean() * 1000), 2), "max_ms": round(float(latencies.max() * 1000), 2)}
+
+
+def summarize(records: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Throughput counts successful responses; latency percentiles cover every
+    answered request (errors included, drops excluded)."""
+
+    def block(rows):
+        answered = np.array([r["latency"] for r in rows if r["latency"] is not None], dtype=float)
+        errors = sum(1 for r in rows if r["error"])
+        return {
+            "requests": len(rows),
+            "ok": len(rows) - errors,
+            "errors": errors,
+            "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+            "throughput_rps": round((len(rows) - errors) / elapsed, 3) if elapsed > 0 else 0.0,
+            **_latency_stats(answered),
+        }
+
+    by_intent = {}
+    for r in records:
+        by_intent.setdefault(r["intent"], []).append(r)
+    error_kinds = {}
+    for r in records:
+        if r["error"]:
+            error_kinds[r["error"]] = error_kinds.get(r["error"], 0) + 1
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "overall": block(records),
+        "by_intent": {intent: block(rows) for intent, rows in sorted(by_intent.items())},
+        "error_kinds": error_kinds,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    header = f"{'intent':<12}{'requests':>9}{'errors':>8}{'err%':>7}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    lines = [header, "-" * len(header)]
+
+    def row(name, b):
+        fmt = lambda v: f"{v:>10.1f}" if v is not None else f"{'-':>10}"
+        return (f"{name:<12}{b['requests']:>9}{b['errors']:>8}{b['error_rate'] * 100:>6.1f}%"
+                f"{b['throughput_rps']:>9.2f}{fmt(b['p50_ms'])}{fmt(b['p95_ms'])}{fmt(b['p99_ms'])}")
+
+    for intent, b in report["by_intent"].items():
+        lines.append(row(intent, b))
+    lines.append("-" * len(header))
+    lines.append(row("total", report["overall"]))
+    if report["error_kinds"]:
+        lines.append("errors: " + ", ".join(f"{k}={v}" for k, v in report["error_kinds"].items()))
+    return "\n".join(lines)
+
+
+# -- offline stack ----------------------------------------------------------------------------
+def _wait_healthy(url: str, timeout: float = 120.0) -> None:
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} did not become healthy within {timeout:.0f}s")
+
+
+def start_offline_stack(args) -> List[subprocess.Popen]:
+    """LLM stub + API server wired to it through the OpenAI base-URL variables."""
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    env = dict(os.environ, OPENAI_BASE_URL=f"{stub_url}/v1", OPENAI_API_BASE=f"{stub_url}/v1",
+               OPENAI_API_KEY="stub")
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "scripts", "llm_stub_server.py"), "--port", str(args.stub_port),
+         "--latency-ms", str(args.stub_latency_ms), "--ms-per-token", str(args.stub_ms_per_token)],
+        cwd=ROOT, env=env)
+    procs = [stub]
+    try:
+        _wait_healthy(f"{stub_url}/health")
+        api = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.server:app", "--port", str(args.api_port),
+             "--workers", str(args.api_workers), "--log-level", "warning"],
+            cwd=ROOT, env=env)
+        procs.append(api)
+        _wait_healthy(f"http://127.0.0.1:{args.api_port}/health")
+    except Exception:
+        stop_processes(procs)
+        raise
+    return procs
+
+
+def stop_processes(procs: List[subprocess.Popen]) -> None:
+    for proc in reversed(procs):
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+async def run(args, mix: QueryMix) -> tuple:
+    import httpx
+
+    url = args.url.rstrip("/") + "/query"
+    limits = httpx.Limits(max_connections=max(args.users, args.max_in_flight),
+                          max_keepalive_connections=max(args.users, args.max_in_flight))
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        if args.warmup:
+            for intent, query in mix.take(args.warmup):
+                await send(client, url, intent, query, time.perf_counter())
+        if args.mode == "open":
+            return await run_open_loop(client, url, mix, args.rate, args.duration, args.max_in_flight, args.arrival)
+        return await run_closed_loop(client, url, mix, args.users, args.duration, args.think_time, args.requests)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Workload generator and load tester for POST /query")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="API base URL")
+    parser.add_argument("--mode", choices=["open", "closed"], default="closed")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load")
+    parser.add_argument("--rate", type=float, default=2.0, help="Open loop: arrivals per second")
+    parser.add_argument("--arrival", choices=["poisson", "uniform"], default="poisson")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Open loop: drop arrivals beyond this")
+    parser.add_argument("--users", type=int, default=4, help="Closed loop: concurrent users")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Closed loop: mean seconds between requests")
+    parser.add_argument("--requests", type=int, default=None, help="Closed loop: stop after this many requests")
+    parser.add_argument("--mix", nargs="*", metavar="INTENT=WEIGHT",
+                        help=f"Intent weights, e.g. cashflow=3 budget=1 (intents: {', '.join(TEST_QUERIES)})")
+    parser.add_argument("--repeat-rate", type=float, default=0.1, help="Share of exact repeats of earlier queries")
+    parser.add_argument("--paraphrase-rate", type=float, default=0.5, help="Share of new queries that get rewritten")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warmup", type=int, default=0, help="Unmeasured requests sent first")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--json", default=None, help="Also write the report (and settings) to this JSON file")
+    parser.add_argument("--offline", action="store_true",
+                        help="Start the LLM stub and the API locally and test against them")
+    # Ollama's default port: the stub also serves /api/embeddings for the RAG path
+    parser.add_argument("--stub-port", type=int, default=11434)
+    parser.add_argument("--stub-latency-ms", type=float, default=300.0)
+    parser.add_argument("--stub-ms-per-token", type=float, default=15.0)
+    parser.add_argument("--api-port", type=int, default=8000)
+    parser.add_argument("--api-workers", type=int, default=1)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        weights = parse_mix(args.mix, TEST_QUERIES)
+    except ValueError as e:
+        sys.exit(str(e))
+    mix = QueryMix(TEST_QUERIES, weights, args.repeat_rate, args.paraphrase_rate, args.seed)
+
+    procs = []
+    if args.offline:
+        args.url = f"http://127.0.0.1:{args.api_port}"
+        procs = start_offline_stack(args)
+    try:
+        records, elapsed = asyncio.run(run(args, mix))
+    finally:
+        stop_processes(procs)
+
+    report = summarize(records, elapsed)
+    load = f"rate={args.rate}/s {args.arrival}" if args.mode == "open" else f"users={args.users} think={args.think_time}s"
+    print(f"{args.mode}-loop against {args.url} ({load}, {elapsed:.1f}s)")
+    print(format_report(report))
+    if args.json:
+        settings = {k: v for k, v in vars(args).items() if k != "json"}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "weights": weights, "python": platform.python_version(),
+                       **report}, f, indent=2, ensure_ascii=False)
+        print(f"Report saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,36 +6,46 @@ ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
-from orchestration.mas_graph import app as mas_app
-
-def test_agents():
-    """Test all agents with sample queries"""
-    
-    test_queries = [
-        # Budget Agent
+# Sample queries grouped by the agent expected to answer them; also the
+# workload source for scripts/load_test.py
+TEST_QUERIES = {
+    "budget": [
         "So sánh budget marketing tháng này?",
         "Ngân sách phòng R&D như thế nào?",
-        
-        # Spending Agent  
+    ],
+    "spending": [
         "Chi tiêu subscription theo vendor?",
         "Vendor nào tốn nhiều nhất?",
-        
-        # Alert Agent
+    ],
+    "anomalies": [
         "Phát hiện giao dịch bất thường",
         "Có giao dịch nào vượt ngưỡng bất thường không?",
-        
-        # Cash Flow Agent
+    ],
+    "cashflow": [
         "Phân tích dòng tiền hiện tại",
         "Dự báo cash flow 30 ngày tới",
-        
-        # Invoice Agent
+    ],
+    "invoice": [
         "Hóa đơn nào đang quá hạn?",
         "Tình trạng thanh toán hóa đơn",
-        
-        # RAG queries
+    ],
+    "screener": [
+        "Top 10 large-cap có operating margin > 20%",
+        "Mid-cap companies with falling revenue yoy",
+    ],
+    # Answered by the budget agent's RAG fallback
+    "rag": [
         "Chính sách chi tiêu > 5000 USD cần ai duyệt?",
-        "Quy định travel policy như thế nào?"
-    ]
+        "Quy định travel policy như thế nào?",
+    ],
+}
+
+
+def test_agents():
+    """Test all agents with sample queries"""
+    from orchestration.mas_graph import app as mas_app
+
+    test_queries = [query for queries in TEST_QUERIES.values() for query in queries]
     
     print("🧪 Testing Multi-Agent Finance System")
     print("=" * 50)